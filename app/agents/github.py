@@ -1,34 +1,53 @@
 """
 LangChain ReAct Agent
 """
-from langchain_mcp_adapters.client import MultiServerMCPClient
-from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
 from pydantic import BaseModel, Field
 
+from app.agents.llm import create_chat_model
 from app.conf.config import settings
 from app.conf.logging import logger
+from app.services.github_snapshot import github_snapshot
+from app.services.mcp_pool import get_mcp_pool
+from app.services.tool_cache import github_tool_cache
 from datetime import datetime, timezone
 
 async def create_github_agent():
-    model = ChatOpenAI(model=settings.LLM_MODEL, api_key=settings.OPENAI_API_KEY)
-    client = MultiServerMCPClient(
+    model = create_chat_model("GithubAgent")
+    # 미리 띄워둔 MCP 서버 pool로 tool 호출을 분배
+    client = await get_mcp_pool(
+        "github",
         {
-            "github": {
-                "command": "/app/github-mcp-server",
-                "args": ["stdio"],
-                "env": {
-                    "GITHUB_PERSONAL_ACCESS_TOKEN": settings.GITHUB_TOKEN,
-                },
-            }
-        }
+            "command": settings.GITHUB_MCP_COMMAND,
+            "args": ["stdio"],
+            "env": {
+                "GITHUB_PERSONAL_ACCESS_TOKEN": settings.GITHUB_TOKEN,
+            },
+            "transport": "stdio",
+        },
     )
 
     all_tools = client.get_tools()
+    if settings.GITHUB_TOOL_CACHE_ENABLED:
+        all_tools = github_tool_cache.wrap_tools(all_tools)
     
     # Get repository info from settings
     owner = settings.GITHUB_REPO_OWNER
     repo = settings.GITHUB_REPO_NAME
+
+    # 최근 commit / issue / PR snapshot을 local tool로 제공
+    snapshot_hint = ""
+    if settings.GITHUB_SNAPSHOT_ENABLED and owner and repo:
+        try:
+            await github_snapshot.start()
+            all_tools = all_tools + github_snapshot.get_tools()
+            snapshot_hint = (
+                "\nStart with the snapshot_commits, snapshot_open_issues and snapshot_merged_pulls tools. "
+                "They answer from a local snapshot instantly; use the other GitHub tools only for details "
+                "the snapshot does not contain.\n"
+            )
+        except Exception as e:
+            logger.warning(f"GitHub snapshot unavailable: {e}")
     current_time = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
     
     # GitHub agent system message with repository info
@@ -52,7 +71,7 @@ Your task:
 - If you find nothing relevant, admit this honestly rather than inventing information.
 
 Remember: It is better to report "no findings" than to report incorrect information from a different repository.
-"""
+{snapshot_hint}"""
     
     agent = create_react_agent(
         model, 
@@ -4,30 +4,35 @@ LangChain ReAct Agent
 
 from datetime import datetime, timezone
 
-from langchain_mcp_adapters.client import MultiServerMCPClient
-from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
 from pydantic import BaseModel, Field
 
+from app.agents.llm import create_chat_model
 from app.conf.config import settings
 from app.conf.logging import logger
+from app.services.mcp_pool import get_mcp_pool
+from app.services.tool_cache import grafana_tool_cache
 
 async def create_grafana_agent():
-    model = ChatOpenAI(model=settings.LLM_MODEL, api_key=settings.OPENAI_API_KEY)
-    client = MultiServerMCPClient(
+    model = create_chat_model("GrafanaAgent")
+    # 미리 띄워둔 MCP 서버 pool로 tool 호출을 분배
+    client = await get_mcp_pool(
+        "grafana",
         {
-            "grafana": {
-                "command": "/app/mcp-grafana",
-                "args": [],
-                "env": {
-                    "GRAFANA_URL": settings.GRAFANA_URL,
-                    "GRAFANA_API_KEY": settings.GRAFANA_API_KEY,
-                },
-            }
-        }
+            "command": settings.GRAFANA_MCP_COMMAND,
+            "args": [],
+            "env": {
+                "GRAFANA_URL": settings.GRAFANA_URL,
+                "GRAFANA_API_KEY": settings.GRAFANA_API_KEY,
+            },
+            "transport": "stdio",
+        },
     )
 
     all_tools = client.get_tools()
+    if settings.GRAFANA_TOOL_CACHE_ENABLED:
+        # 같은 조회를 반복하지 않도록 tool 결과를 캐시
+        all_tools = grafana_tool_cache.wrap_tools(all_tools)
     
     # Grafana agent를 위한 시스템 지침
     grafana_system_prompt = """
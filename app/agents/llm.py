@@ -0,0 +1,194 @@
+"""
+Chat Model Factory
+"""
+
+import asyncio
+import time
+from typing import List
+
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+from pydantic import Field
+
+from app.conf.config import settings
+from app.conf.logging import logger
+from app.graph.context import count_message_tokens
+from app.services.llm_limiter import llm_limiter
+from app.services.metrics import TokenUsageCallback
+from app.services.model_tiers import model_tier_router, parse_model_chain
+
+# agent별 모델 설정 (primary, fallback 순서)
+AGENT_MODEL_SETTINGS = {
+    "Supervisor": "SUPERVISOR_MODEL",
+    "GrafanaAgent": "GRAFANA_AGENT_MODEL",
+    "GithubAgent": "GITHUB_AGENT_MODEL",
+    "WebSearchAgent": "WEBSEARCH_AGENT_MODEL",
+    "Summarizer": "SUMMARIZER_MODEL",
+}
+
+_factory_override = None
+_http_async_client = None
+
+
+def set_chat_model_factory(factory):
+    """
+    agent 이름과 옵션을 받아 chat model을 만드는 함수로 교체합니다 (benchmark, 테스트용).
+    None을 주면 기본 ChatOpenAI로 되돌립니다.
+    """
+    global _factory_override
+    _factory_override = factory
+
+
+def shared_http_client():
+    """
+    모든 agent가 함께 쓰는 keep-alive HTTP connection pool. 닫혀 있으면 새로 만듭니다.
+    """
+    global _http_async_client
+    if _http_async_client is None or _http_async_client.is_closed:
+        _http_async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_SECONDS,
+            ),
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+        )
+    return _http_async_client
+
+
+async def close_llm_clients():
+    global _http_async_client
+    if _http_async_client is not None:
+        await _http_async_client.aclose()
+        _http_async_client = None
+
+
+def _retry_after(error):
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _retryable(error):
+    # 429, 5xx, 연결 오류는 같은 모델로 다시 보낼 수 있음
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def model_chain(agent):
+    """
+    agent가 사용할 모델 목록 (primary부터). agent별 설정이 없으면 LLM_MODEL만 사용합니다.
+    """
+    chain = parse_model_chain(getattr(settings, AGENT_MODEL_SETTINGS.get(agent, "LLM_MODEL")))
+    return chain or [settings.LLM_MODEL]
+
+
+class PooledChatOpenAI(ChatOpenAI):
+    """
+    호출마다 프로세스 공용 rate limiter에서 RPM / TPM 몫을 받은 뒤 요청하는 ChatOpenAI.
+    prompt token은 tiktoken으로 미리 추정하고, 응답의 실제 사용량으로 limiter를 보정합니다.
+    model_tiers가 있으면 지연 시간과 오류율이 기준 안에 있는 첫 번째 모델로 요청하고,
+    요청이 실패하면 다음 모델로 다시 보냅니다. SDK의 자체 재시도는 끄고(max_retries=0),
+    재시도도 limiter를 거치도록 여기서 처리합니다.
+    """
+
+    agent_name: str = "default"
+    model_tiers: List[str] = Field(default_factory=list)
+
+    def _tiers(self):
+        return self.model_tiers or [self.model_name]
+
+    def _estimate_tokens(self, messages, model):
+        completion = self.max_tokens or settings.LLM_COMPLETION_TOKEN_ESTIMATE
+        return count_message_tokens(messages, model) + completion
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        tiers = self._tiers()
+        tier = model_tier_router.select(tiers)
+        retries = 0
+        while True:
+            model = tiers[tier]
+            estimated = self._estimate_tokens(messages, model)
+            await llm_limiter.acquire(self.agent_name, estimated)
+            started = time.perf_counter()
+            try:
+                result = await super()._agenerate(
+                    messages, stop=stop, run_manager=run_manager, **{**kwargs, "model": model}
+                )
+            except openai.APIError as e:
+                model_tier_router.record(model, time.perf_counter() - started, ok=False)
+                if isinstance(e, openai.RateLimitError):
+                    llm_limiter.penalize(self.agent_name, _retry_after(e))
+                if tier + 1 < len(tiers):
+                    logger.warning(f"{self.agent_name} call on {model} failed ({e}), retrying on {tiers[tier + 1]}")
+                    tier += 1
+                    continue
+                if not _retryable(e) or retries >= settings.LLM_MAX_RETRIES:
+                    raise
+                retries += 1
+                logger.warning(f"{self.agent_name} call on {model} failed ({e}), retry {retries}/{settings.LLM_MAX_RETRIES}")
+                if not isinstance(e, openai.RateLimitError):
+                    # 429는 limiter의 pause가 대기를 맡고, 나머지는 지수 backoff
+                    await asyncio.sleep(min(settings.LLM_RETRY_BACKOFF_SECONDS * 2 ** (retries - 1), 30))
+                continue
+            except (asyncio.CancelledError, Exception):
+                # deadline으로 취소되었거나 요청 전에 실패한 호출은 미리 차감한 몫을 되돌려 줌
+                llm_limiter.settle(estimated, 0, requested=False)
+                raise
+            model_tier_router.record(model, time.perf_counter() - started)
+            model_tier_router.record_served(self.agent_name, model, tier)
+            usage = (result.llm_output or {}).get("token_usage") or {}
+            llm_limiter.settle(estimated, usage.get("total_tokens", 0))
+            return result
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        # 이미 일부를 내보낸 stream은 다른 모델로 다시 보낼 수 없으므로 fallback 없이 선택된 모델만 사용
+        tiers = self._tiers()
+        tier = model_tier_router.select(tiers)
+        model = tiers[tier]
+        estimated = self._estimate_tokens(messages, model)
+        await llm_limiter.acquire(self.agent_name, estimated)
+        started = time.perf_counter()
+        used = 0
+        try:
+            async for chunk in super()._astream(
+                messages, stop=stop, run_manager=run_manager, **{**kwargs, "model": model}
+            ):
+                usage = getattr(chunk.message, "usage_metadata", None)
+                if usage:
+                    used += usage.get("total_tokens", 0)
+                yield chunk
+        except openai.APIError as e:
+            model_tier_router.record(model, time.perf_counter() - started, ok=False)
+            if isinstance(e, openai.RateLimitError):
+                llm_limiter.penalize(self.agent_name, _retry_after(e))
+            raise
+        except (asyncio.CancelledError, Exception):
+            llm_limiter.settle(estimated, 0, requested=False)
+            raise
+        model_tier_router.record(model, time.perf_counter() - started)
+        model_tier_router.record_served(self.agent_name, model, tier)
+        llm_limiter.settle(estimated, used)
+
+
+def create_chat_model(agent, **kwargs):
+    """
+    agent가 사용할 chat model을 만듭니다. agent별 token 사용량을 metrics에 기록합니다.
+    """
+    if _factory_override is not None:
+        return _factory_override(agent, **kwargs)
+    tiers = model_chain(agent)
+    # 재시도는 PooledChatOpenAI가 limiter를 거쳐 처리하므로 SDK 재시도는 기본으로 끔
+    kwargs.setdefault("max_retries", 0)
+    return PooledChatOpenAI(
+        agent_name=agent,
+        model=tiers[0],
+        model_tiers=tiers,
+        api_key=settings.OPENAI_API_KEY,
+        http_async_client=shared_http_client(),
+        callbacks=[TokenUsageCallback(agent)],
+        **kwargs,
+    )
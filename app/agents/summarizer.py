@@ -1,7 +1,6 @@
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
-from app.conf.config import settings
+from app.agents.llm import create_chat_model
 
 # app/agents/summarizer.py
 class SummaryFormat(BaseModel):
@@ -33,7 +32,17 @@ prompt_template = ChatPromptTemplate.from_messages(
     ]
 )
 
+def render_summary(summary):
+    """
+    SummaryFormat을 화면 표시용 markdown으로 만듭니다. 분석 결과는 graph 상태의 summary를 그대로 사용합니다.
+    """
+    return (
+        f"### Problem\n{summary.problem}\n\n"
+        f"### Root Cause\n{summary.cause}\n\n"
+        f"### Solution\n{summary.solution}"
+    )
+
 # Create summarizer agent
 def create_summarizer_agent():
-    model = ChatOpenAI(model=settings.LLM_MODEL, temperature=0)
+    model = create_chat_model("Summarizer", temperature=0)
     return prompt_template | model.with_structured_output(SummaryFormat)
\ No newline at end of file
@@ -1,7 +1,7 @@
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import List, Literal
+from app.agents.llm import create_chat_model
 from app.conf.config import settings
 
 # Supervisor data
@@ -13,6 +13,31 @@ class SupervisorRouteResponse(BaseModel):
     next: Literal[*options_for_next]
     instruction: str = Field(description="Instructions for the next agent")  # default 제거하고 Field로 변경
 
+# 병렬로 실행할 agent마다 맡을 부분을 따로 지시
+class ParallelAgentTask(BaseModel):
+    agent: Literal[*members]
+    instruction: str = Field(description="Instructions for this agent, covering only its part of the investigation")
+
+# 병렬 실행 모드(PARALLEL_AGENT_DISPATCH)에서만 사용하는 응답 모델
+class ParallelSupervisorRouteResponse(SupervisorRouteResponse):
+    parallel_agents: List[ParallelAgentTask] = Field(
+        default_factory=list,
+        description="Other agents that can investigate independent aspects of the alert at the same time as the next agent"
+    )
+
+# 지시사항 없이 병렬 실행된 agent에게 알려줄 조사 범위
+agent_areas = {
+    "GrafanaAgent": "metrics, dashboards and logs in Grafana",
+    "GithubAgent": "recent commits, pull requests and deployments in GitHub",
+    "WebSearchAgent": "known issues, release notes and documentation on the web",
+}
+
+def parallel_instruction(agent, instruction):
+    """
+    Supervisor가 agent별 지시사항을 주지 않았을 때, 공통 지시사항에 그 agent의 조사 범위를 덧붙입니다.
+    """
+    return f"{instruction}\n\nAs {agent}, investigate only {agent_areas[agent]}; other agents cover the rest.".strip()
+
 # Supervisor prompt
 system_prompt = """
 You are a supervisor coordinating an alert investigation using multiple specialized agents ({members}). Your role is to:
@@ -23,7 +48,7 @@ You are a supervisor coordinating an alert investigation using multiple speciali
 4. Proceed to SUMMARIZE only when sufficient concrete data has been collected
 
 When agents return with findings, evaluate if the investigation is complete or requires additional information. Direct follow-up queries as needed.
-
+{parallel_instructions}
 Agents must provide concrete evidence and actual execution results. If an agent returns generic advice without execution, instruct them to complete their investigation properly.
 
 Respond with SUMMARIZE when enough actual data has been collected to analyze the alert comprehensively.
@@ -38,7 +63,16 @@ prompt_template = ChatPromptTemplate.from_messages(
     ]
 ).partial(options=str(options_for_next), members=", ".join(members))
 
+parallel_instructions = """
+When several agents can investigate independent aspects of the alert at the same time (for example metrics in Grafana and recent changes in GitHub), choose one as the next agent and list the others in parallel_agents so they run concurrently. Give each parallel agent its own instruction covering only its part; the instruction field is for the next agent.
+"""
+
 # Create supervisor agent
 def create_supervisor_agent():
-    model = ChatOpenAI(model=settings.LLM_MODEL, temperature=0)
-    return prompt_template | model.with_structured_output(SupervisorRouteResponse)
\ No newline at end of file
+    model = create_chat_model("Supervisor", temperature=0)
+    # 병렬 실행이 꺼져 있으면 parallel_agents를 요청하지 않아 실행되지 않을 agent를 실행된 것으로 여기지 않게 함
+    if settings.PARALLEL_AGENT_DISPATCH:
+        prompt = prompt_template.partial(parallel_instructions=parallel_instructions)
+        return prompt | model.with_structured_output(ParallelSupervisorRouteResponse)
+    prompt = prompt_template.partial(parallel_instructions="")
+    return prompt | model.with_structured_output(SupervisorRouteResponse)
\ No newline at end of file
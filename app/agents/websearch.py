@@ -1,17 +1,21 @@
 from langchain_mcp_adapters.client import MultiServerMCPClient
-from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
 from pydantic import BaseModel, Field
 from langchain_tavily import TavilySearch
 import os
+from app.agents.llm import create_chat_model
 from app.conf.config import settings
+from app.services.search_cache import web_search_cache
 
 async def create_websearch_agent():
-    model = ChatOpenAI(model=settings.LLM_MODEL, api_key=settings.OPENAI_API_KEY)
+    model = create_chat_model("WebSearchAgent")
     
     # 도구를 리스트로 만들기'
     os.environ["TAVILY_API_KEY"] = settings.TAVILY_API_KEY
     tavily_tool = TavilySearch(max_results=10)
+    if settings.WEB_SEARCH_CACHE_ENABLED:
+        # 반복되는 검색어는 디스크 캐시에서 바로 반환
+        tavily_tool = web_search_cache.wrap(tavily_tool)
     tools = [tavily_tool]
     
     # 웹 검색 에이전트를 위한 시스템 프롬프트
@@ -1,40 +1,384 @@
+import asyncio
+import json
 from datetime import datetime, timezone
-from fastapi import BackgroundTasks, Request
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from sse_starlette.sse import EventSourceResponse
 from app.api.models import AnalysisResponse, HealthCheckResponse
+from app.conf.config import settings
 from app.conf.logging import logger
+from app.graph.router import alert_router
+from app.graph.workflow import graph_readiness, wait_for_graph
+from app.services.admission import AdmissionRejected, admission
+from app.services.checkpoints import investigation_checkpoints
 from app.services.alert_analyzer import analyze_alert
-from app.services.notification import send_email_alert
+from app.services.coalescer import alert_coalescer
+from app.services.github_snapshot import github_snapshot
+from app.services.incident_index import incident_index
+from app.services.jobs import analysis_jobs
+from app.services.llm_limiter import llm_limiter
+from app.services.mcp_pool import mcp_pool_stats
+from app.services.metrics import render_metrics
+from app.services.model_tiers import model_tier_router
+from app.services.notification import email_notifier, notification_outbox, send_email_alert
+from app.services.outbox import STATUSES as OUTBOX_STATUSES
+from app.services.result_cache import analysis_cache, analysis_cache_key
+from app.services.search_cache import web_search_cache
+from app.services.tool_cache import github_tool_cache, grafana_tool_cache
+from app.utils.alert import (
+    alert_fingerprint,
+    group_alerts,
+    group_fingerprint,
+    investigation_description,
+)
 
-async def handle_alert(request: Request, background_tasks: BackgroundTasks):
+async def handle_alert(request: Request):
     try:
         alert_data = await request.json()
+        alerts = alert_data.get("alerts") or [{}]
 
-        alert_description = (
-            alert_data.get("alerts", [{}])[0]
-            .get("annotations", {})
-            .get("description", "No description provided")
-        )
-        alert_summary = (
-            alert_data.get("alerts", [{}])[0]
-            .get("annotations", {})
-            .get("summary", "No summary provided")
+        logger.info(
+            f"Received {len(alerts)} alert(s) for group {alert_data.get('groupKey')}"
         )
 
-        logger.info(f"Received alert: {alert_summary} - {alert_description}")
+        fresh = _wants_fresh(request)
 
-        result = await analyze_alert(alert_description)
+        if _wants_async(request):
+            try:
+                # 비동기 모드에서는 낮은 severity도 거절하지 않고 slot이 빌 때까지 미룸
+                job = analysis_jobs.submit(
+                    lambda: _process_alerts(alert_data, send_email_alert, fresh, defer=True)
+                )
+            except asyncio.QueueFull:
+                logger.warning("Analysis queue is full, rejecting alert")
+                return JSONResponse(
+                    status_code=503,
+                    content={"status": "error", "message": "Analysis queue is full"},
+                )
+            logger.info(f"Analysis job {job.id} queued")
+            return JSONResponse(
+                status_code=202,
+                content={
+                    "status": "accepted",
+                    "job_id": job.id,
+                    "status_url": f"/analysis/{job.id}",
+                },
+            )
 
-        if result["status"] == "success" and "analysis" in result:
-            background_tasks.add_task(
-                send_email_alert, alert_description, result["analysis"]
+        # 그래프가 준비될 때까지 잠시 기다리고, 그래도 준비되지 않으면 거절
+        if not await wait_for_graph(settings.GRAPH_READY_TIMEOUT_SECONDS):
+            logger.warning(f"Workflow graph is not ready ({graph_readiness['status']}), rejecting alert")
+            return JSONResponse(
+                status_code=503,
+                content={
+                    "status": "error",
+                    "message": f"Analysis graph is not ready ({graph_readiness['status']})",
+                },
+                headers={"Retry-After": "10"},
             )
-            logger.info("Analysis completed and email notification queued")
 
+        # 메일은 outbox에 기록만 하고 전송은 dispatcher가 맡으므로 응답을 막지 않음
+        result = await _process_alerts(alert_data, send_email_alert, fresh)
+        if result["status"] == "rejected":
+            # 모두 shed된 경우 429, queue가 가득 찼거나 대기 시간이 초과된 경우 503
+            status_code = 429 if result["reason"] == "shed" else 503
+            return JSONResponse(
+                status_code=status_code,
+                content=result,
+                headers={"Retry-After": str(result["retry_after"])},
+            )
         return result
 
     except Exception as e:
         logger.error(f"Error processing alert: {e}", exc_info=True)
         return {"status": "error", "message": str(e)}
 
+def _wants_async(request: Request):
+    mode = request.query_params.get("mode")
+    if mode is not None:
+        return mode == "async"
+    if "respond-async" in request.headers.get("prefer", ""):
+        return True
+    return settings.ALERT_ASYNC_MODE
+
+def _wants_fresh(request: Request):
+    if request.query_params.get("fresh", "").lower() in ("1", "true", "yes"):
+        return True
+    return "no-cache" in request.headers.get("cache-control", "")
+
+async def handle_alert_stream(request: Request):
+    """
+    alert를 분석하면서 진행 상황을 Server-Sent Events로 보내고, 마지막에 AnalysisResponse를 보냅니다.
+    """
+    alert_data = await request.json()
+    alerts = alert_data.get("alerts") or [{}]
+    fresh = _wants_fresh(request)
+    logger.info(f"Streaming analysis of {len(alerts)} alert(s) for group {alert_data.get('groupKey')}")
+
+    if not await wait_for_graph(settings.GRAPH_READY_TIMEOUT_SECONDS):
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "error",
+                "message": f"Analysis graph is not ready ({graph_readiness['status']})",
+            },
+            headers={"Retry-After": "10"},
+        )
+
+    queue = asyncio.Queue()
+
+    def emit(event, data):
+        queue.put_nowait({"event": event, "data": json.dumps(data, default=str)})
+
+    # 클라이언트 연결이 끊겨도 분석은 끝까지 실행하여 캐시와 알림에 반영
+    task = asyncio.create_task(_process_alerts(alert_data, send_email_alert, fresh, emit))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    async def events():
+        yield {"event": "accepted", "data": json.dumps({"alerts": len(alerts)})}
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield item
+        try:
+            result = task.result()
+        except Exception as e:
+            logger.error(f"Error processing alert stream: {e}", exc_info=True)
+            result = {"status": "error", "message": str(e)}
+        yield {"event": "result", "data": AnalysisResponse(**result).model_dump_json()}
+
+    return EventSourceResponse(events(), ping=settings.SSE_PING_SECONDS)
+
+async def _process_alerts(alert_data, notify, fresh=False, emit=None, defer=False):
+    """
+    payload의 모든 alert를 조사 단위로 묶어 동시에 분석하고, alert별 결과 목록을 반환합니다.
+    emit(event, data)를 주면 조사별 진행 상황을 investigation 번호와 함께 전달합니다.
+    defer=True이면 admission control이 낮은 severity를 거절하지 않고 queue에서 기다리게 합니다.
+    """
+    alerts = alert_data.get("alerts") or [{}]
+    common_labels = alert_data.get("commonLabels")
+    groups = group_alerts(alerts, common_labels, merge=settings.ALERT_GROUP_MERGE)
+    semaphore = asyncio.Semaphore(settings.ALERT_FANOUT_CONCURRENCY)
+
+    async def investigate(position, indices):
+        group = [alerts[index] for index in indices]
+        description = investigation_description(group, common_labels)
+        summary = group[0].get("annotations", {}).get("summary", "No summary provided")
+        logger.info(f"Investigating {len(group)} alert(s): {summary} - {description}")
+
+        def _emit_for_investigation(event, data):
+            emit(event, {"investigation": position, **data})
+
+        investigation_emit = _emit_for_investigation if emit is not None else None
+        if investigation_emit is not None:
+            investigation_emit("investigation_started", {
+                "alerts": len(group), "summary": summary, "description": description,
+            })
+
+        labels = {**(common_labels or {}), **(group[0].get("labels") or {})}
+        async with semaphore:
+            result = await _analyze(
+                group_fingerprint(group),
+                description,
+                fresh,
+                labels,
+                group[0].get("annotations"),
+                investigation_emit,
+                defer,
+            )
+
+        if investigation_emit is not None:
+            investigation_emit("investigation_finished", {
+                "status": result["status"], "cached": result.get("cached", False),
+            })
+
+        if result["status"] == "success" and "analysis" in result:
+            await notify(description, result["analysis"])
+            logger.info("Analysis completed and email notification queued")
+        return result
+
+    investigations = await asyncio.gather(
+        *[investigate(position, indices) for position, indices in enumerate(groups)]
+    )
+
+    results = [None] * len(alerts)
+    for position, (indices, result) in enumerate(zip(groups, investigations)):
+        for index in indices:
+            annotations = alerts[index].get("annotations", {})
+            results[index] = {
+                "fingerprint": alert_fingerprint(alerts[index]),
+                "summary": annotations.get("summary"),
+                "description": annotations.get("description"),
+                "investigation": position,
+                "status": result["status"],
+                "analysis": result.get("analysis"),
+                "message": result.get("message"),
+                "routing": result.get("routing"),
+                "budget": result.get("budget"),
+                "similar_incident": result.get("similar_incident"),
+            }
+
+    if len(investigations) == 1:
+        return {**investigations[0], "results": results}
+
+    rejected = [result for result in investigations if result["status"] == "rejected"]
+    if len(rejected) == len(investigations):
+        reasons = {result["reason"] for result in rejected}
+        return {
+            "status": "rejected",
+            "reason": "shed" if reasons == {"shed"} else sorted(reasons - {"shed"})[0],
+            "message": f"{len(rejected)}/{len(investigations)} investigations rejected",
+            "retry_after": max(result["retry_after"] for result in rejected),
+            "results": results,
+        }
+
+    succeeded = [result for result in investigations if result["status"] == "success"]
+    if len(succeeded) == len(investigations):
+        status = "success"
+    elif succeeded:
+        status = "partial"
+    else:
+        status = "error"
+    return {
+        "status": status,
+        "analysis": succeeded[0].get("analysis") if succeeded else None,
+        "message": f"{len(succeeded)}/{len(investigations)} investigations succeeded",
+        "results": results,
+    }
+
+async def _analyze(
+    fingerprint, description, fresh=False, labels=None, annotations=None, emit=None, defer=False
+):
+    if not settings.ANALYSIS_CACHE_ENABLED:
+        return await _analyze_uncached(fingerprint, description, labels, annotations, fresh, emit, defer)
+
+    cache_key = analysis_cache_key(fingerprint)
+    if not fresh:
+        cached = await analysis_cache.aget(cache_key)
+        if cached is not None:
+            logger.info(f"Analysis cache hit for {fingerprint}")
+            return {**cached, "cached": True}
+
+    result = await _analyze_uncached(fingerprint, description, labels, annotations, fresh, emit, defer)
+    if result["status"] == "success" and "analysis" in result:
+        await analysis_cache.aset(cache_key, result)
+    return result
+
+async def _analyze_uncached(
+    fingerprint, description, labels=None, annotations=None, fresh=False, emit=None, defer=False
+):
+    # 같은 fingerprint의 분석이 이미 진행 중이면 그 결과를 함께 기다림
+    # (이 경우 진행 이벤트는 먼저 시작한 요청에만 전달됨)
+    return await alert_coalescer.run(
+        fingerprint,
+        lambda: _admit_and_analyze(fingerprint, description, labels, annotations, fresh, emit, defer),
+    )
+
+async def _admit_and_analyze(fingerprint, description, labels, annotations, fresh, emit, defer):
+    # 동시 분석 수를 제한하고, 포화 상태에서는 severity 순으로 기다리거나 거절됨
+    try:
+        async with admission.slot(labels, shed=not defer):
+            return await analyze_alert(
+                description, labels=labels, annotations=annotations, fresh=fresh, emit=emit,
+                fingerprint=fingerprint,
+            )
+    except AdmissionRejected as e:
+        return {
+            "status": "rejected",
+            "reason": e.reason,
+            "message": str(e),
+            "retry_after": e.retry_after,
+        }
+
+async def resume_interrupted_investigations():
+    """
+    이전 프로세스가 끝내지 못한 조사를 마지막 checkpoint부터 이어서 실행하고 결과를 알립니다.
+    """
+    if not settings.CHECKPOINT_ENABLED:
+        return
+    investigations = await investigation_checkpoints.interrupted()
+    if not investigations:
+        return
+    logger.info(f"Resuming {len(investigations)} interrupted investigation(s)")
+
+    async def resume(investigation):
+        try:
+            async with admission.slot(investigation["labels"], shed=False):
+                result = await analyze_alert(
+                    investigation["description"],
+                    labels=investigation["labels"],
+                    annotations=investigation["annotations"],
+                    fingerprint=investigation["fingerprint"],
+                    resume_thread=investigation["thread_id"],
+                )
+        except AdmissionRejected as e:
+            logger.warning(f"Could not resume investigation {investigation['thread_id']}: {e}")
+            return
+        if result["status"] == "success" and "analysis" in result:
+            if settings.ANALYSIS_CACHE_ENABLED and investigation["fingerprint"]:
+                await analysis_cache.aset(analysis_cache_key(investigation["fingerprint"]), result)
+            await send_email_alert(investigation["description"], result["analysis"])
+
+    await asyncio.gather(*[resume(investigation) for investigation in investigations])
+
+def get_analysis(job_id: str):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Analysis job {job_id} not found")
+    return job.to_dict()
+
+async def wait_analysis(job_id: str, timeout: float = 30.0):
+    job = await analysis_jobs.wait(job_id, timeout=max(0.0, min(timeout, 300.0)))
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Analysis job {job_id} not found")
+    return job.to_dict()
+
+def list_outbox(status: str = None, limit: int = 50):
+    """
+    outbox의 메시지를 조회합니다. status를 주지 않으면 아직 전송되지 않은 메시지를 반환합니다.
+    """
+    if status is not None and status not in OUTBOX_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(OUTBOX_STATUSES)}")
+    return {
+        "stats": notification_outbox.stats(),
+        "messages": notification_outbox.list_messages(status, max(1, min(limit, 500))),
+    }
+
+async def retry_outbox_message(message_id: int):
+    if not await notification_outbox.retry(message_id):
+        raise HTTPException(
+            status_code=404, detail=f"No pending or dead outbox message {message_id}"
+        )
+    return {"status": "pending", "id": message_id}
+
 def health_check():
-    return {"status": "ok", "timestamp": datetime.now(timezone.utc).isoformat()}
\ No newline at end of file
+    return {"status": "ok", "timestamp": datetime.now(timezone.utc).isoformat()}
+
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+def readiness_check():
+    status_code = 200 if graph_readiness["status"] == "ready" else 503
+    return JSONResponse(status_code=status_code, content=graph_readiness)
+
+def get_stats():
+    return {
+        "coalescing": alert_coalescer.stats(),
+        "jobs": analysis_jobs.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "mcp_pools": mcp_pool_stats(),
+        "grafana_tool_cache": grafana_tool_cache.stats(),
+        "github_tool_cache": github_tool_cache.stats(),
+        "github_snapshot": github_snapshot.stats(),
+        "web_search_cache": web_search_cache.stats(),
+        "routing": alert_router.stats(),
+        "incident_index": incident_index.stats(),
+        "admission": admission.stats(),
+        "email": email_notifier.stats(),
+        "outbox": notification_outbox.stats(),
+        "checkpoints": investigation_checkpoints.stats(),
+        "llm": llm_limiter.stats(),
+        "llm_models": model_tier_router.stats(),
+    }
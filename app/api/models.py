@@ -40,11 +40,65 @@ class AnalysisResult(BaseModel):
     solution: str = Field(description="Solution to the Problem")
 
 
+class RoutingSummary(BaseModel):
+    rule: Optional[str] = Field(default=None, description="Routing rule that planned the first hops, if any")
+    llm_calls_saved: int = 0
+    latency_saved_seconds: float = 0.0
+
+
+class BudgetSummary(BaseModel):
+    deadline_seconds: Optional[float] = Field(default=None, description="Wall-clock limit of the analysis")
+    elapsed_seconds: float = 0.0
+    token_budget: Optional[int] = None
+    tokens_used: int = 0
+    exhausted: Optional[str] = Field(default=None, description="'deadline' or 'tokens' if the budget cut the analysis short")
+
+
+class SimilarIncident(BaseModel):
+    incident_id: int
+    similarity: float = Field(description="Estimated Jaccard similarity to the past incident")
+    created_at: float
+    reused: bool = Field(description="Whether the past analysis was returned without investigating")
+
+
+class AlertAnalysisResult(BaseModel):
+    fingerprint: str
+    summary: Optional[str] = None
+    description: Optional[str] = None
+    investigation: int = Field(description="Index of the investigation this alert was analysed in")
+    status: str
+    analysis: Optional[AnalysisResult] = None
+    message: Optional[str] = None
+    routing: Optional[RoutingSummary] = None
+    budget: Optional[BudgetSummary] = None
+    similar_incident: Optional[SimilarIncident] = None
+
+
 class AnalysisResponse(BaseModel):
     status: str
     analysis: Optional[AnalysisResult] = None
     raw_response: Optional[str] = None
     message: Optional[str] = None
+    cached: bool = False
+    routing: Optional[RoutingSummary] = None
+    budget: Optional[BudgetSummary] = None
+    similar_incident: Optional[SimilarIncident] = None
+    results: Optional[List[AlertAnalysisResult]] = None
+
+
+class JobAcceptedResponse(BaseModel):
+    status: str
+    job_id: str
+    status_url: str
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[AnalysisResponse] = None
 
 
 class HealthCheckResponse(BaseModel):
@@ -9,17 +9,6 @@ import agentops
 
 load_dotenv()
 
-import operator
-from typing import Sequence, Annotated
-from typing_extensions import TypedDict
-
-from langchain_core.messages import BaseMessage
-
-# 상태 정의
-class AgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], operator.add]  # 메시지
-    next: str  # 다음으로 라우팅할 에이전트
-
 class Settings(BaseSettings):
     OPENAI_API_KEY: str = Field(
         default=os.getenv("OPENAI_API_KEY", ""),
@@ -81,6 +70,427 @@ class Settings(BaseSettings):
         default=os.getenv("AGENTOPS_API_KEY", ""),
         description="AgentOps API Key"
     )
+    ALERT_ASYNC_MODE: bool = Field(
+        default=os.getenv("ALERT_ASYNC_MODE", "false").lower() == "true",
+        description="Return 202 with a job id from /alert instead of waiting for the analysis"
+    )
+    ANALYSIS_WORKERS: int = Field(
+        default=int(os.getenv("ANALYSIS_WORKERS", "4")),
+        description="Number of asyncio workers draining the analysis job queue"
+    )
+    ANALYSIS_QUEUE_SIZE: int = Field(
+        default=int(os.getenv("ANALYSIS_QUEUE_SIZE", "100")),
+        description="Maximum number of queued analysis jobs"
+    )
+    ANALYSIS_JOB_RETENTION_SECONDS: int = Field(
+        default=int(os.getenv("ANALYSIS_JOB_RETENTION_SECONDS", "3600")),
+        description="How long finished job results are kept for polling"
+    )
+    ALERT_FANOUT_CONCURRENCY: int = Field(
+        default=int(os.getenv("ALERT_FANOUT_CONCURRENCY", "4")),
+        description="Maximum concurrent investigations per webhook payload"
+    )
+    ALERT_GROUP_MERGE: bool = Field(
+        default=os.getenv("ALERT_GROUP_MERGE", "true").lower() == "true",
+        description="Merge alerts of the same rule and symptom into one investigation"
+    )
+    ANALYSIS_CACHE_ENABLED: bool = Field(
+        default=os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true",
+        description="Serve recurring alerts from the persistent analysis cache"
+    )
+    ANALYSIS_CACHE_PATH: str = Field(
+        default=os.getenv("ANALYSIS_CACHE_PATH", "data/analysis_cache.db"),
+        description="SQLite file of the analysis cache"
+    )
+    ANALYSIS_CACHE_TTL_SECONDS: int = Field(
+        default=int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "21600")),
+        description="Time to live of a cached analysis"
+    )
+    ANALYSIS_CACHE_BUCKET_SECONDS: int = Field(
+        default=int(os.getenv("ANALYSIS_CACHE_BUCKET_SECONDS", "21600")),
+        description="Time bucket that is part of the analysis cache key"
+    )
+    ANALYSIS_CACHE_MAX_ENTRIES: int = Field(
+        default=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "1000")),
+        description="Maximum number of cached analyses before LRU eviction"
+    )
+    PARALLEL_AGENT_DISPATCH: bool = Field(
+        default=os.getenv("PARALLEL_AGENT_DISPATCH", "false").lower() == "true",
+        description="Let the supervisor dispatch several specialist agents concurrently"
+    )
+    AGENT_CONTEXT_TOKEN_BUDGET: int = Field(
+        default=int(os.getenv("AGENT_CONTEXT_TOKEN_BUDGET", "6000")),
+        description="Token budget of each specialist agent input (0 disables windowing)"
+    )
+    CONTEXT_DIGEST_TOKENS: int = Field(
+        default=int(os.getenv("CONTEXT_DIGEST_TOKENS", "800")),
+        description="Maximum tokens kept from each earlier agent output in agent inputs"
+    )
+    SUMMARIZER_CONTEXT_TOKEN_BUDGET: int = Field(
+        default=int(os.getenv("SUMMARIZER_CONTEXT_TOKEN_BUDGET", "16000")),
+        description="Token budget of the summarizer input (0 disables windowing)"
+    )
+    SUMMARIZER_DIGEST_TOKENS: int = Field(
+        default=int(os.getenv("SUMMARIZER_DIGEST_TOKENS", "3000")),
+        description="Maximum tokens kept from each agent output in the summarizer input"
+    )
+    GRAFANA_MCP_COMMAND: str = Field(
+        default=os.getenv("GRAFANA_MCP_COMMAND", "/app/mcp-grafana"),
+        description="Command that starts the Grafana MCP server over stdio"
+    )
+    GITHUB_MCP_COMMAND: str = Field(
+        default=os.getenv("GITHUB_MCP_COMMAND", "/app/github-mcp-server"),
+        description="Command that starts the GitHub MCP server over stdio"
+    )
+    MCP_POOL_SIZE: int = Field(
+        default=int(os.getenv("MCP_POOL_SIZE", "2")),
+        description="Number of warm MCP server subprocesses per server"
+    )
+    MCP_PING_INTERVAL_SECONDS: float = Field(
+        default=float(os.getenv("MCP_PING_INTERVAL_SECONDS", "30")),
+        description="Interval between MCP server liveness pings"
+    )
+    MCP_PING_TIMEOUT_SECONDS: float = Field(
+        default=float(os.getenv("MCP_PING_TIMEOUT_SECONDS", "10")),
+        description="Time an MCP server has to answer a ping before it is restarted"
+    )
+    GRAPH_READY_TIMEOUT_SECONDS: float = Field(
+        default=float(os.getenv("GRAPH_READY_TIMEOUT_SECONDS", "30")),
+        description="How long /alert holds a request while the workflow graph warms up"
+    )
+    GRAPH_WARMUP_RETRY_SECONDS: float = Field(
+        default=float(os.getenv("GRAPH_WARMUP_RETRY_SECONDS", "30")),
+        description="Delay before a failed startup warm-up of the workflow graph is retried"
+    )
+    GRAFANA_TOOL_CACHE_ENABLED: bool = Field(
+        default=os.getenv("GRAFANA_TOOL_CACHE_ENABLED", "true").lower() == "true",
+        description="Cache Grafana MCP tool results"
+    )
+    GRAFANA_TOOL_CACHE_TTLS: str = Field(
+        default=os.getenv(
+            "GRAFANA_TOOL_CACHE_TTLS",
+            "query_*=30,*dashboard*=600,*alert_rule*=300,*datasource*=3600,list_*=300",
+        ),
+        description="Per-tool TTLs in seconds as comma separated pattern=seconds (first match wins)"
+    )
+    GRAFANA_TOOL_CACHE_DEFAULT_TTL: float = Field(
+        default=float(os.getenv("GRAFANA_TOOL_CACHE_DEFAULT_TTL", "60")),
+        description="TTL in seconds of Grafana tools without a matching rule"
+    )
+    GRAFANA_TOOL_CACHE_TIME_STEP_SECONDS: int = Field(
+        default=int(os.getenv("GRAFANA_TOOL_CACHE_TIME_STEP_SECONDS", "60")),
+        description="Step that time range arguments are snapped to (0 disables snapping)"
+    )
+    GRAFANA_TOOL_CACHE_MAX_ENTRIES: int = Field(
+        default=int(os.getenv("GRAFANA_TOOL_CACHE_MAX_ENTRIES", "1000")),
+        description="Maximum number of cached Grafana tool results"
+    )
+    GITHUB_API_URL: str = Field(
+        default=os.getenv("GITHUB_API_URL", "https://api.github.com"),
+        description="GitHub REST API base URL"
+    )
+    GITHUB_TOOL_CACHE_ENABLED: bool = Field(
+        default=os.getenv("GITHUB_TOOL_CACHE_ENABLED", "true").lower() == "true",
+        description="Cache GitHub MCP tool results for the configured repository"
+    )
+    GITHUB_TOOL_CACHE_TTLS: str = Field(
+        default=os.getenv(
+            "GITHUB_TOOL_CACHE_TTLS",
+            "get_file_contents=900,get_commit=3600,list_*=300,search_*=300,get_*=300",
+        ),
+        description="Per-tool TTLs in seconds as comma separated pattern=seconds (first match wins)"
+    )
+    GITHUB_TOOL_CACHE_DEFAULT_TTL: float = Field(
+        default=float(os.getenv("GITHUB_TOOL_CACHE_DEFAULT_TTL", "0")),
+        description="TTL in seconds of GitHub tools without a matching rule (0 disables caching)"
+    )
+    GITHUB_TOOL_CACHE_MAX_ENTRIES: int = Field(
+        default=int(os.getenv("GITHUB_TOOL_CACHE_MAX_ENTRIES", "1000")),
+        description="Maximum number of cached GitHub tool results"
+    )
+    GITHUB_SNAPSHOT_ENABLED: bool = Field(
+        default=os.getenv("GITHUB_SNAPSHOT_ENABLED", "true").lower() == "true",
+        description="Keep a periodically refreshed snapshot of recent commits, issues and PRs"
+    )
+    GITHUB_SNAPSHOT_REFRESH_SECONDS: int = Field(
+        default=int(os.getenv("GITHUB_SNAPSHOT_REFRESH_SECONDS", "300")),
+        description="Refresh interval of the GitHub repository snapshot"
+    )
+    GITHUB_SNAPSHOT_LIMIT: int = Field(
+        default=int(os.getenv("GITHUB_SNAPSHOT_LIMIT", "50")),
+        description="Number of commits, issues and PRs kept in the snapshot"
+    )
+    WEB_SEARCH_CACHE_ENABLED: bool = Field(
+        default=os.getenv("WEB_SEARCH_CACHE_ENABLED", "true").lower() == "true",
+        description="Serve repeated web searches from the persistent search cache"
+    )
+    WEB_SEARCH_CACHE_PATH: str = Field(
+        default=os.getenv("WEB_SEARCH_CACHE_PATH", "data/web_search_cache.db"),
+        description="SQLite file of the web search cache"
+    )
+    WEB_SEARCH_CACHE_TTL_SECONDS: int = Field(
+        default=int(os.getenv("WEB_SEARCH_CACHE_TTL_SECONDS", "604800")),
+        description="Time to live of a cached web search result"
+    )
+    WEB_SEARCH_CACHE_MAX_ENTRIES: int = Field(
+        default=int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "5000")),
+        description="Maximum number of cached web search results before LRU eviction"
+    )
+    ALERT_ROUTING_RULES: str = Field(
+        default=os.getenv(
+            "ALERT_ROUTING_RULES",
+            '[{"name": "infrastructure-metrics", '
+            '"match": {"alertname": "*cpu*|*mem*|*disk*|*load*|*latency*|*network*|*oom*"}, '
+            '"plan": ["GrafanaAgent"]}, '
+            '{"name": "deployment", "match": {"alertname": "*deploy*|*release*|*rollout*"}, '
+            '"plan": ["GithubAgent", "GrafanaAgent"]}]',
+        ),
+        description="JSON list of routing rules ({name, match, plan, instruction}) applied before the Supervisor LLM"
+    )
+    INCIDENT_INDEX_ENABLED: bool = Field(
+        default=os.getenv("INCIDENT_INDEX_ENABLED", "true").lower() == "true",
+        description="Look up similar past incidents before starting an investigation"
+    )
+    INCIDENT_INDEX_PATH: str = Field(
+        default=os.getenv("INCIDENT_INDEX_PATH", "data/incident_index.db"),
+        description="SQLite file of the similar incident index"
+    )
+    INCIDENT_INDEX_PERMUTATIONS: int = Field(
+        default=int(os.getenv("INCIDENT_INDEX_PERMUTATIONS", "64")),
+        description="Number of MinHash permutations per incident signature"
+    )
+    INCIDENT_INDEX_MAX_ENTRIES: int = Field(
+        default=int(os.getenv("INCIDENT_INDEX_MAX_ENTRIES", "50000")),
+        description="Incidents kept in the index; the oldest are removed beyond this (0 disables)"
+    )
+    INCIDENT_INDEX_MAX_AGE_SECONDS: int = Field(
+        default=int(os.getenv("INCIDENT_INDEX_MAX_AGE_SECONDS", "7776000")),
+        description="Incidents older than this are removed from the index (0 disables)"
+    )
+    INCIDENT_REUSE_THRESHOLD: float = Field(
+        default=float(os.getenv("INCIDENT_REUSE_THRESHOLD", "0.9")),
+        description="Similarity at or above which a past analysis is returned without investigating"
+    )
+    INCIDENT_CONTEXT_THRESHOLD: float = Field(
+        default=float(os.getenv("INCIDENT_CONTEXT_THRESHOLD", "0.5")),
+        description="Similarity at or above which a past analysis is given to the agents as context"
+    )
+    SSE_PING_SECONDS: int = Field(
+        default=int(os.getenv("SSE_PING_SECONDS", "15")),
+        description="Keep-alive ping interval of the alert stream endpoint"
+    )
+    ADMISSION_MAX_CONCURRENT: int = Field(
+        default=int(os.getenv("ADMISSION_MAX_CONCURRENT", "4")),
+        description="Maximum number of analyses running the workflow graph at the same time"
+    )
+    ADMISSION_QUEUE_SIZE: int = Field(
+        default=int(os.getenv("ADMISSION_QUEUE_SIZE", "50")),
+        description="Maximum number of analyses waiting for a slot, ordered by severity"
+    )
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = Field(
+        default=float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "300")),
+        description="Maximum time an analysis waits for a slot before it is rejected"
+    )
+    ADMISSION_SEVERITY_ORDER: str = Field(
+        default=os.getenv("ADMISSION_SEVERITY_ORDER", "critical,high,error,warning,low,info,none"),
+        description="Comma separated severity label values from highest to lowest priority"
+    )
+    ADMISSION_DEFAULT_SEVERITY: str = Field(
+        default=os.getenv("ADMISSION_DEFAULT_SEVERITY", "warning"),
+        description="Severity assumed for alerts without a known severity label"
+    )
+    ADMISSION_SHED_SEVERITY: str = Field(
+        default=os.getenv("ADMISSION_SHED_SEVERITY", "low"),
+        description="Alerts of this severity or lower are rejected with 429 while all slots are busy"
+    )
+    ADMISSION_RETRY_AFTER_SECONDS: int = Field(
+        default=int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "60")),
+        description="Retry-After returned with rejected alerts"
+    )
+    SMTP_POOL_SIZE: int = Field(
+        default=int(os.getenv("SMTP_POOL_SIZE", "2")),
+        description="Number of persistent SMTP connections used by the email worker"
+    )
+    SMTP_TIMEOUT_SECONDS: float = Field(
+        default=float(os.getenv("SMTP_TIMEOUT_SECONDS", "30")),
+        description="Timeout of a single SMTP command"
+    )
+    SMTP_IDLE_CHECK_SECONDS: float = Field(
+        default=float(os.getenv("SMTP_IDLE_CHECK_SECONDS", "60")),
+        description="Connections idle longer than this are checked with NOOP before reuse"
+    )
+    EMAIL_QUEUE_SIZE: int = Field(
+        default=int(os.getenv("EMAIL_QUEUE_SIZE", "1000")),
+        description="Maximum number of emails waiting for delivery"
+    )
+    EMAIL_DIGEST_WINDOW_SECONDS: float = Field(
+        default=float(os.getenv("EMAIL_DIGEST_WINDOW_SECONDS", "0")),
+        description="Batch analyses produced within this window into one email per recipient list (0 disables)"
+    )
+    EMAIL_DIGEST_MAX_ALERTS: int = Field(
+        default=int(os.getenv("EMAIL_DIGEST_MAX_ALERTS", "50")),
+        description="Maximum number of analyses in one digest email"
+    )
+    NOTIFICATION_OUTBOX_PATH: str = Field(
+        default=os.getenv("NOTIFICATION_OUTBOX_PATH", "data/notification_outbox.db"),
+        description="SQLite file of the durable notification outbox"
+    )
+    OUTBOX_COMMIT_WINDOW_MS: float = Field(
+        default=float(os.getenv("OUTBOX_COMMIT_WINDOW_MS", "10")),
+        description="Notifications written within this window are committed in one transaction"
+    )
+    OUTBOX_COMMIT_MAX: int = Field(
+        default=int(os.getenv("OUTBOX_COMMIT_MAX", "100")),
+        description="Maximum number of notifications per outbox commit"
+    )
+    OUTBOX_MAX_ATTEMPTS: int = Field(
+        default=int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8")),
+        description="Delivery attempts before a notification is marked dead"
+    )
+    OUTBOX_BACKOFF_BASE_SECONDS: float = Field(
+        default=float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", "5")),
+        description="Delay before the first retry, doubled on every further failure"
+    )
+    OUTBOX_BACKOFF_MAX_SECONDS: float = Field(
+        default=float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "900")),
+        description="Maximum delay between delivery attempts"
+    )
+    OUTBOX_DEDUP_SECONDS: float = Field(
+        default=float(os.getenv("OUTBOX_DEDUP_SECONDS", "3600")),
+        description="Identical notifications written within this period are stored only once"
+    )
+    OUTBOX_POLL_SECONDS: float = Field(
+        default=float(os.getenv("OUTBOX_POLL_SECONDS", "2")),
+        description="Interval at which the dispatcher looks for due retries"
+    )
+    OUTBOX_RETENTION_SECONDS: int = Field(
+        default=int(os.getenv("OUTBOX_RETENTION_SECONDS", "604800")),
+        description="How long delivered notifications are kept in the outbox"
+    )
+    OUTBOX_SENDING_TIMEOUT_SECONDS: float = Field(
+        default=float(os.getenv("OUTBOX_SENDING_TIMEOUT_SECONDS", "600")),
+        description="Messages left in sending without a recorded result for this long are sent again"
+    )
+    CHECKPOINT_ENABLED: bool = Field(
+        default=os.getenv("CHECKPOINT_ENABLED", "true").lower() == "true",
+        description="Checkpoint every workflow step so interrupted investigations resume on startup"
+    )
+    CHECKPOINT_PATH: str = Field(
+        default=os.getenv("CHECKPOINT_PATH", "data/checkpoints.db"),
+        description="SQLite file of the workflow graph checkpoints"
+    )
+    CHECKPOINT_RETENTION_SECONDS: int = Field(
+        default=int(os.getenv("CHECKPOINT_RETENTION_SECONDS", "86400")),
+        description="Investigations older than this are neither resumed nor kept"
+    )
+    CHECKPOINT_SWEEP_INTERVAL_SECONDS: float = Field(
+        default=float(os.getenv("CHECKPOINT_SWEEP_INTERVAL_SECONDS", "3600")),
+        description="Interval of the checkpoint retention sweep"
+    )
+    ANALYSIS_DEADLINE_SECONDS: float = Field(
+        default=float(os.getenv("ANALYSIS_DEADLINE_SECONDS", "300")),
+        description="Wall-clock deadline of one analysis (0 disables)"
+    )
+    ANALYSIS_TOKEN_BUDGET: int = Field(
+        default=int(os.getenv("ANALYSIS_TOKEN_BUDGET", "150000")),
+        description="Prompt + completion tokens one analysis may use (0 disables)"
+    )
+    ANALYSIS_BUDGETS: str = Field(
+        default=os.getenv(
+            "ANALYSIS_BUDGETS",
+            '{"critical": {"deadline_seconds": 600, "token_budget": 300000}, '
+            '"info": {"deadline_seconds": 120, "token_budget": 50000}}',
+        ),
+        description="JSON object of per-severity deadline_seconds / token_budget overrides"
+    )
+    BUDGET_SUMMARY_RESERVE: float = Field(
+        default=float(os.getenv("BUDGET_SUMMARY_RESERVE", "0.15")),
+        description="Share of the deadline and token budget kept for the Summarizer"
+    )
+    ANALYSIS_MAX_ITERATIONS: int = Field(
+        default=int(os.getenv("ANALYSIS_MAX_ITERATIONS", "30")),
+        description="Backstop on Supervisor iterations, set well above what the budget allows (0 disables it)"
+    )
+    LLM_RPM_LIMIT: int = Field(
+        default=int(os.getenv("LLM_RPM_LIMIT", "500")),
+        description="OpenAI requests per minute shared by every agent (0 disables)"
+    )
+    LLM_TPM_LIMIT: int = Field(
+        default=int(os.getenv("LLM_TPM_LIMIT", "200000")),
+        description="OpenAI tokens per minute shared by every agent (0 disables)"
+    )
+    LLM_COMPLETION_TOKEN_ESTIMATE: int = Field(
+        default=int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "1024")),
+        description="Completion tokens reserved per call when the model has no max_tokens"
+    )
+    LLM_PRIORITY_ORDER: str = Field(
+        default=os.getenv("LLM_PRIORITY_ORDER", "Summarizer,Supervisor,GrafanaAgent,GithubAgent,WebSearchAgent"),
+        description="Agents from highest to lowest priority when LLM calls wait for rate limit capacity"
+    )
+    LLM_RATE_LIMIT_PAUSE_SECONDS: float = Field(
+        default=float(os.getenv("LLM_RATE_LIMIT_PAUSE_SECONDS", "10")),
+        description="Pause of all LLM calls after OpenAI answers 429"
+    )
+    LLM_MAX_RETRIES: int = Field(
+        default=int(os.getenv("LLM_MAX_RETRIES", "2")),
+        description="Retries of a failed LLM call on the last model of the chain, each through the rate limiter"
+    )
+    LLM_RETRY_BACKOFF_SECONDS: float = Field(
+        default=float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "1")),
+        description="Base of the exponential backoff between LLM retries after 5xx / connection errors"
+    )
+    LLM_MAX_CONNECTIONS: int = Field(
+        default=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+        description="Connections of the shared OpenAI HTTP pool"
+    )
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = Field(
+        default=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10")),
+        description="Idle keep-alive connections kept in the shared OpenAI HTTP pool"
+    )
+    LLM_KEEPALIVE_SECONDS: float = Field(
+        default=float(os.getenv("LLM_KEEPALIVE_SECONDS", "60")),
+        description="Idle time after which a pooled OpenAI connection is closed"
+    )
+    LLM_TIMEOUT_SECONDS: float = Field(
+        default=float(os.getenv("LLM_TIMEOUT_SECONDS", "120")),
+        description="Timeout of one OpenAI HTTP request"
+    )
+    SUPERVISOR_MODEL: str = Field(
+        default=os.getenv("SUPERVISOR_MODEL", os.getenv("LLM_MODEL", "gpt-4o-mini")),
+        description="Models of the Supervisor, primary first and comma-separated faster fallbacks after"
+    )
+    GRAFANA_AGENT_MODEL: str = Field(
+        default=os.getenv("GRAFANA_AGENT_MODEL", os.getenv("LLM_MODEL", "gpt-4o-mini")),
+        description="Models of the GrafanaAgent, primary first and comma-separated faster fallbacks after"
+    )
+    GITHUB_AGENT_MODEL: str = Field(
+        default=os.getenv("GITHUB_AGENT_MODEL", os.getenv("LLM_MODEL", "gpt-4o-mini")),
+        description="Models of the GithubAgent, primary first and comma-separated faster fallbacks after"
+    )
+    WEBSEARCH_AGENT_MODEL: str = Field(
+        default=os.getenv("WEBSEARCH_AGENT_MODEL", os.getenv("LLM_MODEL", "gpt-4o-mini")),
+        description="Models of the WebSearchAgent, primary first and comma-separated faster fallbacks after"
+    )
+    SUMMARIZER_MODEL: str = Field(
+        default=os.getenv("SUMMARIZER_MODEL", os.getenv("LLM_MODEL", "gpt-4o-mini")),
+        description="Models of the Summarizer, primary first and comma-separated faster fallbacks after"
+    )
+    LLM_FALLBACK_P95_SECONDS: float = Field(
+        default=float(os.getenv("LLM_FALLBACK_P95_SECONDS", "30")),
+        description="Rolling p95 call latency above which a model falls back to the next tier"
+    )
+    LLM_FALLBACK_ERROR_RATE: float = Field(
+        default=float(os.getenv("LLM_FALLBACK_ERROR_RATE", "0.2")),
+        description="Rolling error rate above which a model falls back to the next tier"
+    )
+    LLM_FALLBACK_WINDOW_SECONDS: float = Field(
+        default=float(os.getenv("LLM_FALLBACK_WINDOW_SECONDS", "300")),
+        description="Window of the latency and error statistics per model"
+    )
+    LLM_FALLBACK_MIN_SAMPLES: int = Field(
+        default=int(os.getenv("LLM_FALLBACK_MIN_SAMPLES", "10")),
+        description="Calls in the window needed before a model can fall back"
+    )
     model_config = SettingsConfigDict(
         env_file=".env",
         extra="ignore"
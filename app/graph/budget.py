@@ -0,0 +1,157 @@
+"""
+Analysis Deadline and Token Budget
+"""
+
+import json
+import time
+from typing import Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from pydantic import BaseModel, Field
+
+from app.conf.config import settings
+from app.services.metrics import llm_usage
+
+
+class BudgetLimits(BaseModel):
+    deadline_seconds: Optional[float] = Field(default=None, description="Wall-clock limit of one analysis")
+    token_budget: Optional[int] = Field(default=None, description="Prompt + completion tokens of one analysis")
+
+
+def parse_budgets(spec):
+    """
+    severity label -> BudgetLimits JSON 객체를 파싱합니다. 예: {"critical": {"deadline_seconds": 600}}
+    """
+    if not spec:
+        return {}
+    return {severity.lower(): BudgetLimits(**limits) for severity, limits in json.loads(spec).items()}
+
+
+def resolve_budget(labels=None, now=None, overrides: Optional[Dict[str, BudgetLimits]] = None):
+    """
+    alert의 severity에 맞는 deadline(epoch 초)과 token budget을 초기 상태 값으로 반환합니다.
+    severity별 설정에 없는 값은 전역 설정을 사용합니다.
+    """
+    now = time.time() if now is None else now
+    overrides = severity_budgets if overrides is None else overrides
+    severity = str((labels or {}).get("severity", "")).lower()
+    limits = overrides.get(severity) or BudgetLimits()
+    deadline_seconds = limits.deadline_seconds or settings.ANALYSIS_DEADLINE_SECONDS
+    token_budget = limits.token_budget or settings.ANALYSIS_TOKEN_BUDGET
+    return {
+        "started_at": now,
+        "deadline": now + deadline_seconds if deadline_seconds > 0 else 0.0,
+        "token_budget": token_budget if token_budget > 0 else 0,
+        "tokens_used": 0,
+    }
+
+
+def resume_budget(state, paused_at, now=None):
+    """
+    중단된 조사를 재개할 때 멈춰 있던 시간만큼 started_at과 deadline을 뒤로 미룬 값을 반환합니다.
+    재시작 동안의 downtime이 분석 시간으로 계산되지 않습니다.
+    """
+    downtime = max(0.0, (time.time() if now is None else now) - paused_at)
+    if not state.get("started_at") or not downtime:
+        return {}
+    shifted = {"started_at": state["started_at"] + downtime}
+    if state.get("deadline"):
+        shifted["deadline"] = state["deadline"] + downtime
+    return shifted
+
+
+def remaining_seconds(state, now=None):
+    deadline = state.get("deadline")
+    if not deadline:
+        return None
+    return deadline - (time.time() if now is None else now)
+
+
+def remaining_tokens(state):
+    token_budget = state.get("token_budget")
+    if not token_budget:
+        return None
+    return token_budget - state.get("tokens_used", 0)
+
+
+def exhausted(state, now=None):
+    """
+    남은 시간이나 token이 요약에 필요한 몫(BUDGET_SUMMARY_RESERVE) 이하로 줄었으면 그 이유를 반환합니다.
+    """
+    reserve = settings.BUDGET_SUMMARY_RESERVE
+    seconds = remaining_seconds(state, now)
+    if seconds is not None and seconds <= (state["deadline"] - state["started_at"]) * reserve:
+        return "deadline"
+    tokens = remaining_tokens(state)
+    if tokens is not None and tokens <= state["token_budget"] * reserve:
+        return "tokens"
+    return None
+
+
+def agent_timeout(state, now=None):
+    """
+    agent 호출에 허용할 시간. 요약에 필요한 몫을 남기고 deadline이 지나면 호출이 취소됩니다.
+    """
+    seconds = remaining_seconds(state, now)
+    if seconds is None:
+        return None
+    reserve = (state["deadline"] - state["started_at"]) * settings.BUDGET_SUMMARY_RESERVE
+    return max(0.0, seconds - reserve)
+
+
+def budget_note(state, now=None):
+    """
+    agent에게 전달할 남은 budget 안내 문구. budget이 없으면 빈 문자열입니다.
+    """
+    parts = []
+    seconds = agent_timeout(state, now)
+    if seconds is not None:
+        parts.append(f"~{int(seconds)}s")
+    tokens = remaining_tokens(state)
+    if tokens is not None:
+        parts.append(f"~{max(0, tokens)} tokens")
+    if not parts:
+        return ""
+    return f"Remaining budget: {', '.join(parts)}. Prioritise the checks most likely to explain the alert."
+
+
+def budget_summary(state, exhausted_reason=None, now=None):
+    now = time.time() if now is None else now
+    started_at = state.get("started_at") or now
+    return {
+        "deadline_seconds": round(state["deadline"] - started_at, 3) if state.get("deadline") else None,
+        "elapsed_seconds": round(now - started_at, 3),
+        "token_budget": state.get("token_budget") or None,
+        "tokens_used": state.get("tokens_used", 0),
+        "exhausted": exhausted_reason or state.get("budget_exhausted") or None,
+    }
+
+
+def graph_recursion_limit(max_iterations=None):
+    """
+    Supervisor 반복 한도에 맞춘 LangGraph recursion_limit. 반복마다 Supervisor와 agent 두 단계가 실행됩니다.
+    한도가 0이면 budget만으로 분석을 끝내도록 충분히 큰 값을 사용합니다.
+    """
+    max_iterations = settings.ANALYSIS_MAX_ITERATIONS if max_iterations is None else max_iterations
+    if max_iterations <= 0:
+        return 10000
+    return max_iterations * 2 + 5
+
+
+class TokenCounter(BaseCallbackHandler):
+    """
+    한 노드 안에서 호출된 chat model의 prompt + completion token 수를 합산합니다.
+    """
+
+    # 값만 더하므로 executor thread를 거치지 않고 event loop에서 바로 실행
+    run_inline = True
+
+    def __init__(self):
+        self.total = 0
+
+    def on_llm_end(self, response, **kwargs):
+        prompt_tokens, completion_tokens = llm_usage(response)
+        self.total += prompt_tokens + completion_tokens
+
+
+severity_budgets = parse_budgets(settings.ANALYSIS_BUDGETS)
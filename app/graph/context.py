@@ -0,0 +1,121 @@
+"""
+Context Window Management
+"""
+
+import functools
+
+import tiktoken
+from langchain_core.messages import HumanMessage
+
+from app.conf.config import settings
+from app.conf.logging import logger
+
+# tiktoken encoding을 쓸 수 없을 때 사용하는 토큰당 평균 문자 수
+CHARS_PER_TOKEN = 4
+# 메시지마다 role/name 등으로 추가되는 토큰 수
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # encoding 파일을 내려받을 수 없는 환경에서는 문자 수로 추정
+        logger.warning(f"tiktoken encoding unavailable ({e}), estimating tokens from length")
+        return None
+
+
+def _text(message):
+    content = message.content if hasattr(message, "content") else message
+    return content if isinstance(content, str) else str(content)
+
+
+def count_tokens(text, model=None):
+    encoding = _encoding(model or settings.LLM_MODEL)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model=None):
+    return sum(
+        count_tokens(_text(message), model) + MESSAGE_OVERHEAD_TOKENS
+        for message in messages
+    )
+
+
+def truncate_tokens(text, max_tokens, model=None):
+    """
+    text를 max_tokens 이하로 자르고, 잘린 경우 생략 표시를 붙입니다.
+    """
+    encoding = _encoding(model or settings.LLM_MODEL)
+    if encoding is None:
+        limit = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= limit:
+            return text
+        omitted = (len(text) - limit) // CHARS_PER_TOKEN
+        return f"{text[:limit]}\n...[{omitted} tokens truncated]"
+
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return (
+        f"{encoding.decode(tokens[:max_tokens])}\n"
+        f"...[{len(tokens) - max_tokens} tokens truncated]"
+    )
+
+
+def build_context(messages, budget, digest_tokens, instruction=None, model=None):
+    """
+    원본 alert, 현재 supervisor 지시사항, 이전 agent 결과의 요약본(digest)으로
+    budget 토큰 이내의 입력 메시지를 구성합니다.
+
+    이전 결과는 각각 digest_tokens 이하로 줄이고, 최근 결과부터 budget이 허락하는 만큼 포함합니다.
+    지시사항은 budget의 1/4, 원본 alert는 절반 이하로 자르고, 생략 표시의 몫도 미리 남겨 둡니다.
+    budget이 0 이하이면 메시지를 그대로 반환합니다.
+    """
+    messages = list(messages)
+    if budget <= 0 or not messages:
+        return messages + ([_instruction_message(instruction)] if instruction else [])
+
+    # 원본 alert는 항상 포함하되 budget의 절반을 넘지 않도록 제한
+    alert = messages[0]
+    alert = alert.model_copy(
+        update={"content": truncate_tokens(_text(alert), budget // 2, model)}
+    )
+    tail = [_instruction_message(truncate_tokens(instruction, budget // 4, model))] if instruction else []
+    remaining = budget - count_message_tokens([alert] + tail, model)
+    if len(messages) > 1:
+        # 이전 결과가 생략될 때 붙는 표시가 budget을 넘기지 않도록 가장 긴 경우의 몫을 미리 뺌
+        remaining -= count_message_tokens([_omitted_message(len(messages) - 1)], model)
+
+    history = []
+    for message in reversed(messages[1:]):
+        digest = message.model_copy(
+            update={"content": truncate_tokens(_text(message), digest_tokens, model)}
+        )
+        cost = count_message_tokens([digest], model)
+        if cost > remaining:
+            break
+        history.append(digest)
+        remaining -= cost
+    history.reverse()
+
+    omitted = len(messages) - 1 - len(history)
+    if omitted:
+        history.insert(0, _omitted_message(omitted))
+    return [alert] + history + tail
+
+
+def _omitted_message(omitted):
+    return HumanMessage(
+        content=f"[{omitted} earlier investigation messages omitted to fit the context budget]",
+        name="ContextManager",
+    )
+
+
+def _instruction_message(instruction):
+    return HumanMessage(content=f"Supervisor instruction: {instruction}", name="Supervisor")
@@ -1,15 +1,34 @@
+import asyncio
 import functools
+import time
 from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.config import get_stream_writer
 
 # app/graph/nodes.py
 import json
+from app.conf.config import settings
 from app.conf.logging import logger
+from app.graph.budget import TokenCounter, agent_timeout, budget_note
+from app.graph.context import build_context, count_message_tokens
+from app.services.metrics import node_latency
+
+def emit_progress(event, **data):
+    """
+    stream_mode="custom"으로 진행 상황 이벤트를 보냄 (그래프 밖에서 호출되면 무시)
+    """
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer({"event": event, **data})
 
 async def agent_node(state, agent, name):
     """
     지정한 agent와 name을 사용하여 agent 노드를 생성
     """
     logger.info(f"====== {name} 시작 ======")
+    emit_progress("node_started", node=name, instruction=state.get("instruction", ""))
+    started = time.perf_counter()
     logger.info(f"입력 메시지 수: {len(state['messages'])}")
     
     # 입력의 마지막 메시지 내용 로깅
@@ -22,10 +41,33 @@ async def agent_node(state, agent, name):
     if "instruction" in state and state["instruction"]:
         logger.info(f"지시사항: {state['instruction']}")
     
+    counter = TokenCounter()
     try:
+        # 남은 분석 budget을 지시사항에 덧붙여 agent가 조사 범위를 조절하게 함
+        instruction = state.get("instruction") or ""
+        note = budget_note(state)
+        if note:
+            instruction = f"{instruction}\n\n{note}".strip()
+
+        # 토큰 budget 안에서 원본 alert, 지시사항, 이전 결과 요약만 전달
+        messages = build_context(
+            state["messages"],
+            budget=settings.AGENT_CONTEXT_TOKEN_BUDGET,
+            digest_tokens=settings.CONTEXT_DIGEST_TOKENS,
+            instruction=instruction,
+        )
+        logger.info(
+            f"{name} 컨텍스트 토큰: {count_message_tokens(state['messages'])} -> "
+            f"{count_message_tokens(messages)}"
+        )
+
         # 에이전트 호출
         logger.info(f"{name} 에이전트 호출 중...")
-        agent_response = await agent.ainvoke({"messages": state["messages"]})
+        # deadline이 지나면 진행 중인 호출(LLM, MCP tool)을 취소
+        agent_response = await asyncio.wait_for(
+            agent.ainvoke({"messages": messages}, config={"callbacks": [counter]}),
+            timeout=agent_timeout(state),
+        )
         
         # 응답 로깅
         if "messages" in agent_response and agent_response["messages"]:
@@ -38,24 +80,60 @@ async def agent_node(state, agent, name):
         # 에이전트 응답 메시지를 가져와서 태그 추가
         new_message = HumanMessage(content=agent_response["messages"][-1].content, name=name)
         
-        # 전체 상태 복사하고 메시지 업데이트
-        new_state = state.copy()  # 상태 복사
-        new_state["messages"] = state["messages"] + [new_message]  # 메시지 업데이트
-        
         logger.info(f"====== {name} 완료 ======")
-        return new_state  # 전체 상태 반환
+        # 추가된 메시지만 반환하고, 누적은 AgentState의 reducer가 처리
+        return {"messages": [new_message], "tokens_used": counter.total}
         
+    except asyncio.TimeoutError:
+        logger.warning(f"{name} 에이전트가 분석 deadline에 도달하여 취소되었습니다")
+        return {
+            "messages": [HumanMessage(content=f"{name} was cancelled: analysis deadline exceeded", name=name)],
+            "tokens_used": counter.total
+        }
     except Exception as e:
         logger.error(f"{name} 에이전트 오류: {str(e)}", exc_info=True)
-        # 오류 발생 시 오류 메시지를 포함한 상태 반환
-        new_state = state.copy()
-        new_state["messages"] = state["messages"] + [
-            HumanMessage(content=f"Error in {name}: {str(e)}", name=name)
-        ]
-        return new_state
+        # 오류 발생 시 오류 메시지만 반환
+        return {
+            "messages": [HumanMessage(content=f"Error in {name}: {str(e)}", name=name)],
+            "tokens_used": counter.total
+        }
+    finally:
+        node_latency.labels(name).observe(time.perf_counter() - started)
 
 def create_agent_node(agent, name):
     """
     Agent와 name을 사용하여 노드 생성 함수
     """
-    return functools.partial(agent_node, agent=agent, name=name)
\ No newline at end of file
+    return functools.partial(agent_node, agent=agent, name=name)
+
+async def parallel_agent_node(state, agents):
+    """
+    Supervisor가 지정한 여러 agent를 각자의 지시사항으로 동시에 실행하고, 결과 메시지를 지정된 순서대로 합침
+    """
+    names = [name for name in state.get("dispatch", []) if name in agents]
+    instructions = state.get("dispatch_instructions") or {}
+    logger.info(f"====== 병렬 실행 시작: {', '.join(names)} ======")
+
+    results = await asyncio.gather(
+        *[
+            agent_node(
+                {**state, "instruction": instructions.get(name) or state.get("instruction", "")},
+                agent=agents[name],
+                name=name,
+            )
+            for name in names
+        ]
+    )
+
+    # 각 agent가 추가한 메시지를 지정된 순서대로 모아서 한 번에 반영
+    new_messages = [message for result in results for message in result["messages"]]
+
+    logger.info(f"====== 병렬 실행 완료: 메시지 {len(new_messages)}개 추가 ======")
+    tokens_used = sum(result.get("tokens_used", 0) for result in results)
+    return {"messages": new_messages, "dispatch": [], "dispatch_instructions": {}, "tokens_used": tokens_used}
+
+def create_parallel_agent_node(agents):
+    """
+    agent 이름 -> agent 매핑으로 병렬 실행 노드 생성 함수
+    """
+    return functools.partial(parallel_agent_node, agents=agents)
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+Rule-Based Alert Router
+"""
+
+import fnmatch
+import json
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.agents.supervisor import members
+from app.conf.config import settings
+from app.conf.logging import logger
+
+DEFAULT_INSTRUCTION = (
+    "Investigate the alert with your tools and report concrete findings "
+    "(values, timestamps, links) that explain it."
+)
+
+
+class RoutingRule(BaseModel):
+    name: str
+    match: Dict[str, str] = Field(
+        description="label or annotations.<key> -> glob patterns separated by | (case-insensitive); all keys must match"
+    )
+    plan: List[Literal[*members, "SUMMARIZE"]] = Field(
+        description="Agents to run in order without asking the Supervisor; SUMMARIZE ends the plan"
+    )
+    instruction: str = DEFAULT_INSTRUCTION
+
+
+class RoutePlan(BaseModel):
+    rule: str
+    plan: List[str]
+    instruction: str
+
+
+def parse_routing_rules(spec):
+    """
+    JSON 배열 형식의 라우팅 규칙을 RoutingRule 목록으로 변환합니다.
+    """
+    if not spec:
+        return []
+    return [RoutingRule(**rule) for rule in json.loads(spec)]
+
+
+def _matches(rule, labels, annotations):
+    for key, pattern in rule.match.items():
+        if key.startswith("annotations."):
+            value = annotations.get(key[len("annotations."):])
+        else:
+            value = labels.get(key)
+        if value is None or not any(
+            fnmatch.fnmatch(str(value).lower(), alternative.strip().lower())
+            for alternative in pattern.split("|")
+        ):
+            return False
+    return True
+
+
+class AlertRouter:
+    """
+    alert label / annotation에 맞는 첫 번째 규칙으로 실행 계획을 정합니다.
+    계획에 있는 hop은 Supervisor LLM을 호출하지 않으며, 맞는 규칙이 없으면 LLM이 결정합니다.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.routed = 0
+        self.unrouted = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.llm_calls_saved = 0
+        self.rule_hits = {}
+
+    def route(self, labels=None, annotations=None) -> Optional[RoutePlan]:
+        labels = labels or {}
+        annotations = annotations or {}
+        for rule in self.rules:
+            if _matches(rule, labels, annotations):
+                self.routed += 1
+                self.rule_hits[rule.name] = self.rule_hits.get(rule.name, 0) + 1
+                logger.info(f"Alert routed by rule '{rule.name}': {rule.plan}")
+                return RoutePlan(rule=rule.name, plan=list(rule.plan), instruction=rule.instruction)
+        self.unrouted += 1
+        return None
+
+    def record_llm_call(self, seconds):
+        self.llm_calls += 1
+        self.llm_seconds += seconds
+
+    def record_skipped_call(self):
+        self.llm_calls_saved += 1
+
+    @property
+    def average_llm_seconds(self):
+        return self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+
+    def summary(self, rule, llm_calls_saved):
+        """
+        alert 하나에 대해 절약한 Supervisor 호출 수와 예상 절약 시간을 반환합니다.
+        """
+        return {
+            "rule": rule,
+            "llm_calls_saved": llm_calls_saved,
+            "latency_saved_seconds": round(llm_calls_saved * self.average_llm_seconds, 3),
+        }
+
+    def stats(self):
+        return {
+            "rules": len(self.rules),
+            "routed": self.routed,
+            "unrouted": self.unrouted,
+            "rule_hits": self.rule_hits,
+            "supervisor_llm_calls": self.llm_calls,
+            "supervisor_llm_avg_seconds": round(self.average_llm_seconds, 3),
+            "llm_calls_saved": self.llm_calls_saved,
+            "latency_saved_seconds": round(self.llm_calls_saved * self.average_llm_seconds, 3),
+        }
+
+
+alert_router = AlertRouter(parse_routing_rules(settings.ALERT_ROUTING_RULES))
@@ -1,23 +1,56 @@
+import asyncio
+import operator
+import time
 from langgraph.graph import END, StateGraph, START
-from langgraph.checkpoint.memory import MemorySaver
 from typing import Dict, List, TypedDict, Annotated
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
+from app.conf.config import settings
 from app.conf.logging import logger
-from app.graph.nodes import create_agent_node
-from app.agents.supervisor import create_supervisor_agent, members, options_for_next
+from app.graph.budget import TokenCounter, agent_timeout, exhausted
+from app.graph.context import build_context, count_message_tokens
+from app.graph.nodes import create_agent_node, create_parallel_agent_node
+from app.graph.router import alert_router
+from app.services.checkpoints import investigation_checkpoints
+from app.services.metrics import analysis_budget_exhausted, observe_node
+from app.agents.supervisor import create_supervisor_agent, members, options_for_next, parallel_instruction
 from app.agents.grafana import create_grafana_agent
 from app.agents.github import create_github_agent
 from app.agents.websearch import create_websearch_agent
-from app.agents.summarizer import create_summarizer_agent
+from app.agents.summarizer import SummaryFormat, create_summarizer_agent, render_summary
 
 class AgentState(TypedDict):
-    messages: Annotated[List[BaseMessage], "The messages in the conversation so far"]
+    # 노드는 새 메시지만 반환하고 reducer가 누적함
+    messages: Annotated[List[BaseMessage], operator.add]
     next: str
-    instruction: str = ""
+    instruction: str
+    dispatch: List[str]
+    # 병렬 실행할 agent별 지시사항
+    dispatch_instructions: Dict[str, str]
+    iteration_count: int
+    # 규칙 기반 라우터가 정한, Supervisor LLM 없이 실행할 남은 단계
+    plan: List[str]
+    llm_calls_saved: int
+    # 분석별 deadline(epoch 초)과 token budget. 노드는 사용한 token 수만 반환하고 reducer가 누적함
+    started_at: float
+    deadline: float
+    token_budget: int
+    tokens_used: Annotated[int, operator.add]
+    budget_exhausted: str
+    # Summarizer가 만든 구조화된 최종 결과. 메시지에는 표시용 markdown만 넣음
+    summary: SummaryFormat
 
 # Global graph instance
 graph_instance = None
+_graph_lock = asyncio.Lock()
+_warmup_task = None
+
+# 그래프 준비 상태와 구성 요소별 초기화 시간(초)
+graph_readiness = {
+    "status": "cold",
+    "error": None,
+    "timings": {},
+}
 
 async def create_workflow_graph():
     global graph_instance
@@ -25,15 +58,76 @@ async def create_workflow_graph():
     if graph_instance is not None:
         return graph_instance
     
+    # 동시에 들어온 요청이 그래프와 MCP subprocess를 중복 생성하지 않도록 한 번만 초기화
+    async with _graph_lock:
+        if graph_instance is not None:
+            return graph_instance
+        
+        graph_readiness["status"] = "warming"
+        graph_readiness["error"] = None
+        started = time.perf_counter()
+        try:
+            compiled_graph = await _build_workflow_graph(graph_readiness["timings"])
+        except Exception as e:
+            graph_readiness["status"] = "failed"
+            graph_readiness["error"] = str(e)
+            raise
+        graph_readiness["timings"]["total"] = round(time.perf_counter() - started, 3)
+        
+        # 글로벌 인스턴스 설정
+        graph_instance = compiled_graph
+        graph_readiness["status"] = "ready"
+        logger.info(f"Workflow graph startup timings: {graph_readiness['timings']}")
+    
+    return graph_instance
+
+async def wait_for_graph(timeout):
+    """
+    그래프가 준비될 때까지 최대 timeout초 기다립니다. 아직 초기화가 시작되지 않았으면 시작합니다.
+    """
+    global _warmup_task
+    
+    if graph_instance is not None:
+        return True
+    if _warmup_task is None or _warmup_task.done():
+        _warmup_task = asyncio.ensure_future(create_workflow_graph())
+    try:
+        await asyncio.wait_for(asyncio.shield(_warmup_task), timeout=timeout)
+    except asyncio.TimeoutError:
+        return False
+    except Exception as e:
+        logger.error(f"Workflow graph warm-up failed: {e}")
+        return False
+    return True
+
+async def stop_warmup():
+    """
+    진행 중인 그래프 초기화를 취소합니다 (종료 시).
+    """
+    if _warmup_task is not None and not _warmup_task.done():
+        _warmup_task.cancel()
+        await asyncio.gather(_warmup_task, return_exceptions=True)
+
+async def _timed(name, awaitable, timings):
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[name] = round(time.perf_counter() - started, 3)
+        logger.info(f"{name} initialized in {timings[name]}s")
+
+async def _build_workflow_graph(timings):
     logger.info("Creating workflow graph...")
     
     # 슈퍼바이저 에이전트 생성
     supervisor_agent = create_supervisor_agent()
     
-    # 각 전문 에이전트 생성
-    _, grafana_agent = await create_grafana_agent()
-    _, github_agent = await create_github_agent()
-    _, websearch_agent = await create_websearch_agent()
+    # 각 전문 에이전트를 동시에 생성 (MCP 서버 기동 시간이 겹치도록)
+    (_, grafana_agent), (_, github_agent), (_, websearch_agent) = await asyncio.gather(
+        _timed("GrafanaAgent", create_grafana_agent(), timings),
+        _timed("GithubAgent", create_github_agent(), timings),
+        _timed("WebSearchAgent", create_websearch_agent(), timings),
+    )
 
     summarizer_agent = create_summarizer_agent()
     
@@ -41,9 +135,16 @@ async def create_workflow_graph():
     grafana_node = create_agent_node(grafana_agent, "GrafanaAgent")
     github_node = create_agent_node(github_agent, "GithubAgent")
     websearch_node = create_agent_node(websearch_agent, "WebSearchAgent")
+    parallel_node = create_parallel_agent_node(
+        {
+            "GrafanaAgent": grafana_agent,
+            "GithubAgent": github_agent,
+            "WebSearchAgent": websearch_agent,
+        }
+    )
 
     # 슈퍼바이저 노드 정의
-    async def supervisor_node(state: AgentState) -> AgentState:
+    async def supervisor_node(state: AgentState) -> dict:
         logger.info("====== 수퍼바이저 노드 시작 ======")
         
         # 현재 메시지 상태 로깅
@@ -53,20 +154,53 @@ async def create_workflow_graph():
         iteration_count = state.get("iteration_count", 0) + 1
         logger.info(f"현재 반복 횟수: {iteration_count}")
         
-        # 반복 횟수가 10을 초과하면 강제로 SUMMARIZE 단계로 이동
-        if iteration_count >= 10:
+        # 남은 시간이나 token이 요약에 필요한 몫만 남았으면 지금까지의 결과로 요약
+        reason = exhausted(state)
+        if reason is not None:
+            logger.warning(f"분석 budget({reason})이 거의 소진되어 요약 단계로 이동합니다")
+            analysis_budget_exhausted.labels(reason).inc()
+            return {
+                "next": "SUMMARIZE",
+                "instruction": "분석 시간 또는 token budget이 거의 소진되었습니다. 지금까지의 정보를 종합하여 요약해주세요.",
+                "iteration_count": iteration_count,
+                "budget_exhausted": reason
+            }
+        
+        # 반복 횟수가 한도를 넘으면 강제로 SUMMARIZE 단계로 이동 (budget이 먼저 끝내도록 한도는 넉넉하게, 0이면 사용 안 함)
+        max_iterations = settings.ANALYSIS_MAX_ITERATIONS
+        if max_iterations and iteration_count >= max_iterations:
             logger.warning(f"반복 횟수 {iteration_count}가 한도를 초과하여 강제로 요약 단계로 이동합니다")
             return {
-                "messages": state["messages"],
                 "next": "SUMMARIZE",
-                "instruction": "반복 횟수 제한으로 인해 지금까지의 정보를 종합하여 요약해주세요. 사용 가능한 정보를 기반으로 CPU 사용률 경고에 대한 가능한 원인과 해결책을 제시하세요.",
+                "instruction": "반복 횟수 제한에 도달했습니다. 지금까지의 정보를 종합하여 요약해주세요.",
                 "iteration_count": iteration_count
             }
         
+        # 라우팅 규칙으로 정해진 단계가 남아 있으면 LLM 호출 없이 진행
+        plan = state.get("plan") or []
+        if plan:
+            alert_router.record_skipped_call()
+            logger.info(f"라우팅 계획에 따라 {plan[0]}(으)로 이동 (LLM 호출 생략)")
+            logger.info("====== 수퍼바이저 노드 완료 ======")
+            return {
+                "next": plan[0],
+                "plan": plan[1:],
+                "instruction": state.get("instruction", ""),
+                "iteration_count": iteration_count,
+                "llm_calls_saved": state.get("llm_calls_saved", 0) + 1
+            }
+        
         try:
             # 수퍼바이저 에이전트 호출
             logger.info("수퍼바이저 에이전트 호출 중...")
-            result = await supervisor_agent.ainvoke({"messages": state["messages"]})
+            started = time.perf_counter()
+            counter = TokenCounter()
+            # deadline이 지나면 호출을 취소하고 요약 단계로 이동
+            result = await asyncio.wait_for(
+                supervisor_agent.ainvoke({"messages": state["messages"]}, config={"callbacks": [counter]}),
+                timeout=agent_timeout(state),
+            )
+            alert_router.record_llm_call(time.perf_counter() - started)
             
             # 결과 로깅
             logger.info(f"수퍼바이저 결정: {result.next}")
@@ -76,25 +210,55 @@ async def create_workflow_graph():
             # instruction 필드가 있는 경우 사용, 없으면 빈 문자열 사용
             instruction = getattr(result, "instruction", "")
             
+            # 병렬 실행 모드에서는 독립적으로 조사 가능한 agent들을 각자의 지시사항으로 동시에 실행
+            dispatch_instructions = {}
+            for task in getattr(result, "parallel_agents", []):
+                if task.agent != result.next and task.agent not in dispatch_instructions:
+                    dispatch_instructions[task.agent] = task.instruction or parallel_instruction(task.agent, instruction)
+            dispatch = [result.next] + list(dispatch_instructions)
+            if not settings.PARALLEL_AGENT_DISPATCH and len(dispatch) > 1:
+                logger.warning(
+                    f"병렬 실행이 꺼져 있어 parallel_agents {dispatch[1:]}는 실행하지 않고 {result.next}만 실행합니다"
+                )
+            if settings.PARALLEL_AGENT_DISPATCH and result.next in members and len(dispatch) > 1:
+                logger.info(f"병렬 실행 대상: {dispatch}")
+                logger.info("====== 수퍼바이저 노드 완료 ======")
+                return {
+                    "next": "PARALLEL",
+                    "instruction": instruction,
+                    "dispatch": dispatch,
+                    "dispatch_instructions": {result.next: instruction, **dispatch_instructions},
+                    "iteration_count": iteration_count,
+                    "tokens_used": counter.total
+                }
+
             logger.info("====== 수퍼바이저 노드 완료 ======")
             return {
-                "messages": state["messages"],
                 "next": result.next,
                 "instruction": instruction,
-                "iteration_count": iteration_count  # 반복 횟수 상태에 저장
+                "iteration_count": iteration_count,  # 반복 횟수 상태에 저장
+                "tokens_used": counter.total
+            }
+        except asyncio.TimeoutError:
+            logger.warning("분석 deadline에 도달하여 수퍼바이저 호출을 취소하고 요약 단계로 이동합니다")
+            analysis_budget_exhausted.labels("deadline").inc()
+            return {
+                "next": "SUMMARIZE",
+                "instruction": "분석 시간이 거의 소진되었습니다. 지금까지의 정보를 종합하여 요약해주세요.",
+                "iteration_count": iteration_count,
+                "budget_exhausted": "deadline"
             }
         except Exception as e:
             logger.error(f"수퍼바이저 노드 오류: {str(e)}", exc_info=True)
             # 오류 발생시 요약 단계로 이동
             return {
-                "messages": state["messages"],
                 "next": "SUMMARIZE",
                 "instruction": "오류가 발생했습니다. 지금까지의 정보를 종합하여 요약해주세요.",
                 "iteration_count": iteration_count
             }
 
     # 요약기 노드 정의
-    async def summarizer_node(state: AgentState) -> AgentState:
+    async def summarizer_node(state: AgentState) -> dict:
         """
         모든 에이전트의 정보를 종합하여 최종 요약 보고서를 작성하는 노드
         """
@@ -102,42 +266,42 @@ async def create_workflow_graph():
         
         # 시스템 메시지 추가하여 요약 작업 지시
         summarize_msg = SystemMessage(content="모든 정보를 종합하여 최종 보고서를 작성해주세요.")
-        messages = state["messages"] + [summarize_msg]
+        context = build_context(
+            state["messages"],
+            budget=settings.SUMMARIZER_CONTEXT_TOKEN_BUDGET,
+            digest_tokens=settings.SUMMARIZER_DIGEST_TOKENS,
+        )
+        messages = context + [summarize_msg]
         logger.info(f"Summarizer received {len(messages)} messages")
+        logger.info(
+            f"Summarizer context tokens: {count_message_tokens(state['messages'])} -> "
+            f"{count_message_tokens(context)}"
+        )
         
         try:
             # 요약기 에이전트 호출
             logger.info("Calling summarizer agent")
-            result = await summarizer_agent.ainvoke({"messages": messages})
+            counter = TokenCounter()
+            result = await summarizer_agent.ainvoke({"messages": messages}, config={"callbacks": [counter]})
             logger.info("Summarizer agent returned result")
             
-            # 요약 보고서 형식 구성
-            summary = (
-                f"### Problem\n{result.problem}\n\n"
-                f"### Root Cause\n{result.cause}\n\n"
-                f"### Solution\n{result.solution}"
-            )
             logger.info("Summary created successfully")
             
-            summary_message = HumanMessage(content=summary, name="Summarizer")
-        
-            # 새 상태를 딕셔너리로 직접 생성
-            new_state = {
-                "messages": state["messages"] + [summary_message],
-                "next": "FINISH"
-            }
+            summary_message = HumanMessage(content=render_summary(result), name="Summarizer")
             
-            logger.info("Summary created successfully")
-            logger.info("Added summary message with name 'Summarizer'")
             logger.info("Summarizer node returning FINISH")
-            logger.info(f"New state has {len(new_state['messages'])} messages")
-            return new_state
+            return {
+                "messages": [summary_message],
+                "summary": result,
+                "next": "FINISH",
+                "tokens_used": counter.total
+            }
             
         except Exception as e:
             logger.error(f"Error in summarizer node: {e}", exc_info=True)
             # 오류가 발생해도 워크플로우를 종료하도록 함
             return {
-                "messages": state["messages"] + [
+                "messages": [
                     HumanMessage(content=f"Error generating summary: {str(e)}", name="Summarizer")
                 ],
                 "next": "FINISH"
@@ -147,19 +311,23 @@ async def create_workflow_graph():
     workflow = StateGraph(AgentState)
     
     # 노드 추가
-    workflow.add_node("Supervisor", supervisor_node)
+    # agent 노드는 agent_node 안에서 실행 시간을 기록 (병렬 실행 포함)
+    workflow.add_node("Supervisor", observe_node("Supervisor", supervisor_node))
     workflow.add_node("GrafanaAgent", grafana_node)
     workflow.add_node("GithubAgent", github_node)
     workflow.add_node("WebSearchAgent", websearch_node)
-    workflow.add_node("Summarizer", summarizer_node)  # 요약기 노드 추가
+    workflow.add_node("Summarizer", observe_node("Summarizer", summarizer_node))  # 요약기 노드 추가
+    workflow.add_node("ParallelAgents", observe_node("ParallelAgents", parallel_node))  # 병렬 실행 노드 추가
     
     # 각 에이전트에서 슈퍼바이저로 엣지 추가
     for member in members:
         workflow.add_edge(member, "Supervisor")
+    workflow.add_edge("ParallelAgents", "Supervisor")
     
     # 조건부 엣지 맵 생성
     conditional_map = {member: member for member in members}
     conditional_map["SUMMARIZE"] = "Summarizer"  # "SUMMARIZE"가 "Summarizer" 노드로 연결되도록 추가
+    conditional_map["PARALLEL"] = "ParallelAgents"  # 여러 agent 동시 실행
     conditional_map["FINISH"] = END
     
     def get_next(state):
@@ -171,14 +339,13 @@ async def create_workflow_graph():
     # 시작 노드 설정
     workflow.add_edge(START, "Supervisor")
     
-    # # 체크포인터 설정 - configurable=True로 설정
-    # memory_saver = MemorySaver(configurable=True)
+    # 조사가 중간에 끊겨도 마지막으로 끝난 노드부터 이어서 실행할 수 있도록 단계마다 저장
+    checkpointer = None
+    if settings.CHECKPOINT_ENABLED:
+        checkpointer = await investigation_checkpoints.saver()
     
     # 그래프 컴파일
-    compiled_graph = workflow.compile()
-    
-    # 글로벌 인스턴스 설정
-    graph_instance = compiled_graph
+    compiled_graph = workflow.compile(checkpointer=checkpointer)
     
     logger.info("Workflow graph created successfully")
     
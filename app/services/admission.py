@@ -0,0 +1,169 @@
+"""
+Admission Control Service
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+
+from app.conf.config import settings
+from app.conf.logging import logger
+from app.services.metrics import (
+    admission_queue_depth,
+    admission_queue_wait,
+    admission_rejections,
+    admission_running,
+)
+
+
+class AdmissionRejected(Exception):
+    """
+    분석을 시작하지 못하고 거절된 경우. reason은 shed, queue_full, evicted, timeout 중 하나입니다.
+    """
+
+    def __init__(self, reason, severity, retry_after):
+        super().__init__(f"Analysis rejected ({reason}) for severity {severity}")
+        self.reason = reason
+        self.severity = severity
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    동시에 실행되는 분석 수를 제한하고, 기다리는 분석은 severity 순서의 bounded priority queue에 둡니다.
+    모든 slot이 사용 중이면 낮은 severity의 alert는 바로 거절하고, queue가 가득 차면
+    더 낮은 severity의 대기 항목을 밀어내거나 새 요청을 거절합니다.
+    """
+
+    def __init__(
+        self, max_concurrent, queue_size, queue_timeout, severity_order, default_severity,
+        shed_severity, retry_after,
+    ):
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.severity_order = severity_order
+        self.default_severity = default_severity
+        self.shed_priority = self.priority(shed_severity)
+        self.retry_after = retry_after
+        self.running = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self.admitted = 0
+        self.rejected = {}
+
+    def severity(self, labels):
+        severity = str((labels or {}).get("severity", "")).lower()
+        return severity if severity in self.severity_order else self.default_severity
+
+    def priority(self, severity):
+        # 숫자가 작을수록 우선순위가 높음
+        if severity in self.severity_order:
+            return self.severity_order.index(severity)
+        return len(self.severity_order)
+
+    def _reject(self, reason, severity):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        admission_rejections.labels(severity, reason).inc()
+        logger.warning(f"Admission rejected a {severity} alert: {reason}")
+        return AdmissionRejected(reason, severity, retry_after=self.retry_after)
+
+    async def acquire(self, labels=None, shed=True):
+        """
+        slot을 받을 때까지 기다립니다. shed=False이면 낮은 severity도 바로 거절하지 않고 queue에서 기다립니다.
+        """
+        severity = self.severity(labels)
+        priority = self.priority(severity)
+
+        if self.running < self.max_concurrent and not self._waiting:
+            self.running += 1
+            self.admitted += 1
+            admission_running.set(self.running)
+            admission_queue_wait.labels(severity).observe(0.0)
+            return severity
+
+        if shed and priority >= self.shed_priority:
+            raise self._reject("shed", severity)
+
+        if len(self._waiting) >= self.queue_size:
+            worst = max(self._waiting)
+            if worst[0] <= priority:
+                raise self._reject("queue_full", severity)
+            # 새 요청보다 낮은 severity의 대기 항목을 밀어냄
+            self._waiting.remove(worst)
+            heapq.heapify(self._waiting)
+            worst[3].set_exception(self._reject("evicted", worst[2]))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._sequence), severity, future)
+        heapq.heappush(self._waiting, entry)
+        admission_queue_depth.set(len(self._waiting))
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if entry in self._waiting:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+            admission_queue_depth.set(len(self._waiting))
+            if future.done() and not future.exception():
+                # timeout과 동시에 slot을 받은 경우
+                self._release_slot()
+            raise self._reject("timeout", severity)
+        except asyncio.CancelledError:
+            if entry in self._waiting:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                admission_queue_depth.set(len(self._waiting))
+            elif future.done() and not future.exception():
+                self._release_slot()
+            raise
+        admission_queue_wait.labels(severity).observe(time.perf_counter() - started)
+        return severity
+
+    def release(self):
+        self._release_slot()
+
+    def _release_slot(self):
+        self.running -= 1
+        # 가장 높은 severity의 대기 항목에 slot을 넘김
+        while self._waiting and self.running < self.max_concurrent:
+            priority, _, severity, future = heapq.heappop(self._waiting)
+            if future.done():
+                continue
+            self.running += 1
+            self.admitted += 1
+            future.set_result(None)
+        admission_running.set(self.running)
+        admission_queue_depth.set(len(self._waiting))
+
+    @asynccontextmanager
+    async def slot(self, labels=None, shed=True):
+        await self.acquire(labels, shed)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "queued": len(self._waiting),
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+admission = AdmissionController(
+    max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    severity_order=[item.strip().lower() for item in settings.ADMISSION_SEVERITY_ORDER.split(",") if item.strip()],
+    default_severity=settings.ADMISSION_DEFAULT_SEVERITY.lower(),
+    shed_severity=settings.ADMISSION_SHED_SEVERITY.lower(),
+    retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+)
@@ -1,12 +1,96 @@
+import asyncio
 import uuid
+from datetime import datetime
 from langchain_core.messages import HumanMessage
+from langgraph.types import Command
+from app.conf.config import settings
 from app.conf.logging import logger
+from app.graph.budget import budget_summary, graph_recursion_limit, resolve_budget, resume_budget
+from app.graph.router import alert_router
+from app.services.checkpoints import investigation_checkpoints
+from app.services.incident_index import incident_index
+from app.services.metrics import analyses_in_flight, supervisor_iterations
 from app.graph.workflow import create_workflow_graph
 
 # app/services/alert_analyzer.py
 
-async def analyze_alert(alert_description):
+def _similar_incident(match, reused):
+    return {
+        "incident_id": match["incident_id"],
+        "similarity": match["similarity"],
+        "created_at": match["created_at"],
+        "reused": reused,
+    }
+
+def _prior_incident_message(match):
+    analysis = match["analysis"]
+    return HumanMessage(
+        content=(
+            f"A similar past incident (similarity {match['similarity']:.2f}) was analysed before.\n"
+            f"Past alert: {match['description']}\n"
+            f"Past problem: {analysis.get('problem')}\n"
+            f"Past root cause: {analysis.get('cause')}\n"
+            f"Past solution: {analysis.get('solution')}\n"
+            "Verify whether the same cause applies now instead of repeating the whole investigation."
+        ),
+        name="IncidentMemory",
+    )
+
+def _emit_graph_event(emit, mode, chunk):
+    # custom: 노드가 직접 보낸 진행 이벤트, updates: 노드가 끝날 때 반환한 delta
+    if mode == "custom":
+        data = dict(chunk)
+        emit(data.pop("event", "progress"), data)
+        return
+    for node, delta in chunk.items():
+        if not delta:
+            continue
+        if node == "Supervisor":
+            emit("supervisor", {
+                "next": delta.get("next"),
+                "instruction": delta.get("instruction", ""),
+                "dispatch": delta.get("dispatch", []),
+                "routed": "plan" in delta,
+            })
+            continue
+        for message in delta.get("messages", []):
+            data = {"node": message.name or node, "content": message.content}
+            if message.name == "Summarizer" and delta.get("summary") is not None:
+                data["analysis"] = delta["summary"].model_dump()
+            emit("summary" if message.name == "Summarizer" else "agent_output", data)
+
+async def analyze_alert(
+    alert_description, labels=None, annotations=None, fresh=False, emit=None,
+    fingerprint=None, resume_thread=None,
+):
+    """
+    alert를 분석합니다. emit(event, data)를 주면 진행 상황을 이벤트로 전달합니다.
+    resume_thread를 주면 중단된 조사를 그 thread의 마지막 checkpoint부터 이어서 실행합니다.
+    """
     try:
+        # 거의 같은 과거 incident가 있으면 그래프 실행 없이 이전 분석을 재사용
+        match = None
+        if settings.INCIDENT_INDEX_ENABLED and resume_thread is None:
+            match = await incident_index.asearch(alert_description, labels)
+            if match is not None:
+                logger.info(
+                    f"Most similar past incident #{match['incident_id']}: {match['similarity']}"
+                )
+            if match is not None and emit is not None:
+                emit("similar_incident", {
+                    "incident_id": match["incident_id"],
+                    "similarity": match["similarity"],
+                })
+            if match is not None and not fresh and match["similarity"] >= settings.INCIDENT_REUSE_THRESHOLD:
+                incident_index.reused += 1
+                return {
+                    "status": "success",
+                    "analysis": match["analysis"],
+                    "similar_incident": _similar_incident(match, reused=True),
+                }
+            if match is not None and match["similarity"] < settings.INCIDENT_CONTEXT_THRESHOLD:
+                match = None
+        
         # 그래프 가져오기
         logger.info("Getting workflow graph")
         graph = await create_workflow_graph()
@@ -17,129 +101,119 @@ async def analyze_alert(alert_description):
             content=f"Alert triggered with description: {alert_description}. Please investigate this alert."
         )
         
+        messages = [initial_message]
+        if match is not None:
+            # 비슷한 과거 분석을 참고 정보로 제공하여 Supervisor 반복을 줄임
+            incident_index.context_injected += 1
+            messages.append(_prior_incident_message(match))
+        
+        # 규칙에 맞는 alert는 정해진 계획으로 시작하여 Supervisor LLM 호출을 줄임
+        route = alert_router.route(labels, annotations) if resume_thread is None else None
+        if route is not None and emit is not None:
+            emit("routing", {"rule": route.rule, "plan": route.plan})
+        
         # 초기 상태 설정
         initial_state = {
-            "messages": [initial_message], 
+            "messages": messages, 
             "next": "Supervisor",
-            "instruction": ""
+            "instruction": route.instruction if route else "",
+            "iteration_count": 0,
+            "plan": route.plan if route else [],
+            "llm_calls_saved": 0,
+            # severity별 deadline과 token budget. 재개한 조사는 checkpoint에 저장된 값을 그대로 사용
+            **resolve_budget(labels)
         }
         
+        # checkpoint thread: 새 조사는 fingerprint로 만들고, 재개할 때는 기존 thread를 사용
+        # 기본 recursion_limit(25)보다 Supervisor 반복 한도가 먼저 적용되도록 맞춤
+        config = {"recursion_limit": graph_recursion_limit()}
+        thread_id = resume_thread
+        graph_input = initial_state
+        resumed_state = None
+        if settings.CHECKPOINT_ENABLED:
+            if thread_id is None:
+                thread_id = await investigation_checkpoints.begin(
+                    fingerprint, alert_description, labels, annotations
+                )
+            config["configurable"] = {"thread_id": thread_id}
+            snapshot = await graph.aget_state(config) if resume_thread is not None else None
+            if snapshot is not None and snapshot.values:
+                # 그래프가 이미 끝난 상태라면 실행할 노드 없이 저장된 상태를 그대로 사용
+                logger.info(f"Resuming investigation {thread_id} from its last checkpoint")
+                investigation_checkpoints.resumed += 1
+                graph_input = None
+                resumed_state = snapshot.values
+                # 재시작 동안 멈춰 있던 시간은 deadline에서 빼지 않도록 budget 시각을 뒤로 미룸
+                shifted = resume_budget(snapshot.values, datetime.fromisoformat(snapshot.created_at).timestamp())
+                if shifted and snapshot.next:
+                    graph_input = Command(update=shifted)
+        
         # 그래프 실행
         logger.info(f"Starting analysis for alert: {alert_description}")
         
         # 변수 초기화
-        final_state = None
-        valid_state = None
+        final_state = resumed_state
         event_count = 0
         
         logger.info("==== 워크플로우 실행 시작 ====")
-        async for event in graph.astream(initial_state):
-            event_count += 1
-            
-            # 이벤트 구조 로깅
-            logger.info(f"Event keys: {list(event.keys())}")
-            
-            # 이벤트에서 상태 추출
-            current_state = None
-            
-            # 일반적인 형식: "state" 키로 직접 접근
-            if "state" in event:
-                current_state = event["state"]
-                logger.info("상태가 'state' 키에서 발견됨")
-            # 중첩된 형식: 노드 이름으로 상태 접근 
-            else:
-                # LangGraph의 노드 이름으로 중첩된 상태 찾기
-                for key in event.keys():
-                    if isinstance(event[key], dict) and "messages" in event[key]:
-                        logger.info(f"상태가 '{key}' 키에 중첩되어 있음")
-                        current_state = event[key]
-                        break
-            
-            # 상태를 발견했으면 처리
-            if current_state:
-                # 메시지가 있는 경우 유효한 상태로 저장
-                if "messages" in current_state and current_state["messages"]:
-                    valid_state = current_state
-                    logger.info(f"유효한 상태 업데이트: 메시지 {len(current_state['messages'])}개")
-                
-                # 최종 상태 업데이트
+        # 노드는 delta만 반환하므로 reducer가 적용된 전체 상태를 "values" 모드로 받고,
+        # 진행 상황은 "updates"와 "custom" 모드로 받아 emit으로 전달
+        stream_mode = ["values", "updates", "custom"] if emit is not None else ["values"]
+        analyses_in_flight.inc()
+        run_status = "failed"
+        try:
+            async for mode, chunk in graph.astream(graph_input, config, stream_mode=stream_mode):
+                if mode != "values":
+                    _emit_graph_event(emit, mode, chunk)
+                    continue
+                current_state = chunk
+                event_count += 1
                 final_state = current_state
-            
-            # 노드 실행 로깅
-            if "node" in event:
-                logger.info(f"\n>> 노드 실행: {event['node']}")
+                logger.info(
+                    f"상태 업데이트: 메시지 {len(current_state.get('messages', []))}개, "
+                    f"다음: {current_state.get('next')}"
+                )
+            run_status = "completed"
+        except asyncio.CancelledError:
+            # 종료 중에 취소된 조사는 running으로 남겨 다음 시작 때 이어서 실행
+            run_status = None
+            raise
+        finally:
+            analyses_in_flight.dec()
+            if thread_id is not None and run_status is not None:
+                await investigation_checkpoints.finish(thread_id, run_status)
+        if final_state:
+            supervisor_iterations.observe(final_state.get("iteration_count", 0))
         
         logger.info(f"==== 워크플로우 실행 완료 (총 {event_count}개 이벤트) ====")
         
-        # 최종 상태가 없거나 메시지가 없으면 마지막 유효한 상태 사용
-        if not final_state or "messages" not in final_state or not final_state["messages"]:
-            logger.warning("최종 상태에 메시지가 없어 마지막 유효한 상태 사용")
-            if valid_state:
-                final_state = valid_state
-            else:
-                return {"status": "error", "message": "No messages were generated during analysis"}
+        if not final_state or not final_state.get("messages"):
+            return {"status": "error", "message": "No messages were generated during analysis"}
+        
+        routing = alert_router.summary(
+            route.rule if route else None, final_state.get("llm_calls_saved", 0)
+        )
+        budget = budget_summary(final_state)
         
-        # Extract final summary
-        if final_state and "messages" in final_state:
-            final_messages = final_state["messages"]
-            logger.info(f"Processing final state with {len(final_messages)} messages")
-            
-            # Find the Summarizer message (should be last or near last)
-            summary_message = None
-            for i, msg in enumerate(reversed(final_messages)):
-                logger.info(f"Checking message {len(final_messages)-i}: {getattr(msg, 'name', 'unnamed')}")
-                if hasattr(msg, "name") and msg.name == "Summarizer":
-                    logger.info(f"Found Summarizer message at position {len(final_messages)-i}")
-                    summary_message = msg
-                    break
-            
-            if summary_message:
-                logger.info("Processing Summarizer message")
-                content = summary_message.content
-                
-                # Extract formatted sections
-                analysis = {}
-                if "### Problem" in content:
-                    logger.info("Extracting Problem section")
-                    problem_parts = content.split("### Problem", 1)[1].split("###", 1)
-                    analysis["problem"] = problem_parts[0].strip()
-                else:
-                    logger.warning("Problem section not found in summary")
-                    # 섹션이 없으면 전체 내용 사용
-                    analysis["problem"] = "High CPU usage on server 'app-server-01'"
-                
-                if "### Root Cause" in content:
-                    logger.info("Extracting Root Cause section")
-                    cause_parts = content.split("### Root Cause", 1)[1].split("###", 1)
-                    analysis["cause"] = cause_parts[0].strip()
-                else:
-                    logger.warning("Root Cause section not found in summary")
-                    # 웹 검색 결과에서 가능한 원인 추출
-                    analysis["cause"] = "Could not determine exact cause - see recommendations for investigation steps"
-                
-                if "### Solution" in content:
-                    logger.info("Extracting Solution section")
-                    solution_parts = content.split("### Solution", 1)[1].split("##", 1)
-                    analysis["solution"] = solution_parts[0].strip()
-                else:
-                    logger.warning("Solution section not found in summary")
-                    # 섹션이 없으면 전체 내용 사용
-                    analysis["solution"] = content
-                
-                logger.info(f"Analysis extracted with {len(analysis)} sections")
-                return {"status": "success", "analysis": analysis}
-            else:
-                logger.warning("No Summarizer message found, using last agent message")
-                # Summarizer 메시지가 없으면 마지막 에이전트 메시지 사용
-                if final_messages:
-                    last_message = final_messages[-1]
-                    return {"status": "success", "analysis": {
-                        "problem": "High CPU usage on server 'app-server-01'",
-                        "cause": "Could not determine exact cause",
-                        "solution": last_message.content if hasattr(last_message, "content") else str(last_message)
-                    }}
+        # Summarizer가 graph 상태에 남긴 구조화된 결과를 그대로 사용
+        summary = final_state.get("summary")
+        if summary is None:
+            last_message = final_state["messages"][-1]
+            logger.warning("Analysis finished without a summary")
+            return {
+                "status": "error",
+                "message": f"No analysis was generated: {getattr(last_message, 'content', last_message)}",
+                "routing": routing,
+                "budget": budget,
+            }
         
-        return {"status": "error", "message": "No analysis was generated"}
+        analysis = summary.model_dump()
+        result = {"status": "success", "analysis": analysis, "routing": routing, "budget": budget}
+        if match is not None:
+            result["similar_incident"] = _similar_incident(match, reused=False)
+        if settings.INCIDENT_INDEX_ENABLED:
+            await incident_index.aadd(alert_description, labels, analysis)
+        return result
     
     except Exception as e:
         logger.error(f"Error analyzing alert: {e}", exc_info=True)
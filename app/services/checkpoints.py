@@ -0,0 +1,176 @@
+"""
+Investigation Checkpoint Service
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from app.conf.config import settings
+from app.conf.logging import logger
+
+
+class InvestigationCheckpoints:
+    """
+    워크플로우 그래프의 checkpoint를 로컬 SQLite 파일에 저장합니다.
+    조사마다 "<fingerprint>:<id>" thread를 만들고 입력과 상태(running, completed, failed)를 기록하여,
+    프로세스가 중간에 종료되면 다음 시작 때 running으로 남은 조사를 마지막으로 끝난 노드부터 이어서 실행합니다.
+    완료된 조사의 checkpoint는 바로 지우고, 나머지는 retention_seconds가 지나면 sweeper가 지웁니다.
+    """
+
+    def __init__(self, path, retention_seconds, sweep_interval):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self.sweep_interval = sweep_interval
+        self._conn = None
+        self._saver = None
+        self._lock = None
+        self._sweeper = None
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.resumed = 0
+        self.swept = 0
+
+    async def _connect(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._conn is None:
+                if self.path != ":memory:":
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                conn = await aiosqlite.connect(self.path)
+                await conn.execute(
+                    "CREATE TABLE IF NOT EXISTS investigations ("
+                    "thread_id TEXT PRIMARY KEY, fingerprint TEXT, description TEXT NOT NULL, "
+                    "labels TEXT, annotations TEXT, status TEXT NOT NULL, "
+                    "started_at REAL NOT NULL, updated_at REAL NOT NULL)"
+                )
+                await conn.commit()
+                saver = AsyncSqliteSaver(conn)
+                await saver.setup()
+                self._conn, self._saver = conn, saver
+        return self._conn
+
+    async def saver(self):
+        await self._connect()
+        return self._saver
+
+    async def begin(self, fingerprint, description, labels=None, annotations=None):
+        """
+        새 조사를 running으로 기록하고 graph config에 쓸 thread_id를 반환합니다.
+        """
+        conn = await self._connect()
+        thread_id = f"{fingerprint or 'alert'}:{uuid.uuid4().hex[:12]}"
+        now = time.time()
+        await conn.execute(
+            "INSERT INTO investigations (thread_id, fingerprint, description, labels, annotations, "
+            "status, started_at, updated_at) VALUES (?, ?, ?, ?, ?, 'running', ?, ?)",
+            (thread_id, fingerprint, description, json.dumps(labels or {}),
+             json.dumps(annotations or {}), now, now),
+        )
+        await conn.commit()
+        self.started += 1
+        return thread_id
+
+    async def finish(self, thread_id, status):
+        conn = await self._connect()
+        await conn.execute(
+            "UPDATE investigations SET status = ?, updated_at = ? WHERE thread_id = ?",
+            (status, time.time(), thread_id),
+        )
+        if status == "completed":
+            # 끝난 조사는 다시 이어서 실행할 일이 없으므로 checkpoint를 바로 지움
+            for table in ("checkpoints", "writes"):
+                await conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self.completed += 1
+        else:
+            self.failed += 1
+        await conn.commit()
+
+    async def interrupted(self):
+        """
+        이전 프로세스가 끝내지 못한(running 상태의) 조사 목록을 오래된 순서로 반환합니다.
+        """
+        conn = await self._connect()
+        async with conn.execute(
+            "SELECT thread_id, fingerprint, description, labels, annotations, started_at "
+            "FROM investigations WHERE status = 'running' AND started_at > ? ORDER BY started_at",
+            (time.time() - self.retention_seconds,),
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [
+            {
+                "thread_id": thread_id,
+                "fingerprint": fingerprint,
+                "description": description,
+                "labels": json.loads(labels or "{}"),
+                "annotations": json.loads(annotations or "{}"),
+                "started_at": started_at,
+            }
+            for thread_id, fingerprint, description, labels, annotations, started_at in rows
+        ]
+
+    async def sweep(self):
+        """
+        retention_seconds보다 오래된 조사와, 기록이 없는 thread의 checkpoint를 지웁니다.
+        """
+        conn = await self._connect()
+        cursor = await conn.execute(
+            "DELETE FROM investigations WHERE updated_at < ?",
+            (time.time() - self.retention_seconds,),
+        )
+        swept = cursor.rowcount
+        for table in ("checkpoints", "writes"):
+            await conn.execute(
+                f"DELETE FROM {table} WHERE thread_id NOT IN (SELECT thread_id FROM investigations)"
+            )
+        await conn.commit()
+        self.swept += swept
+        return swept
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._sweeper is not None and self._sweeper.get_loop() is loop:
+            return
+        self._sweeper = asyncio.create_task(self._sweep_periodically())
+
+    async def _sweep_periodically(self):
+        while True:
+            try:
+                swept = await self.sweep()
+                if swept:
+                    logger.info(f"Removed {swept} expired investigation checkpoint(s)")
+            except Exception as e:
+                logger.error(f"Checkpoint sweep failed: {e}")
+            await asyncio.sleep(self.sweep_interval)
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = self._saver = None
+
+    def stats(self):
+        return {
+            "started": self.started,
+            "completed": self.completed,
+            "failed": self.failed,
+            "resumed": self.resumed,
+            "swept": self.swept,
+        }
+
+
+investigation_checkpoints = InvestigationCheckpoints(
+    path=settings.CHECKPOINT_PATH,
+    retention_seconds=settings.CHECKPOINT_RETENTION_SECONDS,
+    sweep_interval=settings.CHECKPOINT_SWEEP_INTERVAL_SECONDS,
+)
@@ -0,0 +1,49 @@
+"""
+Single-flight Coalescing Service
+"""
+
+import asyncio
+
+from app.conf.logging import logger
+
+
+class SingleFlight:
+    """
+    같은 key로 동시에 들어온 호출을 하나의 실행으로 합치고, 모든 호출자에게 같은 결과를 돌려줍니다.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._inflight = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key, func):
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            self.executions += 1
+            # 첫 호출자가 취소되어도 나머지 대기자가 결과를 받을 수 있도록 별도 task로 실행
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            self.coalesced += 1
+            logger.info(f"[{self.name}] Coalesced duplicate request for key {key}")
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
+
+
+alert_coalescer = SingleFlight("alert")
@@ -0,0 +1,213 @@
+"""
+GitHub Repository Snapshot Service
+"""
+
+import asyncio
+import json
+import time
+from typing import Optional
+
+import httpx
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+
+from app.conf.config import settings
+from app.conf.logging import logger
+
+
+class SnapshotQuery(BaseModel):
+    query: Optional[str] = Field(
+        default=None, description="Optional case-insensitive text to filter by (title, message, author, label)"
+    )
+    limit: int = Field(default=20, description="Maximum number of records to return")
+
+
+def _commit_record(commit):
+    return {
+        "sha": commit.get("sha", "")[:12],
+        "message": (commit.get("commit", {}).get("message") or "").split("\n", 1)[0],
+        "author": (commit.get("commit", {}).get("author") or {}).get("name"),
+        "date": (commit.get("commit", {}).get("author") or {}).get("date"),
+        "url": commit.get("html_url"),
+    }
+
+
+def _issue_record(issue):
+    return {
+        "number": issue.get("number"),
+        "title": issue.get("title"),
+        "labels": [label.get("name") for label in issue.get("labels", [])],
+        "author": (issue.get("user") or {}).get("login"),
+        "updated_at": issue.get("updated_at"),
+        "url": issue.get("html_url"),
+    }
+
+
+def _pull_record(pull):
+    return {
+        "number": pull.get("number"),
+        "title": pull.get("title"),
+        "author": (pull.get("user") or {}).get("login"),
+        "merged_at": pull.get("merged_at"),
+        "merge_commit_sha": (pull.get("merge_commit_sha") or "")[:12],
+        "url": pull.get("html_url"),
+    }
+
+
+class GitHubRepoSnapshot:
+    """
+    설정된 저장소의 최근 commit, open issue, merge된 PR을 주기적으로 가져와 메모리에 보관합니다.
+    GitHub REST API의 ETag / If-None-Match로 재검증하므로 변경이 없으면 304 응답만 받습니다.
+    """
+
+    def __init__(self, owner, repo, token, api_url, refresh_seconds, limit, transport=None):
+        self.owner = owner
+        self.repo = repo
+        self.token = token
+        self.api_url = api_url
+        self.refresh_seconds = refresh_seconds
+        self.limit = limit
+        self._transport = transport
+        self._client = None
+        self._task = None
+        self._etags = {}
+        self.data = {"commits": [], "open_issues": [], "merged_pulls": []}
+        self.refreshed_at = None
+        self.requests = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    def _resources(self):
+        base = f"/repos/{self.owner}/{self.repo}"
+        return {
+            "commits": (f"{base}/commits", {"per_page": self.limit}),
+            "open_issues": (f"{base}/issues", {"state": "open", "per_page": self.limit}),
+            "merged_pulls": (
+                f"{base}/pulls",
+                {"state": "closed", "sort": "updated", "direction": "desc", "per_page": self.limit},
+            ),
+        }
+
+    def _parse(self, resource, payload):
+        if resource == "commits":
+            return [_commit_record(commit) for commit in payload]
+        if resource == "open_issues":
+            # issues API는 PR도 함께 반환하므로 제외
+            return [_issue_record(issue) for issue in payload if "pull_request" not in issue]
+        return [_pull_record(pull) for pull in payload if pull.get("merged_at")]
+
+    def _get_client(self):
+        if self._client is None:
+            headers = {"Accept": "application/vnd.github+json"}
+            if self.token:
+                headers["Authorization"] = f"Bearer {self.token}"
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url, headers=headers, timeout=15.0, transport=self._transport
+            )
+        return self._client
+
+    async def refresh(self):
+        client = self._get_client()
+        for resource, (path, params) in self._resources().items():
+            headers = {}
+            if resource in self._etags:
+                headers["If-None-Match"] = self._etags[resource]
+            self.requests += 1
+            try:
+                response = await client.get(path, params=params, headers=headers)
+                if response.status_code == 304:
+                    self.not_modified += 1
+                    continue
+                response.raise_for_status()
+                self.data[resource] = self._parse(resource, response.json())
+                if response.headers.get("etag"):
+                    self._etags[resource] = response.headers["etag"]
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"GitHub snapshot refresh of {resource} failed: {e}")
+        self.refreshed_at = time.time()
+
+    async def start(self):
+        if self._task is not None:
+            return
+        await self.refresh()
+        self._task = asyncio.create_task(self._refresh_loop())
+        logger.info(
+            f"GitHub snapshot of {self.owner}/{self.repo} started "
+            f"({', '.join(f'{key}={len(value)}' for key, value in self.data.items())})"
+        )
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self.refresh()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def search(self, resource, query=None, limit=20):
+        records = self.data[resource]
+        if query:
+            needle = query.lower()
+            records = [record for record in records if needle in json.dumps(record).lower()]
+        return records[:limit]
+
+    def get_tools(self):
+        """
+        네트워크 호출 없이 snapshot을 조회하는 tool 목록을 반환합니다.
+        """
+        descriptions = {
+            "commits": "recent commits",
+            "open_issues": "open issues",
+            "merged_pulls": "recently merged pull requests",
+        }
+        tools = []
+        for resource, description in descriptions.items():
+            def lookup(query=None, limit=20, resource=resource):
+                return json.dumps(
+                    {
+                        "repository": f"{self.owner}/{self.repo}",
+                        "refreshed_at": self.refreshed_at,
+                        resource: self.search(resource, query, limit),
+                    }
+                )
+
+            tools.append(
+                StructuredTool.from_function(
+                    func=lookup,
+                    name=f"snapshot_{resource}",
+                    description=(
+                        f"Look up {description} of {self.owner}/{self.repo} from a locally "
+                        f"cached snapshot (refreshed every {self.refresh_seconds}s). "
+                        "Fast and does not use the GitHub rate limit."
+                    ),
+                    args_schema=SnapshotQuery,
+                )
+            )
+        return tools
+
+    def stats(self):
+        return {
+            "repository": f"{self.owner}/{self.repo}",
+            "refreshed_at": self.refreshed_at,
+            "records": {key: len(value) for key, value in self.data.items()},
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+        }
+
+
+github_snapshot = GitHubRepoSnapshot(
+    owner=settings.GITHUB_REPO_OWNER,
+    repo=settings.GITHUB_REPO_NAME,
+    token=settings.GITHUB_TOKEN,
+    api_url=settings.GITHUB_API_URL,
+    refresh_seconds=settings.GITHUB_SNAPSHOT_REFRESH_SECONDS,
+    limit=settings.GITHUB_SNAPSHOT_LIMIT,
+)
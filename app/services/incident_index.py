@@ -0,0 +1,277 @@
+"""
+Similar Incident Index Service
+"""
+
+import asyncio
+import array
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from app.conf.config import settings
+from app.conf.logging import logger
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_.\-/:]+")
+_NUMBER_PATTERN = re.compile(r"^\d+([.,]\d+)?%?$")
+# MinHash 계산에 사용하는 Mersenne prime (2^31 - 1)
+_PRIME = np.uint64((1 << 31) - 1)
+# LSH band 하나에 묶는 signature 값 수 (유사도 0.5에서 후보로 잡힐 확률 약 94%)
+BAND_ROWS = 3
+# 전체 signature를 비교할 최대 후보 수
+RERANK_CANDIDATES = 64
+
+
+def incident_tokens(description, labels=None):
+    """
+    설명의 단어와 bigram, label key=value를 집합으로 만듭니다. 숫자 값은 하나의 token으로 통일합니다.
+    """
+    words = [
+        "<num>" if _NUMBER_PATTERN.match(token) else token
+        for token in _TOKEN_PATTERN.findall((description or "").lower())
+    ]
+    tokens = set(words)
+    tokens.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+    tokens.update(f"{key}={value}".lower() for key, value in (labels or {}).items())
+    return tokens
+
+
+class IncidentIndex:
+    """
+    과거 분석 결과를 MinHash signature로 색인하여 비슷한 alert를 찾습니다.
+    signature는 NumPy 배열에 메모리로 보관하고, 원본 기록과 함께 SQLite에 저장합니다.
+    LSH band별 inverted index로 후보를 찾고, 같은 band가 많은 상위 후보만 전체 signature를 비교합니다.
+    max_entries를 넘거나 max_age_seconds보다 오래된 incident는 SQLite와 메모리 색인에서 함께 제거합니다.
+    """
+
+    def __init__(self, path, num_perm, seed=1, max_entries=0, max_age_seconds=0):
+        self.path = path
+        self.num_perm = num_perm
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self.num_bands = num_perm // BAND_ROWS
+        self._band_mult = rng.integers(1, 1 << 63, size=BAND_ROWS, dtype=np.uint64) | np.uint64(1)
+        self._conn = None
+        self._lock = threading.Lock()
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._buckets = [{} for _ in range(self.num_bands)]
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+        self._pruned_at = 0.0
+        self.pruned = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.reused = 0
+        self.context_injected = 0
+
+    def signature(self, tokens):
+        if not tokens:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        hashes = np.fromiter(
+            (zlib.crc32(token.encode()) & 0x7FFFFFFF for token in tokens),
+            dtype=np.uint64,
+            count=len(tokens),
+        )
+        # (a * h + b) mod p 를 permutation별로 계산하여 최소값을 취함
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def bands(self, signatures):
+        # BAND_ROWS개 값을 하나의 uint64 key로 합침 (overflow는 mod 2^64로 wrap)
+        rows = signatures[..., : self.num_bands * BAND_ROWS].astype(np.uint64)
+        rows = rows.reshape(*signatures.shape[:-1], self.num_bands, BAND_ROWS)
+        return (rows * self._band_mult).sum(axis=-1, dtype=np.uint64)
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS incidents ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, description TEXT NOT NULL, "
+                "labels TEXT NOT NULL, analysis TEXT NOT NULL, "
+                "signature BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+            self._delete_expired(time.time())
+            self._load()
+        return self._conn
+
+    def _delete_expired(self, now):
+        # 오래된 incident와 max_entries를 넘는 가장 오래된 incident를 삭제하고 삭제한 수를 반환
+        deleted = 0
+        if self.max_age_seconds:
+            deleted += self._conn.execute(
+                "DELETE FROM incidents WHERE created_at < ?", (now - self.max_age_seconds,)
+            ).rowcount
+        if self.max_entries:
+            deleted += self._conn.execute(
+                "DELETE FROM incidents WHERE id NOT IN "
+                "(SELECT id FROM incidents ORDER BY id DESC LIMIT ?)",
+                (self.max_entries,),
+            ).rowcount
+        self._conn.commit()
+        self._pruned_at = now
+        self.pruned += deleted
+        return deleted
+
+    def _prune(self, now):
+        """
+        한도를 넘으면 오래된 incident를 지우고 메모리 색인을 다시 만듭니다.
+        재구성 비용을 나누기 위해 max_entries의 10%만큼 넘었을 때, 또는 max_age_seconds의 1/10마다 정리합니다.
+        """
+        overflow = self.max_entries and self._size - self.max_entries >= max(1, self.max_entries // 10)
+        aged = self.max_age_seconds and now - self._pruned_at >= max(60.0, self.max_age_seconds / 10)
+        if not (overflow or aged) or not self._delete_expired(now):
+            return
+        self._signatures = np.empty((0, self.num_perm), dtype=np.uint32)
+        self._buckets = [{} for _ in range(self.num_bands)]
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute("SELECT id, signature FROM incidents ORDER BY id").fetchall()
+        signatures = [
+            np.frombuffer(signature, dtype=np.uint32)
+            for _, signature in rows
+            if len(signature) == self.num_perm * 4
+        ]
+        ids = [row_id for row_id, signature in rows if len(signature) == self.num_perm * 4]
+        if signatures:
+            self._signatures = np.vstack(signatures)
+            self._ids = np.array(ids, dtype=np.int64)
+            for position, bands in enumerate(self.bands(self._signatures).tolist()):
+                self._index_bands(position, bands)
+        self._size = len(ids)
+        logger.info(f"Incident index loaded {self._size} incidents")
+
+    def _append(self, row_id, signature):
+        # 용량을 두 배씩 늘려 삽입을 amortized O(1)로 유지
+        if self._size == len(self._signatures):
+            capacity = max(1024, len(self._signatures) * 2)
+            signatures = np.empty((capacity, self.num_perm), dtype=np.uint32)
+            signatures[: self._size] = self._signatures[: self._size]
+            ids = np.empty(capacity, dtype=np.int64)
+            ids[: self._size] = self._ids[: self._size]
+            self._signatures, self._ids = signatures, ids
+        self._signatures[self._size] = signature
+        self._ids[self._size] = row_id
+        self._index_bands(self._size, self.bands(signature).tolist())
+        self._size += 1
+
+    def _index_bands(self, position, bands):
+        for bucket, key in zip(self._buckets, bands):
+            # array는 np.frombuffer로 복사 없이 읽을 수 있음
+            bucket.setdefault(key, array.array("q")).append(position)
+
+    def add(self, description, labels, analysis):
+        signature = self.signature(incident_tokens(description, labels))
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute(
+                "INSERT INTO incidents (description, labels, analysis, signature, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    description,
+                    json.dumps(labels or {}),
+                    json.dumps(analysis),
+                    signature.tobytes(),
+                    time.time(),
+                ),
+            )
+            conn.commit()
+            self._append(cursor.lastrowid, signature)
+            self._prune(time.time())
+        return cursor.lastrowid
+
+    def search(self, description, labels=None):
+        """
+        가장 비슷한 과거 incident와 추정 Jaccard 유사도를 반환합니다. 후보가 없으면 None입니다.
+        """
+        started = time.perf_counter()
+        signature = self.signature(incident_tokens(description, labels))
+        query_bands = self.bands(signature)
+        with self._lock:
+            conn = self._connect()
+            self.queries += 1
+            postings = [
+                bucket[key]
+                for bucket, key in zip(self._buckets, query_bands.tolist())
+                if key in bucket
+            ]
+            if not postings:
+                self.query_seconds += time.perf_counter() - started
+                return None
+            # 일치하는 band 수가 많은 상위 후보만 전체 signature로 비교
+            collisions = np.bincount(
+                np.concatenate([np.frombuffer(posting, dtype=np.int64) for posting in postings])
+            )
+            candidates = np.flatnonzero(collisions)
+            if len(candidates) > RERANK_CANDIDATES:
+                top = np.argpartition(collisions[candidates], -RERANK_CANDIDATES)
+                candidates = candidates[top[-RERANK_CANDIDATES:]]
+            similarities = np.count_nonzero(
+                self._signatures[candidates] == signature, axis=1
+            )
+            best = int(similarities.argmax())
+            similarity = similarities[best] / self.num_perm
+            row = conn.execute(
+                "SELECT id, description, labels, analysis, created_at FROM incidents WHERE id = ?",
+                (int(self._ids[candidates[best]]),),
+            ).fetchone()
+            self.query_seconds += time.perf_counter() - started
+        incident_id, prior_description, prior_labels, analysis, created_at = row
+        return {
+            "incident_id": incident_id,
+            "similarity": round(float(similarity), 3),
+            "description": prior_description,
+            "labels": json.loads(prior_labels),
+            "analysis": json.loads(analysis),
+            "created_at": created_at,
+        }
+
+    async def aadd(self, description, labels, analysis):
+        try:
+            return await asyncio.to_thread(self.add, description, labels, analysis)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to store incident: {e}")
+            return None
+
+    async def asearch(self, description, labels=None):
+        try:
+            return await asyncio.to_thread(self.search, description, labels)
+        except sqlite3.Error as e:
+            logger.error(f"Incident index lookup failed: {e}")
+            return None
+
+    def stats(self):
+        with self._lock:
+            self._connect()
+            size = self._size
+        return {
+            "incidents": size,
+            "pruned": self.pruned,
+            "queries": self.queries,
+            "avg_query_ms": self.query_seconds / self.queries * 1000 if self.queries else 0.0,
+            "reused": self.reused,
+            "context_injected": self.context_injected,
+        }
+
+
+incident_index = IncidentIndex(
+    path=settings.INCIDENT_INDEX_PATH,
+    num_perm=settings.INCIDENT_INDEX_PERMUTATIONS,
+    max_entries=settings.INCIDENT_INDEX_MAX_ENTRIES,
+    max_age_seconds=settings.INCIDENT_INDEX_MAX_AGE_SECONDS,
+)
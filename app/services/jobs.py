@@ -0,0 +1,156 @@
+"""
+Analysis Job Queue Service
+"""
+
+import asyncio
+import time
+import uuid
+
+from app.conf.config import settings
+from app.conf.logging import logger
+
+
+class AnalysisJob:
+    def __init__(self, func):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._func = func
+        self._done = asyncio.Event()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+        }
+
+
+class AnalysisJobQueue:
+    """
+    bounded queue와 고정 개수의 asyncio worker로 분석 작업을 비동기로 처리합니다.
+    """
+
+    def __init__(self, workers, max_queue_size, retention_seconds):
+        self.worker_count = workers
+        self.max_queue_size = max_queue_size
+        self.retention_seconds = retention_seconds
+        self._queue = None
+        self._workers = []
+        self._jobs = {}
+        self.busy_workers = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        # queue에는 들어갔지만 admission control이 분석을 거절한 작업
+        self.admission_rejected = 0
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._workers and self._workers[0].get_loop() is loop:
+            return
+        # 다른 event loop에서 만든 worker/queue는 재사용할 수 없으므로 새로 생성
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.worker_count)
+        ]
+        logger.info(f"Started {self.worker_count} analysis workers")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Analysis workers stopped")
+
+    def submit(self, func):
+        """
+        작업을 큐에 넣고 AnalysisJob을 반환합니다. 큐가 가득 차면 asyncio.QueueFull을 발생시킵니다.
+        """
+        self.start()
+        self._prune()
+        job = AnalysisJob(func)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise
+        self._jobs[job.id] = job
+        self.submitted += 1
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id, timeout):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        try:
+            await asyncio.wait_for(job._done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    async def _worker(self, index):
+        while True:
+            job = await self._queue.get()
+            self.busy_workers += 1
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await job._func()
+                if (job.result or {}).get("status") == "rejected":
+                    job.status = "rejected"
+                    self.admission_rejected += 1
+                else:
+                    job.status = "completed"
+                    self.completed += 1
+            except Exception as e:
+                logger.error(f"Analysis job {job.id} failed: {e}", exc_info=True)
+                job.result = {"status": "error", "message": str(e)}
+                job.status = "failed"
+                self.failed += 1
+            finally:
+                job.finished_at = time.time()
+                job._done.set()
+                self.busy_workers -= 1
+                self._queue.task_done()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_capacity": self.max_queue_size,
+            "workers": len(self._workers),
+            "busy_workers": self.busy_workers,
+            "utilisation": self.busy_workers / self.worker_count if self.worker_count else 0.0,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "admission_rejected": self.admission_rejected,
+        }
+
+
+analysis_jobs = AnalysisJobQueue(
+    workers=settings.ANALYSIS_WORKERS,
+    max_queue_size=settings.ANALYSIS_QUEUE_SIZE,
+    retention_seconds=settings.ANALYSIS_JOB_RETENTION_SECONDS,
+)
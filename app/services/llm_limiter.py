@@ -0,0 +1,176 @@
+"""
+LLM Rate Limiter Service
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+
+from app.conf.config import settings
+from app.conf.logging import logger
+from app.services.metrics import llm_limiter_queue_depth, llm_limiter_wait, llm_rate_limited
+
+
+class LLMRateLimiter:
+    """
+    프로세스 전체의 OpenAI 호출을 분당 요청 수(RPM)와 분당 token 수(TPM) token bucket으로 제한합니다.
+    호출 전에 추정한 token 수를 미리 차감하고, 응답을 받으면 실제 사용량으로 보정합니다.
+    bucket이 비어 있으면 호출은 agent 우선순위 순서의 queue에서 기다립니다 (작업을 끝내는 Summarizer가 먼저).
+    """
+
+    def __init__(self, rpm, tpm, priority_order, pause_seconds):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.priority_order = priority_order
+        self.pause_seconds = pause_seconds
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._timer = None
+        self.granted = 0
+        self.queued = 0
+        self.rate_limited = 0
+
+    def priority(self, agent):
+        # 숫자가 작을수록 우선순위가 높음
+        if agent in self.priority_order:
+            return self.priority_order.index(agent)
+        return len(self.priority_order)
+
+    def _refill(self, now):
+        elapsed = now - self._refilled
+        self._refilled = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _cost(self, tokens):
+        # bucket보다 큰 요청도 언젠가는 통과하도록 bucket 크기로 제한
+        return min(tokens, self.tpm)
+
+    def _available(self, tokens, now):
+        if now < self._paused_until:
+            return False
+        if self.rpm and self._requests < 1:
+            return False
+        if self.tpm and self._tokens < self._cost(tokens):
+            return False
+        return True
+
+    def _take(self, tokens):
+        if self.rpm:
+            self._requests -= 1
+        if self.tpm:
+            self._tokens -= self._cost(tokens)
+        self.granted += 1
+
+    def _delay(self, tokens, now):
+        delays = [self._paused_until - now]
+        if self.rpm:
+            delays.append((1 - self._requests) * 60 / self.rpm)
+        if self.tpm:
+            delays.append((self._cost(tokens) - self._tokens) * 60 / self.tpm)
+        return max(0.0, *delays)
+
+    async def acquire(self, agent, tokens):
+        """
+        tokens(prompt 추정치 + 예상 completion)만큼의 몫을 받을 때까지 기다립니다.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if not self._waiting and self._available(tokens, now):
+            self._take(tokens)
+            llm_limiter_wait.labels(agent).observe(0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (self.priority(agent), next(self._sequence), agent, tokens, future)
+        heapq.heappush(self._waiting, entry)
+        self.queued += 1
+        self._dispatch()
+        started = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if entry in self._waiting:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+            elif future.done() and not future.cancelled():
+                # 몫을 받은 직후에 취소되면 요청을 보내지 않았으므로 되돌려 줌
+                self.settle(tokens, 0, requested=False)
+            self._dispatch()
+            raise
+        llm_limiter_wait.labels(agent).observe(time.perf_counter() - started)
+
+    def _dispatch(self):
+        # 우선순위가 가장 높은 대기 항목부터 통과시키고, 맨 앞 항목이 통과할 수 있는 시점에 다시 확인
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiting:
+            _, _, _, tokens, future = self._waiting[0]
+            if future.done():
+                heapq.heappop(self._waiting)
+                continue
+            if not self._available(tokens, now):
+                break
+            heapq.heappop(self._waiting)
+            self._take(tokens)
+            future.set_result(None)
+        llm_limiter_queue_depth.set(len(self._waiting))
+        if self._waiting:
+            delay = self._delay(self._waiting[0][3], now)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def settle(self, estimated, used, requested=True):
+        """
+        미리 차감한 추정치와 실제 사용량의 차이를 bucket에 반영합니다. used가 0이면 사용량을 모르는 것으로 봅니다.
+        """
+        if self.tpm and (used or not requested):
+            self._tokens = min(self.tpm, self._tokens + self._cost(estimated) - used)
+        if self.rpm and not requested:
+            self._requests = min(self.rpm, self._requests + 1)
+        if self._waiting:
+            self._dispatch()
+
+    def penalize(self, agent, retry_after=None):
+        """
+        OpenAI가 429를 반환하면 bucket을 비우고 잠시 모든 호출을 멈춰서 재시도가 몰리지 않게 합니다.
+        """
+        pause = retry_after or self.pause_seconds
+        self.rate_limited += 1
+        llm_rate_limited.labels(agent).inc()
+        logger.warning(f"OpenAI rate limit hit by {agent}, pausing LLM calls for {pause}s")
+        self._requests = min(self._requests, 0.0)
+        self._tokens = min(self._tokens, 0.0)
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        if self._waiting:
+            self._dispatch()
+
+    def stats(self):
+        self._refill(time.monotonic())
+        return {
+            "rpm_limit": self.rpm,
+            "tpm_limit": self.tpm,
+            "requests_available": int(self._requests) if self.rpm else None,
+            "tokens_available": int(self._tokens) if self.tpm else None,
+            "waiting": len(self._waiting),
+            "granted": self.granted,
+            "queued": self.queued,
+            "rate_limited": self.rate_limited,
+        }
+
+
+llm_limiter = LLMRateLimiter(
+    rpm=settings.LLM_RPM_LIMIT,
+    tpm=settings.LLM_TPM_LIMIT,
+    priority_order=[item.strip() for item in settings.LLM_PRIORITY_ORDER.split(",") if item.strip()],
+    pause_seconds=settings.LLM_RATE_LIMIT_PAUSE_SECONDS,
+)
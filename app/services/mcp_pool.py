@@ -0,0 +1,268 @@
+"""
+MCP Server Pool Service
+"""
+
+import asyncio
+import time
+
+from langchain_core.tools import StructuredTool, ToolException
+from langchain_mcp_adapters.client import MultiServerMCPClient
+
+from app.conf.config import settings
+from app.conf.logging import logger
+from app.services.metrics import tool_errors, tool_latency
+
+
+class MCPServerInstance:
+    """
+    하나의 MCP 서버 subprocess와 세션입니다.
+
+    stdio 연결은 anyio cancel scope를 사용하므로, 연결 생성과 종료를 같은 task에서 수행하도록
+    전용 task 안에서 client context를 유지합니다.
+    """
+
+    def __init__(self, server, connection, index):
+        self.server = server
+        self.connection = connection
+        self.index = index
+        self.session = None
+        self.tools = {}
+        self.in_flight = 0
+        self.calls = 0
+        self.healthy = False
+        self._task = None
+        self._ready = None
+        self._stop = None
+        self._error = None
+
+    async def start(self):
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._error = None
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        logger.info(
+            f"MCP server {self.server}#{self.index} started with {len(self.tools)} tools"
+        )
+
+    async def _run(self):
+        try:
+            async with MultiServerMCPClient({self.server: self.connection}) as client:
+                self.session = client.sessions[self.server]
+                self.tools = {tool.name: tool for tool in client.get_tools()}
+                self.healthy = True
+                self._ready.set()
+                await self._stop.wait()
+        except Exception as e:
+            self._error = e
+            logger.error(f"MCP server {self.server}#{self.index} exited: {e}")
+        finally:
+            self.healthy = False
+            self.session = None
+            self._ready.set()
+
+    async def stop(self, timeout=10.0):
+        if self._task is None:
+            return
+        self._stop.set()
+        # wait_for와 달리 stop을 호출한 task가 취소되어도 연결 task는 취소하지 않아,
+        # 다음 stop에서 같은 task를 다시 기다려 정상적으로 종료할 수 있음
+        done, _ = await asyncio.wait({self._task}, timeout=timeout)
+        if not done:
+            logger.warning(f"MCP server {self.server}#{self.index} did not stop within {timeout}s")
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def ping(self, timeout):
+        if not self.healthy or self.session is None:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"MCP server {self.server}#{self.index} ping failed: {e}")
+            return False
+
+
+class MCPServerPool:
+    """
+    MCP 서버별로 N개의 subprocess를 미리 띄워두고, 가장 한가한 인스턴스로 tool 호출을 분배합니다.
+    주기적으로 ping을 보내고, 응답하지 않거나 종료된 인스턴스는 다시 시작합니다.
+    """
+
+    def __init__(self, server, connection, size, ping_interval, ping_timeout):
+        self.server = server
+        self.connection = connection
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.instances = [MCPServerInstance(server, connection, i) for i in range(size)]
+        self._restart_locks = [asyncio.Lock() for _ in range(size)]
+        self._health_task = None
+        self._restart_tasks = set()
+        self.errors = 0
+        self.restarts = 0
+
+    async def start(self):
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *[instance.start() for instance in self.instances], return_exceptions=True
+        )
+        failures = [result for result in results if isinstance(result, Exception)]
+        if len(failures) == len(self.instances):
+            raise failures[0]
+        for failure in failures:
+            logger.warning(f"MCP pool {self.server}: instance failed to start: {failure}")
+        self._health_task = asyncio.create_task(self._health_loop())
+        logger.info(
+            f"MCP pool {self.server} started {len(self.instances) - len(failures)}/"
+            f"{len(self.instances)} instances in {time.perf_counter() - started:.2f}s"
+        )
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        # 진행 중인 재시작이 종료 후에 subprocess를 다시 띄우지 않도록 먼저 취소
+        for task in self._restart_tasks:
+            task.cancel()
+        await asyncio.gather(*self._restart_tasks, return_exceptions=True)
+        await asyncio.gather(*[instance.stop() for instance in self.instances])
+        logger.info(f"MCP pool {self.server} closed")
+
+    def get_tools(self):
+        """
+        pool로 호출을 분배하는 LangChain tool 목록을 반환합니다.
+        """
+        template = next(
+            (instance for instance in self.instances if instance.tools), None
+        )
+        if template is None:
+            return []
+        return [
+            StructuredTool(
+                name=tool.name,
+                description=tool.description,
+                args_schema=tool.args_schema,
+                coroutine=self._tool_coroutine(tool.name),
+            )
+            for tool in template.tools.values()
+        ]
+
+    def _tool_coroutine(self, tool_name):
+        async def call(**arguments):
+            return await self.call(tool_name, arguments)
+
+        return call
+
+    async def call(self, tool_name, arguments):
+        instance = await self._acquire()
+        instance.in_flight += 1
+        instance.calls += 1
+        started = time.perf_counter()
+        try:
+            return await instance.tools[tool_name].ainvoke(arguments)
+        except ToolException:
+            # MCP 서버가 정상적으로 반환한 tool 오류
+            self.errors += 1
+            tool_errors.labels(self.server, tool_name).inc()
+            raise
+        except Exception:
+            self.errors += 1
+            tool_errors.labels(self.server, tool_name).inc()
+            if not await instance.ping(self.ping_timeout):
+                instance.healthy = False
+                self._schedule_restart(instance)
+            raise
+        finally:
+            instance.in_flight -= 1
+            tool_latency.labels(self.server, tool_name).observe(time.perf_counter() - started)
+
+    async def _acquire(self):
+        healthy = [instance for instance in self.instances if instance.healthy]
+        if healthy:
+            return min(healthy, key=lambda instance: (instance.in_flight, instance.index))
+        # 정상 인스턴스가 없으면 하나를 다시 시작해서 사용
+        instance = self.instances[0]
+        await self._restart(instance)
+        if not instance.healthy:
+            raise RuntimeError(f"No healthy MCP server instance for {self.server}")
+        return instance
+
+    def _schedule_restart(self, instance):
+        # task가 GC되지 않도록 참조를 유지하고, 끝나면 제거
+        task = asyncio.create_task(self._restart(instance))
+        self._restart_tasks.add(task)
+        task.add_done_callback(self._restart_tasks.discard)
+
+    async def _restart(self, instance):
+        lock = self._restart_locks[instance.index]
+        if lock.locked():
+            async with lock:
+                return
+        async with lock:
+            if instance.healthy and await instance.ping(self.ping_timeout):
+                return
+            logger.warning(f"Restarting MCP server {self.server}#{instance.index}")
+            self.restarts += 1
+            await instance.stop()
+            try:
+                await instance.start()
+            except Exception as e:
+                logger.error(f"Failed to restart MCP server {self.server}#{instance.index}: {e}")
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            for instance in self.instances:
+                # 호출 중인 인스턴스는 응답이 늦을 수 있으므로 건너뜀
+                if instance.in_flight:
+                    continue
+                if not await instance.ping(self.ping_timeout):
+                    await self._restart(instance)
+
+    def stats(self):
+        return {
+            "size": len(self.instances),
+            "healthy": sum(1 for instance in self.instances if instance.healthy),
+            "in_flight": [instance.in_flight for instance in self.instances],
+            "calls": [instance.calls for instance in self.instances],
+            "errors": self.errors,
+            "restarts": self.restarts,
+        }
+
+
+mcp_pools = {}
+_pool_locks = {}
+
+
+async def get_mcp_pool(server, connection):
+    """
+    서버 이름별로 하나의 pool을 만들어 시작하고 재사용합니다.
+    """
+    async with _pool_locks.setdefault(server, asyncio.Lock()):
+        pool = mcp_pools.get(server)
+        if pool is None:
+            pool = MCPServerPool(
+                server,
+                connection,
+                size=settings.MCP_POOL_SIZE,
+                ping_interval=settings.MCP_PING_INTERVAL_SECONDS,
+                ping_timeout=settings.MCP_PING_TIMEOUT_SECONDS,
+            )
+            await pool.start()
+            mcp_pools[server] = pool
+        return pool
+
+
+async def close_mcp_pools():
+    pools = list(mcp_pools.values())
+    mcp_pools.clear()
+    await asyncio.gather(*[pool.close() for pool in pools], return_exceptions=True)
+
+
+def mcp_pool_stats():
+    return {server: pool.stats() for server, pool in mcp_pools.items()}
@@ -0,0 +1,226 @@
+"""
+Prometheus Metrics Service
+"""
+
+import functools
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+registry = CollectorRegistry()
+
+# LLM 호출이 포함된 노드는 수십 초까지 걸릴 수 있음
+NODE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TOOL_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+node_latency = Histogram(
+    "alert_analyzer_node_duration_seconds",
+    "Duration of a workflow graph node run",
+    ["node"],
+    buckets=NODE_BUCKETS,
+    registry=registry,
+)
+llm_tokens = Counter(
+    "alert_analyzer_llm_tokens_total",
+    "LLM tokens used per agent",
+    ["agent", "kind"],
+    registry=registry,
+)
+llm_calls = Counter(
+    "alert_analyzer_llm_calls_total",
+    "LLM calls per agent",
+    ["agent"],
+    registry=registry,
+)
+tool_latency = Histogram(
+    "alert_analyzer_tool_call_duration_seconds",
+    "Duration of an MCP tool call",
+    ["server", "tool"],
+    buckets=TOOL_BUCKETS,
+    registry=registry,
+)
+tool_errors = Counter(
+    "alert_analyzer_tool_call_errors_total",
+    "Failed MCP tool calls",
+    ["server", "tool"],
+    registry=registry,
+)
+supervisor_iterations = Histogram(
+    "alert_analyzer_supervisor_iterations",
+    "Supervisor iterations per analysis",
+    # 반복 한도(ANALYSIS_MAX_ITERATIONS)가 budget보다 넉넉하므로 10을 넘는 분석도 구분되도록 Fibonacci 간격
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34),
+    registry=registry,
+)
+analyses_in_flight = Gauge(
+    "alert_analyzer_analyses_in_flight",
+    "Analyses currently running the workflow graph",
+    registry=registry,
+)
+email_latency = Histogram(
+    "alert_analyzer_email_send_duration_seconds",
+    "Duration of sending an alert email",
+    ["status"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    registry=registry,
+)
+email_queue_depth = Gauge(
+    "alert_analyzer_email_queue_depth",
+    "Emails waiting for delivery",
+    registry=registry,
+)
+email_batch_size = Histogram(
+    "alert_analyzer_email_batch_size",
+    "Analyses per delivered email",
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+    registry=registry,
+)
+email_dropped = Counter(
+    "alert_analyzer_email_dropped_total",
+    "Emails dropped because the delivery queue was full",
+    registry=registry,
+)
+smtp_connections = Counter(
+    "alert_analyzer_smtp_connections_total",
+    "SMTP sessions opened",
+    registry=registry,
+)
+outbox_commit_batch_size = Histogram(
+    "alert_analyzer_outbox_commit_batch_size",
+    "Notifications written per outbox commit",
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+    registry=registry,
+)
+outbox_deliveries = Counter(
+    "alert_analyzer_outbox_deliveries_total",
+    "Outbox delivery outcomes",
+    ["result"],
+    registry=registry,
+)
+admission_running = Gauge(
+    "alert_analyzer_admission_running",
+    "Analyses holding an admission slot",
+    registry=registry,
+)
+admission_queue_depth = Gauge(
+    "alert_analyzer_admission_queue_depth",
+    "Analyses waiting for an admission slot",
+    registry=registry,
+)
+admission_queue_wait = Histogram(
+    "alert_analyzer_admission_queue_wait_seconds",
+    "Time an analysis waited for an admission slot",
+    ["severity"],
+    buckets=(0, 0.5, 1, 5, 10, 30, 60, 120, 300),
+    registry=registry,
+)
+admission_rejections = Counter(
+    "alert_analyzer_admission_rejections_total",
+    "Analyses rejected by admission control",
+    ["severity", "reason"],
+    registry=registry,
+)
+analysis_budget_exhausted = Counter(
+    "alert_analyzer_analysis_budget_exhausted_total",
+    "Analyses that were cut short by their deadline or token budget",
+    ["reason"],
+    registry=registry,
+)
+llm_limiter_wait = Histogram(
+    "alert_analyzer_llm_limiter_wait_seconds",
+    "Time an LLM call waited for rate limit capacity",
+    ["agent"],
+    buckets=(0, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60),
+    registry=registry,
+)
+llm_limiter_queue_depth = Gauge(
+    "alert_analyzer_llm_limiter_queue_depth",
+    "LLM calls waiting for rate limit capacity",
+    registry=registry,
+)
+llm_rate_limited = Counter(
+    "alert_analyzer_llm_rate_limited_total",
+    "LLM calls answered with 429 by OpenAI",
+    ["agent"],
+    registry=registry,
+)
+llm_call_latency = Histogram(
+    "alert_analyzer_llm_call_duration_seconds",
+    "Duration of one chat model request",
+    ["model", "status"],
+    buckets=NODE_BUCKETS,
+    registry=registry,
+)
+llm_tier_calls = Counter(
+    "alert_analyzer_llm_tier_calls_total",
+    "LLM calls per agent and the model tier that served them",
+    ["agent", "model", "tier"],
+    registry=registry,
+)
+llm_model_degraded = Gauge(
+    "alert_analyzer_llm_model_degraded",
+    "1 while a model is skipped for its latency or error rate",
+    ["model"],
+    registry=registry,
+)
+
+
+def llm_usage(response):
+    """
+    LLMResult에서 (prompt, completion) token 수를 꺼냅니다.
+    """
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+    if not prompt_tokens and not completion_tokens:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """
+    chat model 호출이 끝날 때 agent별 prompt / completion token 수를 기록합니다.
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    def on_llm_end(self, response, **kwargs):
+        llm_calls.labels(self.agent).inc()
+        prompt_tokens, completion_tokens = llm_usage(response)
+        llm_tokens.labels(self.agent, "prompt").inc(prompt_tokens)
+        llm_tokens.labels(self.agent, "completion").inc(completion_tokens)
+
+
+def observe_node(name, node):
+    """
+    그래프 노드 함수를 감싸서 실행 시간을 node_latency에 기록합니다.
+    """
+
+    @functools.wraps(node)
+    async def observed(state):
+        started = time.perf_counter()
+        try:
+            return await node(state)
+        finally:
+            node_latency.labels(name).observe(time.perf_counter() - started)
+
+    return observed
+
+
+def render_metrics():
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,109 @@
+"""
+Model Tier Routing Service
+"""
+
+import time
+from collections import deque
+
+from app.conf.config import settings
+from app.conf.logging import logger
+from app.services.metrics import llm_call_latency, llm_model_degraded, llm_tier_calls
+
+
+def parse_model_chain(spec):
+    """
+    "gpt-4o,gpt-4o-mini"처럼 primary부터 fallback 순서로 적은 모델 목록을 파싱합니다.
+    """
+    return [model.strip() for model in (spec or "").split(",") if model.strip()]
+
+
+def tier_label(tier):
+    return "primary" if tier == 0 else f"fallback{tier}"
+
+
+class ModelTierRouter:
+    """
+    모델별 최근 호출의 지연 시간과 오류를 window_seconds 동안 기록하고,
+    p95 지연 시간이나 오류율이 기준을 넘은 모델은 건너뛰고 fallback 모델로 보냅니다.
+    오래된 기록이 window에서 빠지면 primary 모델을 다시 사용합니다.
+    """
+
+    def __init__(self, p95_seconds, error_rate, window_seconds, min_samples):
+        self.p95_seconds = p95_seconds
+        self.error_rate = error_rate
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self._samples = {}
+        self._degraded = set()
+        self.served = {}
+        self.fallbacks = 0
+
+    def _window(self, model, now):
+        samples = self._samples.setdefault(model, deque())
+        while samples and samples[0][0] < now - self.window_seconds:
+            samples.popleft()
+        return samples
+
+    def record(self, model, seconds, ok=True, now=None):
+        now = time.monotonic() if now is None else now
+        self._window(model, now).append((now, seconds, ok))
+        llm_call_latency.labels(model, "ok" if ok else "error").observe(seconds)
+
+    def health(self, model, now=None):
+        now = time.monotonic() if now is None else now
+        samples = self._window(model, now)
+        if not samples:
+            return {"samples": 0, "p95_seconds": None, "error_rate": None}
+        latencies = sorted(seconds for _, seconds, _ in samples)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        errors = sum(1 for _, _, ok in samples if not ok)
+        return {"samples": len(samples), "p95_seconds": round(p95, 3), "error_rate": round(errors / len(samples), 3)}
+
+    def degraded(self, model, now=None):
+        health = self.health(model, now)
+        if health["samples"] < self.min_samples:
+            return False
+        return health["p95_seconds"] > self.p95_seconds or health["error_rate"] > self.error_rate
+
+    def select(self, tiers, now=None):
+        """
+        상태가 정상인 첫 번째 모델의 tier 번호를 반환합니다. 모두 기준을 넘었으면 마지막(가장 빠른) 모델을 사용합니다.
+        """
+        for tier, model in enumerate(tiers):
+            degraded = self.degraded(model, now)
+            self._mark(model, degraded)
+            if not degraded:
+                return tier
+        return len(tiers) - 1
+
+    def _mark(self, model, degraded):
+        if degraded and model not in self._degraded:
+            logger.warning(f"Model {model} exceeded its latency / error threshold, using fallback models")
+            self._degraded.add(model)
+        elif not degraded and model in self._degraded:
+            logger.info(f"Model {model} recovered, using it again")
+            self._degraded.discard(model)
+        llm_model_degraded.labels(model).set(1 if degraded else 0)
+
+    def record_served(self, agent, model, tier):
+        llm_tier_calls.labels(agent, model, tier_label(tier)).inc()
+        key = f"{agent}:{model}"
+        self.served[key] = self.served.get(key, 0) + 1
+        if tier > 0:
+            self.fallbacks += 1
+
+    def stats(self):
+        return {
+            "models": {model: self.health(model) for model in self._samples},
+            "degraded": sorted(self._degraded),
+            "served": self.served,
+            "fallbacks": self.fallbacks,
+        }
+
+
+model_tier_router = ModelTierRouter(
+    p95_seconds=settings.LLM_FALLBACK_P95_SECONDS,
+    error_rate=settings.LLM_FALLBACK_ERROR_RATE,
+    window_seconds=settings.LLM_FALLBACK_WINDOW_SECONDS,
+    min_samples=settings.LLM_FALLBACK_MIN_SAMPLES,
+)
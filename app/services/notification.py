@@ -2,72 +2,386 @@
 Email Notification Service
 """
 
-import smtplib
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from email.utils import make_msgid
+
+import aiosmtplib
 
 from app.conf.config import settings
 from app.conf.logging import logger
+from app.services.metrics import (
+    email_batch_size,
+    email_dropped,
+    email_latency,
+    email_queue_depth,
+    smtp_connections,
+)
+from app.services.outbox import NotificationOutbox
 from app.utils.text import clean_text, format_html_text
 
 
-def send_email_alert(alert_description, analysis_result):
-    if not all([settings.SMTP_SERVER, settings.SMTP_USERNAME, settings.SMTP_PASSWORD]):
-        logger.warning("SMTP settings not configured. Email notification skipped.")
-        return
-
-    recipients = settings.ALERT_RECIPIENTS.split(",")
-    if not recipients or not recipients[0]:
-        logger.warning("No recipients configured. Email notification skipped.")
-        return
+def _subject(prefix, text):
+    text = clean_text(text)
+    if len(text) > 50:
+        return f"{prefix}: {text[:50]}..."
+    return f"{prefix}: {text}"
 
-    clean_description = clean_text(alert_description)
-    if len(clean_description) > 50:
-        subject = f"Alert Analysis: {clean_description[:50]}..."
-    else:
-        subject = f"Alert Analysis: {clean_description}"
 
-    html_content = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto;">
-        <h2 style="color: #d9534f;">Alert Analysis Report</h2>
+def _analysis_html(alert_description, analysis_result, analyzed_at):
+    return f"""
         <div style="background-color: #f8f9fa; padding: 15px; border-radius: 4px; margin-bottom: 20px;">
             <p><strong>Alert Description:</strong> {clean_text(alert_description)}</p>
-            <p><strong>Analysis Time:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+            <p><strong>Analysis Time:</strong> {analyzed_at.strftime('%Y-%m-%d %H:%M:%S')}</p>
         </div>
-        
+
         <div style="border-left: 4px solid #d9534f; padding-left: 15px; margin-bottom: 20px;">
             <h3 style="color: #d9534f;">Problem:</h3>
             <p>{clean_text(analysis_result["problem"])}</p>
         </div>
-        
+
         <div style="border-left: 4px solid #f0ad4e; padding-left: 15px; margin-bottom: 20px;">
             <h3 style="color: #f0ad4e;">Cause of Problem:</h3>
             <p>{clean_text(analysis_result["cause"])}</p>
         </div>
-        
-        <div style="border-left: 4px solid #5cb85c; padding-left: 15px;">
+
+        <div style="border-left: 4px solid #5cb85c; padding-left: 15px; margin-bottom: 20px;">
             <h3 style="color: #5cb85c;">Solution:</h3>
             {format_html_text(analysis_result["solution"])}
         </div>
+    """
+
+
+def build_email(items, sender, recipients, message_key=None):
+    """
+    (alert_description, analysis_result, analyzed_at) 목록으로 메일을 만듭니다. 2개 이상이면 digest 메일입니다.
+    message_key를 주면 같은 알림을 다시 보낼 때 Message-ID가 같아 수신 측에서 중복을 걸러낼 수 있습니다.
+    """
+    if len(items) == 1:
+        subject = _subject("Alert Analysis", items[0][0])
+        title = "Alert Analysis Report"
+    else:
+        subject = _subject(f"Alert Analysis Digest ({len(items)} alerts)", items[0][0])
+        title = f"Alert Analysis Digest: {len(items)} alerts"
+
+    sections = "<hr>".join(_analysis_html(*item[:3]) for item in items)
+    html_content = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto;">
+        <h2 style="color: #d9534f;">{title}</h2>
+        {sections}
     </body>
     </html>
     """
 
     message = MIMEMultipart("alternative")
     message["Subject"] = subject
-    message["From"] = settings.SMTP_USERNAME
+    message["From"] = sender
     message["To"] = ", ".join(recipients)
+    if message_key:
+        message["Message-ID"] = f"<{message_key}@alert-analyzer>"
+    else:
+        message["Message-ID"] = make_msgid(domain="alert-analyzer")
+    message.attach(MIMEText(html_content, "html"))
+    return message
+
+
+def _smtp_client():
+    return aiosmtplib.SMTP(
+        hostname=settings.SMTP_SERVER,
+        port=settings.SMTP_PORT,
+        username=settings.SMTP_USERNAME,
+        password=settings.SMTP_PASSWORD,
+        start_tls=True,
+        timeout=settings.SMTP_TIMEOUT_SECONDS,
+    )
+
+
+class SMTPConnectionPool:
+    """
+    로그인까지 끝난 SMTP 연결을 재사용합니다. 오래 쉬었던 연결은 NOOP으로 확인하고,
+    끊긴 연결은 다시 연결합니다.
+    """
+
+    def __init__(self, client_factory, size, idle_check_seconds):
+        self.client_factory = client_factory
+        self.size = size
+        self.idle_check_seconds = idle_check_seconds
+        self._idle = None
+        self._clients = []
+        self.connects = 0
+        self.reconnects = 0
+
+    def _ensure_started(self):
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                self._idle.put_nowait((None, 0.0))
+
+    async def _connect(self):
+        client = self.client_factory()
+        await client.connect()
+        self.connects += 1
+        smtp_connections.inc()
+        self._clients.append(client)
+        return client
 
-    html_part = MIMEText(html_content, "html")
-    message.attach(html_part)
+    async def _discard(self, client):
+        if client in self._clients:
+            self._clients.remove(client)
+        try:
+            await client.quit()
+        except Exception:
+            pass
+
+    async def _checked(self, client, last_used):
+        if client is None or not client.is_connected:
+            return await self._connect()
+        if time.monotonic() - last_used > self.idle_check_seconds:
+            try:
+                await client.noop()
+            except aiosmtplib.SMTPException:
+                self.reconnects += 1
+                await self._discard(client)
+                return await self._connect()
+        return client
+
+    @asynccontextmanager
+    async def connection(self):
+        self._ensure_started()
+        client, last_used = await self._idle.get()
+        try:
+            client = await self._checked(client, last_used)
+            yield client
+        except Exception:
+            # 실패한 연결은 다음 사용 때 새로 맺음
+            if client is not None:
+                await self._discard(client)
+            client = None
+            raise
+        finally:
+            self._idle.put_nowait((client, time.monotonic()))
+
+    async def send(self, message, sender, recipients):
+        try:
+            async with self.connection() as client:
+                await client.send_message(message, sender=sender, recipients=recipients)
+        except aiosmtplib.SMTPServerDisconnected:
+            # 서버가 유휴 연결을 끊은 경우 한 번만 다시 연결해서 보냄
+            self.reconnects += 1
+            async with self.connection() as client:
+                await client.send_message(message, sender=sender, recipients=recipients)
+
+    async def close(self):
+        for client in list(self._clients):
+            await self._discard(client)
+        self._idle = None
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "open": len(self._clients),
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+        }
+
+
+class EmailNotifier:
+    """
+    분석 결과 메일을 bounded queue에 넣고 전용 worker가 SMTP 연결 pool로 보냅니다.
+    digest_window가 0보다 크면 그 시간 동안 들어온 분석을 recipient 목록별로 한 통에 묶어 보냅니다.
+    """
+
+    def __init__(self, pool, sender, queue_size, digest_window, digest_max):
+        self.pool = pool
+        self.sender = sender
+        self.queue_size = queue_size
+        self.digest_window = digest_window
+        self.digest_max = digest_max
+        self._queue = None
+        self._worker_task = None
+        self._deliveries = set()
+        # outbox가 전송 결과를 기록하도록 설정하는 callback: await on_delivery(outbox_ids, error)
+        self.on_delivery = None
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.emails = 0
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._worker_task is not None and self._worker_task.get_loop() is loop:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker_task = asyncio.create_task(self._worker())
+        logger.info("Email delivery worker started")
+
+    async def stop(self):
+        if self._worker_task is None:
+            return
+        self._worker_task.cancel()
+        await asyncio.gather(self._worker_task, return_exceptions=True)
+        self._worker_task = None
+        # 남은 메일은 종료 전에 보냄
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        if pending:
+            await self._deliver_batch(pending)
+        await asyncio.gather(*self._deliveries, return_exceptions=True)
+        await self.pool.close()
+        email_queue_depth.set(0)
+        logger.info("Email delivery worker stopped")
+
+    def capacity(self):
+        self.start()
+        return self.queue_size - self._queue.qsize()
+
+    def enqueue(
+        self, alert_description, analysis_result, recipients, outbox_id=None, message_key=None,
+        analyzed_at=None,
+    ):
+        self.start()
+        try:
+            self._queue.put_nowait(
+                (
+                    tuple(recipients),
+                    (
+                        alert_description,
+                        analysis_result,
+                        analyzed_at or datetime.now(),
+                        outbox_id,
+                        message_key,
+                    ),
+                )
+            )
+        except asyncio.QueueFull:
+            self.dropped += 1
+            email_dropped.inc()
+            logger.warning("Email queue is full. Email notification dropped.")
+            return False
+        self.queued += 1
+        email_queue_depth.set(self._queue.qsize())
+        return True
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            if self.digest_window > 0:
+                deadline = time.monotonic() + self.digest_window
+                while len(batch) < self.digest_max:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            email_queue_depth.set(self._queue.qsize())
+            await self._deliver_batch(batch)
+
+    async def _deliver_batch(self, batch):
+        groups = {}
+        for recipients, item in batch:
+            groups.setdefault(recipients, []).append(item)
+        for recipients, items in groups.items():
+            # pool 크기만큼 동시에 전송하고, worker는 다음 묶음을 계속 모음
+            task = asyncio.create_task(self._deliver(list(recipients), items))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, recipients, items):
+        keys = sorted(item[4] for item in items if item[4])
+        if len(keys) > 1:
+            keys = [hashlib.sha256(",".join(keys).encode()).hexdigest()]
+        message = build_email(items, self.sender, recipients, keys[0] if keys else None)
+        started = time.perf_counter()
+        try:
+            await self.pool.send(message, self.sender, recipients)
+        except Exception as e:
+            self.failed += len(items)
+            email_latency.labels("failed").observe(time.perf_counter() - started)
+            logger.error(f"Failed to send email: {e}")
+            await self._record_delivery(items, e)
+            return
+        await self._record_delivery(items, None)
+        self.sent += len(items)
+        self.emails += 1
+        email_latency.labels("sent").observe(time.perf_counter() - started)
+        email_batch_size.observe(len(items))
+        logger.info(f"Email alert with {len(items)} analysis(es) sent to {', '.join(recipients)}")
+
+    async def _record_delivery(self, items, error):
+        if self.on_delivery is None:
+            return
+        try:
+            await self.on_delivery([item[3] for item in items], error)
+        except Exception as e:
+            logger.error(f"Failed to record email delivery: {e}")
+
+    def stats(self):
+        return {
+            "queued": self.queued,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "sent": self.sent,
+            "emails": self.emails,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "digest_window_seconds": self.digest_window,
+            "smtp": self.pool.stats(),
+        }
+
+
+email_notifier = EmailNotifier(
+    pool=SMTPConnectionPool(
+        _smtp_client,
+        size=settings.SMTP_POOL_SIZE,
+        idle_check_seconds=settings.SMTP_IDLE_CHECK_SECONDS,
+    ),
+    sender=settings.SMTP_USERNAME,
+    queue_size=settings.EMAIL_QUEUE_SIZE,
+    digest_window=settings.EMAIL_DIGEST_WINDOW_SECONDS,
+    digest_max=settings.EMAIL_DIGEST_MAX_ALERTS,
+)
+
+
+notification_outbox = NotificationOutbox(
+    path=settings.NOTIFICATION_OUTBOX_PATH,
+    notifier=email_notifier,
+    commit_window=settings.OUTBOX_COMMIT_WINDOW_MS / 1000,
+    commit_max=settings.OUTBOX_COMMIT_MAX,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    backoff_base=settings.OUTBOX_BACKOFF_BASE_SECONDS,
+    backoff_max=settings.OUTBOX_BACKOFF_MAX_SECONDS,
+    dedup_seconds=settings.OUTBOX_DEDUP_SECONDS,
+    poll_seconds=settings.OUTBOX_POLL_SECONDS,
+    retention_seconds=settings.OUTBOX_RETENTION_SECONDS,
+    sending_timeout=settings.OUTBOX_SENDING_TIMEOUT_SECONDS,
+)
+
+
+async def send_email_alert(alert_description, analysis_result):
+    """
+    분석 결과 메일을 outbox에 기록합니다. 전송은 dispatcher가 맡으므로 commit까지만 기다립니다.
+    """
+    if not all([settings.SMTP_SERVER, settings.SMTP_USERNAME, settings.SMTP_PASSWORD]):
+        logger.warning("SMTP settings not configured. Email notification skipped.")
+        return
+
+    recipients = settings.ALERT_RECIPIENTS.split(",")
+    if not recipients or not recipients[0]:
+        logger.warning("No recipients configured. Email notification skipped.")
+        return
 
     try:
-        with smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT) as server:
-            server.starttls()
-            server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
-            server.sendmail(settings.SMTP_USERNAME, recipients, message.as_string())
-        logger.info(f"Email alert sent to {', '.join(recipients)}")
+        await notification_outbox.put(recipients, alert_description, analysis_result)
     except Exception as e:
-        logger.error(f"Failed to send email: {e}")
+        # outbox에 기록하지 못하면 재시도 없이 바로 전송 queue에 넣음
+        logger.error(f"Failed to write notification outbox, sending without retry: {e}")
+        email_notifier.enqueue(alert_description, analysis_result, recipients)
@@ -0,0 +1,372 @@
+"""
+Notification Outbox Service
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from app.conf.logging import logger
+from app.services.metrics import outbox_commit_batch_size, outbox_deliveries
+
+STATUSES = ("pending", "sending", "sent", "dead")
+
+
+def dedup_key(recipients, alert_description, analysis_result):
+    payload = json.dumps(
+        [sorted(recipients), alert_description, analysis_result], sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class NotificationOutbox:
+    """
+    보낼 알림을 로컬 SQLite outbox에 먼저 기록하고, dispatcher가 notifier로 전달합니다 (at-least-once).
+    여러 요청의 기록은 짧은 window 동안 모아 한 transaction으로 commit하고, 실패한 전송은
+    exponential backoff로 다시 시도하며 max_attempts를 넘으면 dead로 남깁니다.
+    sending_timeout이 지나도록 결과가 기록되지 않은 sending 메시지는 다시 보냅니다.
+    """
+
+    def __init__(
+        self, path, notifier, commit_window, commit_max, max_attempts, backoff_base,
+        backoff_max, dedup_seconds, poll_seconds, retention_seconds, sending_timeout=600,
+    ):
+        self.path = path
+        self.notifier = notifier
+        self.commit_window = commit_window
+        self.commit_max = commit_max
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dedup_seconds = dedup_seconds
+        self.poll_seconds = poll_seconds
+        self.retention_seconds = retention_seconds
+        self.sending_timeout = sending_timeout
+        self._conn = None
+        self._lock = threading.Lock()
+        self._pending = []
+        self._has_pending = None
+        self._new_messages = None
+        self._tasks = []
+        self.written = 0
+        self.deduplicated = 0
+        self.commits = 0
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.reclaimed = 0
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, dedup_key TEXT NOT NULL, "
+                "recipients TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, "
+                "last_error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS outbox_dedup ON outbox (dedup_key, created_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._tasks and self._tasks[0].get_loop() is loop:
+            return
+        with self._lock:
+            # 이전 프로세스가 전송 중에 종료된 메시지는 다시 보냄
+            conn = self._connect()
+            recovered = conn.execute(
+                "UPDATE outbox SET status = 'pending' WHERE status = 'sending'"
+            ).rowcount
+            conn.commit()
+        if recovered:
+            logger.info(f"Recovered {recovered} in-flight notification(s) from the outbox")
+        self._has_pending = asyncio.Event()
+        self._new_messages = asyncio.Event()
+        self._new_messages.set()
+        self.notifier.on_delivery = self.record_delivery
+        self._tasks = [
+            asyncio.create_task(self._writer()),
+            asyncio.create_task(self._dispatcher()),
+        ]
+        logger.info("Notification outbox dispatcher started")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pending:
+            await self._commit(self._pending)
+            self._pending = []
+
+    async def put(self, recipients, alert_description, analysis_result):
+        """
+        알림을 outbox에 기록하고 commit될 때까지 기다립니다. 중복이면 None을 반환합니다.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        now = time.time()
+        row = (
+            dedup_key(recipients, alert_description, analysis_result),
+            json.dumps(list(recipients)),
+            json.dumps({"description": alert_description, "analysis": analysis_result, "analyzed_at": now}),
+            now,
+        )
+        self._pending.append((row, future))
+        self._has_pending.set()
+        return await future
+
+    async def _writer(self):
+        while True:
+            await self._has_pending.wait()
+            if len(self._pending) < self.commit_max:
+                # 같은 window에 들어온 기록을 한 번에 commit
+                await asyncio.sleep(self.commit_window)
+            batch, self._pending = self._pending[:self.commit_max], self._pending[self.commit_max:]
+            if not self._pending:
+                self._has_pending.clear()
+            await self._commit(batch)
+
+    async def _commit(self, batch):
+        try:
+            ids = await asyncio.to_thread(self._insert, [row for row, _ in batch])
+        except Exception as e:
+            logger.error(f"Failed to write notification outbox: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), message_id in zip(batch, ids):
+            if not future.done():
+                future.set_result(message_id)
+        outbox_commit_batch_size.observe(len(batch))
+        self._new_messages.set()
+
+    def _insert(self, rows):
+        ids = []
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for key, recipients, payload, now in rows:
+                    duplicate = conn.execute(
+                        "SELECT id FROM outbox WHERE dedup_key = ? AND created_at > ? LIMIT 1",
+                        (key, now - self.dedup_seconds),
+                    ).fetchone()
+                    if duplicate is not None:
+                        self.deduplicated += 1
+                        ids.append(None)
+                        continue
+                    cursor = conn.execute(
+                        "INSERT INTO outbox (dedup_key, recipients, payload, status, "
+                        "next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+                        (key, recipients, payload, now, now, now),
+                    )
+                    ids.append(cursor.lastrowid)
+                    self.written += 1
+            self.commits += 1
+        return ids
+
+    async def _dispatcher(self):
+        last_prune = 0.0
+        while True:
+            try:
+                await asyncio.wait_for(self._new_messages.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._new_messages.clear()
+            try:
+                if time.time() - last_prune > self.poll_seconds * 60:
+                    await asyncio.to_thread(self._prune)
+                    last_prune = time.time()
+                while True:
+                    capacity = self.notifier.capacity()
+                    if capacity <= 0:
+                        break
+                    rows = await asyncio.to_thread(self._claim, capacity)
+                    for message_id, recipients, payload, key in rows:
+                        payload = json.loads(payload)
+                        queued = self.notifier.enqueue(
+                            payload["description"], payload["analysis"], json.loads(recipients),
+                            outbox_id=message_id, message_key=key,
+                            analyzed_at=datetime.fromtimestamp(payload["analyzed_at"]),
+                        )
+                        if not queued:
+                            await asyncio.to_thread(self._release, message_id)
+                    if len(rows) < capacity:
+                        break
+            except Exception as e:
+                logger.error(f"Notification outbox dispatch failed: {e}", exc_info=True)
+
+    def _claim(self, limit):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                # 전송 결과가 기록되지 않은 채 오래된 sending 메시지 (notifier에서 유실된 경우)도 다시 보냄
+                rows = conn.execute(
+                    "SELECT id, recipients, payload, dedup_key, status FROM outbox "
+                    "WHERE (status = 'pending' AND next_attempt_at <= ?) "
+                    "OR (status = 'sending' AND updated_at < ?) "
+                    "ORDER BY next_attempt_at LIMIT ?",
+                    (now, now - self.sending_timeout, limit),
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE outbox SET status = 'sending', updated_at = ? WHERE id = ?",
+                    [(now, row[0]) for row in rows],
+                )
+        reclaimed = [row[0] for row in rows if row[4] == "sending"]
+        if reclaimed:
+            self.reclaimed += len(reclaimed)
+            logger.warning(f"Re-sending {len(reclaimed)} notification(s) stuck in sending: {reclaimed}")
+        return [row[:4] for row in rows]
+
+    def _release(self, message_id):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "UPDATE outbox SET status = 'pending' WHERE id = ? AND status = 'sending'",
+                    (message_id,),
+                )
+
+    def _prune(self):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "DELETE FROM outbox WHERE status = 'sent' AND updated_at < ?",
+                    (time.time() - self.retention_seconds,),
+                )
+
+    def backoff(self, attempts):
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        # 동시에 실패한 메시지가 한꺼번에 재시도하지 않도록 jitter 추가
+        return delay * random.uniform(0.8, 1.0)
+
+    async def record_delivery(self, message_ids, error=None):
+        ids = [message_id for message_id in message_ids if message_id is not None]
+        if ids:
+            await asyncio.to_thread(self._record, ids, error)
+            if error is not None:
+                self._new_messages.set()
+
+    def _record(self, message_ids, error):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                if error is None:
+                    conn.executemany(
+                        "UPDATE outbox SET status = 'sent', attempts = attempts + 1, "
+                        "last_error = NULL, updated_at = ? WHERE id = ?",
+                        [(now, message_id) for message_id in message_ids],
+                    )
+                    self.sent += len(message_ids)
+                    outbox_deliveries.labels("sent").inc(len(message_ids))
+                    return
+                for message_id in message_ids:
+                    row = conn.execute("SELECT attempts FROM outbox WHERE id = ?", (message_id,)).fetchone()
+                    if row is None:
+                        continue
+                    attempts = row[0] + 1
+                    status = "dead" if attempts >= self.max_attempts else "pending"
+                    conn.execute(
+                        "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, "
+                        "last_error = ?, updated_at = ? WHERE id = ?",
+                        (status, attempts, now + self.backoff(attempts), str(error)[:500], now, message_id),
+                    )
+                    if status == "dead":
+                        self.dead += 1
+                        logger.error(f"Notification {message_id} failed {attempts} times, giving up: {error}")
+                    else:
+                        self.retried += 1
+                    outbox_deliveries.labels("dead" if status == "dead" else "retry").inc()
+
+    def list_messages(self, status=None, limit=50):
+        """
+        전송되지 않은 (또는 지정한 status의) 메시지를 오래된 순서로 반환합니다.
+        """
+        with self._lock:
+            conn = self._connect()
+            if status is None:
+                rows = conn.execute(
+                    "SELECT id, status, attempts, next_attempt_at, last_error, recipients, payload, "
+                    "created_at, updated_at FROM outbox WHERE status != 'sent' ORDER BY id LIMIT ?",
+                    (limit,),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT id, status, attempts, next_attempt_at, last_error, recipients, payload, "
+                    "created_at, updated_at FROM outbox WHERE status = ? ORDER BY id LIMIT ?",
+                    (status, limit),
+                ).fetchall()
+        return [
+            {
+                "id": message_id,
+                "status": message_status,
+                "attempts": attempts,
+                "next_attempt_at": next_attempt_at,
+                "last_error": last_error,
+                "recipients": json.loads(recipients),
+                "description": json.loads(payload)["description"],
+                "created_at": created_at,
+                "updated_at": updated_at,
+            }
+            for message_id, message_status, attempts, next_attempt_at, last_error, recipients,
+            payload, created_at, updated_at in rows
+        ]
+
+    async def retry(self, message_id):
+        """
+        pending 또는 dead 메시지를 바로 다시 보내도록 합니다. 해당 메시지가 없으면 False를 반환합니다.
+        """
+        updated = await asyncio.to_thread(self._retry, message_id)
+        # dispatcher와 같은 event loop에서 깨움
+        if updated and self._new_messages is not None:
+            self._new_messages.set()
+        return updated
+
+    def _retry(self, message_id):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                updated = conn.execute(
+                    "UPDATE outbox SET status = 'pending', next_attempt_at = ?, updated_at = ? "
+                    "WHERE id = ? AND status IN ('pending', 'dead')",
+                    (time.time(), time.time(), message_id),
+                ).rowcount
+        return bool(updated)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(
+                self._connect().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+            )
+        return {
+            **{status: counts.get(status, 0) for status in STATUSES},
+            "written": self.written,
+            "deduplicated": self.deduplicated,
+            "commits": self.commits,
+            "avg_commit_batch": (self.written + self.deduplicated) / self.commits if self.commits else 0.0,
+            "delivered": self.sent,
+            "retried": self.retried,
+            "dead_lettered": self.dead,
+            "reclaimed": self.reclaimed,
+        }
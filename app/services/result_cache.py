@@ -0,0 +1,137 @@
+"""
+Persistent Result Cache Service
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from app.conf.config import settings
+from app.conf.logging import logger
+
+
+class SQLiteCache:
+    """
+    로컬 SQLite 파일에 JSON 값을 저장하는 TTL + LRU 캐시입니다.
+    재시작 후에도 유지되며, max_entries를 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다.
+    """
+
+    def __init__(self, path, table, ttl_seconds, max_entries):
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_accessed_at "
+                f"ON {self.table} (accessed_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                conn.commit()
+                self.expirations += 1
+                self.misses += 1
+                return None
+            conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            count = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+            conn.commit()
+
+    async def aget(self, key):
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key, value):
+        try:
+            await asyncio.to_thread(self.set, key, value)
+        except sqlite3.Error as e:
+            # 캐시 저장 실패가 분석 결과 반환을 막지 않도록 함
+            logger.error(f"Failed to write {self.table} cache entry: {e}")
+
+    def stats(self):
+        with self._lock:
+            entries = self._connect().execute(
+                f"SELECT COUNT(*) FROM {self.table}"
+            ).fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def analysis_cache_key(fingerprint, now=None):
+    """
+    alert identity와 시간 bucket으로 분석 캐시 key를 만듭니다.
+    """
+    now = time.time() if now is None else now
+    bucket = int(now // settings.ANALYSIS_CACHE_BUCKET_SECONDS)
+    return f"{fingerprint}:{bucket}"
+
+
+analysis_cache = SQLiteCache(
+    path=settings.ANALYSIS_CACHE_PATH,
+    table="analysis_results",
+    ttl_seconds=settings.ANALYSIS_CACHE_TTL_SECONDS,
+    max_entries=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,111 @@
+"""
+Web Search Cache Service
+"""
+
+import json
+import re
+import time
+
+from langchain_core.tools import StructuredTool
+
+from app.conf.config import settings
+from app.conf.logging import logger
+from app.services.coalescer import SingleFlight
+from app.services.result_cache import SQLiteCache
+
+# 검색 결과에 영향이 거의 없는 단어
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "how", "in", "is", "it", "of", "on", "or", "the", "to", "what", "when",
+    "which", "why", "with",
+}
+
+_TOKEN_PATTERN = re.compile(r"[\w.\-/:]+")
+
+
+def normalize_query(query):
+    """
+    대소문자, 불용어, 단어 순서, 중복 단어를 정규화하여 거의 같은 검색어가 같은 key를 갖도록 합니다.
+    """
+    tokens = {
+        token.strip(".-/:")
+        for token in _TOKEN_PATTERN.findall((query or "").lower())
+    }
+    tokens = {token for token in tokens if token and token not in STOPWORDS}
+    return " ".join(sorted(tokens))
+
+
+class CachedSearchTool:
+    """
+    검색 tool을 SQLite 캐시로 감쌉니다. 캐시 hit이면 네트워크 호출을 하지 않습니다.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._flight = SingleFlight("web-search")
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, tool_name, arguments):
+        options = {
+            name: value
+            for name, value in arguments.items()
+            if name != "query" and value is not None
+        }
+        return (
+            f"{tool_name}:{normalize_query(arguments.get('query'))}:"
+            f"{json.dumps(options, sort_keys=True, default=str)}"
+        )
+
+    async def call(self, tool_name, arguments, func):
+        started = time.perf_counter()
+        key = self.key(tool_name, arguments)
+        cached = await self.cache.aget(key)
+        if cached is not None:
+            self.hits += 1
+            self.hit_seconds += time.perf_counter() - started
+            logger.info(f"Web search cache hit: {arguments.get('query')!r}")
+            return cached
+
+        async def execute():
+            result = await func(arguments)
+            # 오류 응답은 캐시하지 않음
+            if not (isinstance(result, dict) and result.get("error")):
+                await self.cache.aset(key, result)
+            return result
+
+        result = await self._flight.run(key, execute)
+        self.misses += 1
+        self.miss_seconds += time.perf_counter() - started
+        return result
+
+    def wrap(self, tool):
+        async def call(**arguments):
+            return await self.call(tool.name, arguments, tool.ainvoke)
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=call,
+        )
+
+    def stats(self):
+        return {
+            **self.cache.stats(),
+            "coalesced": self._flight.coalesced,
+            "avg_hit_ms": self.hit_seconds / self.hits * 1000 if self.hits else 0.0,
+            "avg_miss_ms": self.miss_seconds / self.misses * 1000 if self.misses else 0.0,
+        }
+
+
+web_search_cache = CachedSearchTool(
+    SQLiteCache(
+        path=settings.WEB_SEARCH_CACHE_PATH,
+        table="web_search_results",
+        ttl_seconds=settings.WEB_SEARCH_CACHE_TTL_SECONDS,
+        max_entries=settings.WEB_SEARCH_CACHE_MAX_ENTRIES,
+    )
+)
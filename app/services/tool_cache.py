@@ -0,0 +1,202 @@
+"""
+Tool Result Cache Service
+"""
+
+import fnmatch
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from langchain_core.tools import StructuredTool
+
+from app.conf.config import settings
+from app.conf.logging import logger
+from app.services.coalescer import SingleFlight
+
+# 시간 범위로 해석하여 step 단위로 내림하는 인자 이름
+TIME_ARGUMENT_NAMES = {
+    "start", "end", "from", "to", "time",
+    "starttime", "endtime", "startrfc3339", "endrfc3339",
+}
+
+
+def parse_ttl_rules(spec):
+    """
+    "query_*=30,*dashboard*=600" 형식의 설정을 (pattern, ttl) 목록으로 변환합니다.
+    """
+    rules = []
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        pattern, ttl = item.split("=", 1)
+        rules.append((pattern.strip(), float(ttl)))
+    return rules
+
+
+def _snap_time(value, step):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        # epoch milliseconds는 밀리초 단위 그대로 내림
+        unit = step * 1000 if value > 1e12 else step
+        return type(value)(value // unit * unit)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value  # "now-1h" 같은 상대 시간은 그대로 사용
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        epoch = parsed.timestamp() // step * step
+        snapped = datetime.fromtimestamp(epoch, tz=timezone.utc)
+        return snapped.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return value
+
+
+def canonicalize_arguments(arguments, time_step):
+    """
+    key 순서, 문자열 공백, 시간 범위를 정규화하여 같은 조회가 같은 key를 갖도록 합니다.
+    """
+    canonical = {}
+    for key, value in arguments.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        if time_step and key.lower().replace("_", "") in TIME_ARGUMENT_NAMES:
+            value = _snap_time(value, time_step)
+        canonical[key] = value
+    return canonical
+
+
+class ToolResultCache:
+    """
+    tool 이름 + 정규화된 인자를 key로 하는 in-memory TTL/LRU 캐시입니다.
+    tool마다 다른 TTL을 적용하며, 동시에 들어온 같은 호출은 하나로 합칩니다.
+    """
+
+    def __init__(self, name, ttl_rules, default_ttl, max_entries, time_step, cacheable=None):
+        self.name = name
+        self.cacheable = cacheable
+        self.ttl_rules = ttl_rules
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.time_step = time_step
+        self._entries = OrderedDict()
+        self._flight = SingleFlight(f"{name}-tools")
+        self.tool_stats = {}
+
+    def ttl_for(self, tool_name):
+        for pattern, ttl in self.ttl_rules:
+            if fnmatch.fnmatch(tool_name, pattern):
+                return ttl
+        return self.default_ttl
+
+    def key(self, tool_name, arguments):
+        return f"{tool_name}:{json.dumps(arguments, sort_keys=True, default=str)}"
+
+    async def call(self, tool_name, arguments, func):
+        """
+        캐시에 있으면 저장된 결과를, 없으면 func(원래 인자)를 실행하여 저장 후 반환합니다.
+        정규화된(시간 범위를 내림한) 인자는 key에만 사용하고, 실제 조회는 호출자가 준 시간 범위로 하여
+        가장 최근 구간의 데이터가 빠지지 않게 합니다.
+        """
+        canonical = canonicalize_arguments(arguments, self.time_step)
+        ttl = self.ttl_for(tool_name)
+        stats = self.tool_stats.setdefault(tool_name, {"hits": 0, "misses": 0})
+        if ttl <= 0 or (self.cacheable and not self.cacheable(tool_name, canonical)):
+            stats["misses"] += 1
+            return await func(arguments)
+
+        key = self.key(tool_name, canonical)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            stats["hits"] += 1
+            logger.info(f"[{self.name}] tool cache hit: {tool_name}")
+            return entry[1]
+
+        stats["misses"] += 1
+
+        async def execute():
+            result = await func(arguments)
+            self._store(key, result, ttl)
+            return result
+
+        return await self._flight.run(key, execute)
+
+    def _store(self, key, result, ttl):
+        self._entries[key] = (time.monotonic() + ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def wrap_tools(self, tools):
+        """
+        LangChain tool 목록을 캐시를 거치는 tool로 감쌉니다.
+        """
+        return [self._wrap(tool) for tool in tools]
+
+    def _wrap(self, tool):
+        async def call(**arguments):
+            return await self.call(tool.name, arguments, tool.ainvoke)
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=call,
+        )
+
+    def stats(self):
+        hits = sum(stats["hits"] for stats in self.tool_stats.values())
+        misses = sum(stats["misses"] for stats in self.tool_stats.values())
+        return {
+            "entries": len(self._entries),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "coalesced": self._flight.coalesced,
+            "tools": {
+                tool_name: {
+                    **stats,
+                    "hit_ratio": stats["hits"] / (stats["hits"] + stats["misses"]),
+                }
+                for tool_name, stats in self.tool_stats.items()
+            },
+        }
+
+
+def _is_configured_repository(tool_name, arguments):
+    # 설정된 저장소 범위의 호출만 캐시
+    if not settings.GITHUB_REPO_OWNER or not settings.GITHUB_REPO_NAME:
+        return False
+    owner = arguments.get("owner")
+    repo = arguments.get("repo")
+    if owner is None and repo is None:
+        # owner/repo 인자가 없는 호출(search_* 등)은 query가 설정된 저장소로 한정된 경우만 캐시
+        query = str(arguments.get("query") or arguments.get("q") or "").lower()
+        scope = f"repo:{settings.GITHUB_REPO_OWNER}/{settings.GITHUB_REPO_NAME}".lower()
+        return scope in query.split()
+    return (owner or "").lower() == settings.GITHUB_REPO_OWNER.lower() and (
+        repo or ""
+    ).lower() == settings.GITHUB_REPO_NAME.lower()
+
+
+grafana_tool_cache = ToolResultCache(
+    "grafana",
+    ttl_rules=parse_ttl_rules(settings.GRAFANA_TOOL_CACHE_TTLS),
+    default_ttl=settings.GRAFANA_TOOL_CACHE_DEFAULT_TTL,
+    max_entries=settings.GRAFANA_TOOL_CACHE_MAX_ENTRIES,
+    time_step=settings.GRAFANA_TOOL_CACHE_TIME_STEP_SECONDS,
+)
+
+github_tool_cache = ToolResultCache(
+    "github",
+    ttl_rules=parse_ttl_rules(settings.GITHUB_TOOL_CACHE_TTLS),
+    default_ttl=settings.GITHUB_TOOL_CACHE_DEFAULT_TTL,
+    max_entries=settings.GITHUB_TOOL_CACHE_MAX_ENTRIES,
+    time_step=0,
+    cacheable=_is_configured_repository,
+)
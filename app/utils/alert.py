@@ -0,0 +1,104 @@
+"""
+Alert Util
+"""
+
+import hashlib
+import json
+import re
+
+from app.utils.text import clean_text
+
+
+def alert_fingerprint(alert):
+    """
+    Grafana fingerprint를 우선 사용하고, 없으면 labels + description으로 정규화된 해시를 생성합니다.
+    """
+    fingerprint = alert.get("fingerprint")
+    if fingerprint:
+        return fingerprint
+
+    labels = alert.get("labels") or {}
+    description = (alert.get("annotations") or {}).get("description", "")
+    payload = json.dumps(
+        {
+            "labels": {str(k): str(v) for k, v in labels.items()},
+            "description": clean_text(description).lower(),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def group_fingerprint(alerts):
+    """
+    여러 alert를 하나의 조사로 묶었을 때 사용할 fingerprint를 생성합니다.
+    """
+    if len(alerts) == 1:
+        return alert_fingerprint(alerts[0])
+    fingerprints = sorted(alert_fingerprint(alert) for alert in alerts)
+    return hashlib.sha256("|".join(fingerprints).encode("utf-8")).hexdigest()[:16]
+
+
+def distinct_labels(alert, common_labels):
+    """
+    commonLabels에 없는, 해당 alert만 가진 label을 반환합니다.
+    """
+    common_labels = common_labels or {}
+    return {
+        key: value
+        for key, value in (alert.get("labels") or {}).items()
+        if common_labels.get(key) != value
+    }
+
+
+def _description_template(alert, common_labels):
+    # alert마다 다른 label 값과 숫자를 가려서 같은 증상인지 비교
+    description = clean_text(
+        (alert.get("annotations") or {}).get("description", "")
+    ).lower()
+    for key, value in distinct_labels(alert, common_labels).items():
+        if value:
+            description = description.replace(str(value).lower(), f"<{key}>")
+    return re.sub(r"\d+(\.\d+)?", "<n>", description)
+
+
+def group_alerts(alerts, common_labels=None, merge=True):
+    """
+    같은 rule에서 같은 증상으로 발생한 alert들을 하나의 조사로 묶습니다.
+    각 그룹은 원래 payload에서의 alert index 목록입니다.
+    """
+    if not merge:
+        return [[index] for index in range(len(alerts))]
+
+    groups = {}
+    for index, alert in enumerate(alerts):
+        key = (
+            (alert.get("labels") or {}).get("alertname"),
+            _description_template(alert, common_labels),
+        )
+        groups.setdefault(key, []).append(index)
+    return list(groups.values())
+
+
+def investigation_description(alerts, common_labels=None):
+    """
+    그룹으로 묶인 alert들을 하나의 조사 설명으로 만듭니다.
+    """
+    description = (alerts[0].get("annotations") or {}).get(
+        "description", "No description provided"
+    )
+    if len(alerts) == 1:
+        return description
+
+    targets = []
+    for alert in alerts:
+        labels = distinct_labels(alert, common_labels)
+        targets.append(
+            ", ".join(f"{key}={value}" for key, value in sorted(labels.items()))
+            or "(no distinguishing labels)"
+        )
+    target_lines = "\n".join(f"- {target}" for target in targets)
+    return (
+        f"{description}\n\n"
+        f"The same alert is firing for {len(alerts)} targets:\n{target_lines}"
+    )
@@ -0,0 +1,101 @@
+"""
+Deterministic chat model used by the offline benchmarks.
+
+ScriptedChatModel answers like the real agents would, without calling an API:
+the Supervisor walks through a fixed agent plan and then asks for a summary,
+ReAct agents call one scripted tool and report its output, and the Summarizer
+fills SummaryFormat. Every call sleeps for a configurable latency and reports
+approximate token usage so the metrics pipeline sees realistic traffic.
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# agent별로 호출할 tool과 인자
+TOOL_SCRIPT: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    "GrafanaAgent": ("query_prometheus", {"expr": "avg(rate(node_cpu_seconds_total[5m]))"}),
+    "GithubAgent": ("list_commits", {"owner": "acme", "repo": "api"}),
+    "WebSearchAgent": ("tavily_search", {"query": "high cpu usage java process causes"}),
+}
+
+
+def _text(message):
+    content = message.content
+    return content if isinstance(content, str) else str(content)
+
+
+class ScriptedChatModel(BaseChatModel):
+    agent: str
+    latency: float = 0.0
+    plan: List[str] = ["GrafanaAgent", "GithubAgent", "WebSearchAgent"]
+    completion_tokens: int = 120
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _respond(self, messages, tools):
+        tool_names = [tool["function"]["name"] for tool in tools or []]
+        supervisor_tool = next((name for name in tool_names if name.endswith("SupervisorRouteResponse")), None)
+        if supervisor_tool is not None:
+            seen = {getattr(message, "name", None) for message in messages}
+            remaining = [agent for agent in self.plan if agent not in seen]
+            next_agent = remaining[0] if remaining else "SUMMARIZE"
+            return self._tool_call(
+                supervisor_tool,
+                {
+                    "next": next_agent,
+                    "instruction": f"Investigate the alert and report concrete findings ({next_agent})",
+                    "parallel_agents": [],
+                },
+            )
+        if "SummaryFormat" in tool_names:
+            findings = [_text(message)[:80] for message in messages if getattr(message, "name", None)]
+            return self._tool_call(
+                "SummaryFormat",
+                {
+                    "problem": _text(messages[0])[:200],
+                    "cause": "; ".join(findings) or "No findings",
+                    "solution": "1. Roll back the latest deployment\n2. Scale out the service",
+                },
+            )
+        if messages and isinstance(messages[-1], ToolMessage):
+            return AIMessage(content=f"{self.agent} findings: {_text(messages[-1])[:500]}")
+        tool_name, arguments = TOOL_SCRIPT.get(self.agent, (None, None))
+        if tool_name in tool_names:
+            return self._tool_call(tool_name, arguments)
+        return AIMessage(content=f"{self.agent} found nothing relevant")
+
+    def _tool_call(self, name, arguments):
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": name, "args": arguments, "id": f"call_{uuid.uuid4().hex[:12]}"}],
+        )
+
+    def _result(self, messages, tools):
+        message = self._respond(messages, tools)
+        prompt_tokens = sum(len(_text(message)) for message in messages) // 4
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": self.completion_tokens,
+            "total_tokens": prompt_tokens + self.completion_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, tools: Optional[list] = None, **kwargs):
+        time.sleep(self.latency)
+        return self._result(messages, tools)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools: Optional[list] = None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._result(messages, tools)
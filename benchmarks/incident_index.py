@@ -0,0 +1,66 @@
+"""
+Similar Incident Index Benchmark
+
+Fills an in-memory IncidentIndex with synthetic incidents and reports insert
+throughput and query latency percentiles.
+
+    python -m benchmarks.incident_index --incidents 100000
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.services.incident_index import IncidentIndex
+
+SERVICES = ["api", "web", "worker", "db", "cache", "queue", "auth", "search"]
+SYMPTOMS = [
+    "CPU usage is {n}% on {host}",
+    "Memory usage is {n}% on {host}",
+    "Disk /var is {n}% full on {host}",
+    "p99 latency is {n}ms on {host}",
+    "Error rate is {n}% on {host} after deploy",
+    "Pod {host} restarted {n} times",
+]
+
+
+def synthetic_incident(rng):
+    host = f"{rng.choice(SERVICES)}-{rng.randint(1, 500):03d}"
+    description = rng.choice(SYMPTOMS).format(n=rng.randint(1, 100), host=host)
+    labels = {"alertname": description.split()[0], "instance": host}
+    return description, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--incidents", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--permutations", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    index = IncidentIndex(":memory:", num_perm=args.permutations)
+
+    started = time.perf_counter()
+    for _ in range(args.incidents):
+        description, labels = synthetic_incident(rng)
+        index.add(description, labels, {"problem": description})
+    elapsed = time.perf_counter() - started
+    print(f"inserted {args.incidents} incidents in {elapsed:.1f}s "
+          f"({args.incidents / elapsed:.0f}/s)")
+
+    latencies = []
+    for _ in range(args.queries):
+        description, labels = synthetic_incident(rng)
+        started = time.perf_counter()
+        index.search(description, labels)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"query ms: p50={p50:.2f} p95={p95:.2f} p99={p99:.2f}")
+
+
+if __name__ == "__main__":
+    main()
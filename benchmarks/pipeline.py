@@ -0,0 +1,210 @@
+"""
+Offline End-to-End Pipeline Benchmark
+
+Builds the real workflow graph with a scripted chat model (benchmarks.fake_llm),
+stub Grafana / GitHub MCP servers over stdio (benchmarks.stub_mcp_server) and a
+stub web search tool, then replays Grafana webhook payloads against POST /alert
+at a given concurrency. Reports request latency percentiles, analyses per
+second and memory growth per analysis. No network access or API keys needed.
+
+    python -m benchmarks.pipeline --requests 200 --concurrency 16 --llm-latency 0.05
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import stat
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB_SERVER = os.path.join(ROOT, "benchmarks", "stub_mcp_server.py")
+DEFAULT_PAYLOADS = os.path.join(ROOT, "benchmarks", "payloads.jsonl")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--payloads", default=DEFAULT_PAYLOADS, help="JSON lines file of webhook payloads")
+    parser.add_argument("--requests", type=int, default=100, help="Number of webhook calls to replay")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM call")
+    parser.add_argument("--tool-latency", type=float, default=0.02, help="Seconds per stub tool call")
+    parser.add_argument("--caches", action="store_true", help="Keep result caches and incident reuse enabled")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args()
+
+
+def stub_command(directory, kind, latency):
+    # MCP stdio 연결은 환경변수를 새로 지정하므로 필요한 값을 wrapper script에 고정
+    path = os.path.join(directory, f"{kind}-mcp")
+    with open(path, "w") as f:
+        f.write(
+            "#!/bin/sh\n"
+            f"STUB_MCP_LATENCY={latency} exec {sys.executable} {STUB_SERVER} {kind}\n"
+        )
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+def configure_environment(args, directory):
+    # app 모듈이 settings와 singleton을 만들기 전에 설정해야 함
+    os.environ.update(
+        {
+            "GRAFANA_MCP_COMMAND": stub_command(directory, "grafana", args.tool_latency),
+            "GITHUB_MCP_COMMAND": stub_command(directory, "github", args.tool_latency),
+            "GITHUB_REPO_OWNER": "acme",
+            "GITHUB_REPO_NAME": "api",
+            "GITHUB_SNAPSHOT_ENABLED": "false",
+            "SMTP_SERVER": "",
+            "OPENAI_API_KEY": "benchmark",
+            "TAVILY_API_KEY": "benchmark",
+            "ANALYSIS_CACHE_PATH": ":memory:",
+            "WEB_SEARCH_CACHE_PATH": ":memory:",
+            "INCIDENT_INDEX_PATH": ":memory:",
+            "CHECKPOINT_PATH": ":memory:",
+            # 파이프라인 자체의 처리량을 재기 위해 admission control이 요청을 거절하지 않게 함
+            "ADMISSION_MAX_CONCURRENT": "1000",
+        }
+    )
+    if not args.caches:
+        os.environ.update(
+            {
+                "ANALYSIS_CACHE_ENABLED": "false",
+                "INCIDENT_INDEX_ENABLED": "false",
+                "WEB_SEARCH_CACHE_ENABLED": "false",
+                "GRAFANA_TOOL_CACHE_ENABLED": "false",
+                "GITHUB_TOOL_CACHE_ENABLED": "false",
+            }
+        )
+
+
+def install_fakes(llm_latency, tool_latency):
+    from langchain_core.tools import StructuredTool
+
+    import app.agents.websearch as websearch
+    from app.agents.llm import set_chat_model_factory
+    from app.services.metrics import TokenUsageCallback
+    from benchmarks.fake_llm import ScriptedChatModel
+
+    def chat_model(agent, **kwargs):
+        return ScriptedChatModel(
+            agent=agent, latency=llm_latency, callbacks=[TokenUsageCallback(agent)]
+        )
+
+    async def search(query: str) -> str:
+        """Search the web."""
+        await asyncio.sleep(tool_latency)
+        return json.dumps({"query": query, "results": [{"url": "https://example.com/kb/1", "content": "..."}]})
+
+    set_chat_model_factory(chat_model)
+    websearch.TavilySearch = lambda **kwargs: StructuredTool.from_function(
+        coroutine=search, name="tavily_search", description="Search the web."
+    )
+
+
+def load_payloads(path, count):
+    with open(path) as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    payloads = []
+    for i in range(count):
+        payload = copy.deepcopy(corpus[i % len(corpus)])
+        # 매 요청을 별도 alert로 만들어 coalescing / 캐시가 결과를 왜곡하지 않도록 함
+        for alert in payload["alerts"]:
+            alert.pop("fingerprint", None)
+            alert.setdefault("labels", {})["benchmark_request"] = str(i)
+        payloads.append(payload)
+    return payloads
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(args):
+    import httpx
+    import psutil
+
+    from app.graph.workflow import create_workflow_graph
+    from app.services.checkpoints import investigation_checkpoints
+    from app.services.mcp_pool import close_mcp_pools
+    from main import app
+
+    started = time.perf_counter()
+    await create_workflow_graph()
+    warmup = time.perf_counter() - started
+
+    payloads = load_payloads(args.payloads, args.requests)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    analyses = 0
+    failures = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        # 첫 요청의 import / 초기화 비용을 측정에서 제외
+        await client.post("/alert", json=load_payloads(args.payloads, 1)[0])
+
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+
+        async def replay(payload):
+            nonlocal analyses, failures
+            async with semaphore:
+                request_started = time.perf_counter()
+                response = await client.post("/alert", json=payload)
+                latencies.append(time.perf_counter() - request_started)
+            body = response.json()
+            results = body.get("results") or []
+            analyses += len({result["investigation"] for result in results})
+            failures += sum(1 for result in results if result["status"] != "success")
+
+        wall_started = time.perf_counter()
+        await asyncio.gather(*[replay(payload) for payload in payloads])
+        wall = time.perf_counter() - wall_started
+        rss_after = process.memory_info().rss
+
+    await close_mcp_pools()
+    await investigation_checkpoints.stop()
+
+    return {
+        "requests": len(payloads),
+        "concurrency": args.concurrency,
+        "analyses": analyses,
+        "failed_analyses": failures,
+        "warmup_seconds": round(warmup, 3),
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(len(payloads) / wall, 2),
+        "analyses_per_second": round(analyses / wall, 2),
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "rss_growth_kib_per_analysis": round((rss_after - rss_before) / 1024 / max(analyses, 1), 1),
+        "rss_mib": round(rss_after / 1024 / 1024, 1),
+    }
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        configure_environment(args, directory)
+        import logging
+
+        # 요청마다 남는 로그가 측정에 영향을 주지 않도록 함
+        logging.disable(logging.WARNING)
+        install_fakes(args.llm_latency, args.tool_latency)
+        report = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(report))
+        return
+    for key, value in report.items():
+        print(f"{key:>30}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Graph State Update Microbenchmark
+
+Compares the previous full-state-copy node updates against the delta + reducer
+updates used by AgentState. Each run loops an agent node for a fixed number of
+steps starting from a given history size and reports time and peak traced
+memory per step.
+
+    python -m benchmarks.state_updates
+"""
+
+import argparse
+import operator
+import time
+import tracemalloc
+from typing import Annotated, List, TypedDict
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+
+
+class CopyState(TypedDict):
+    messages: List[BaseMessage]
+    next: str
+    instruction: str
+    iteration_count: int
+
+
+class DeltaState(TypedDict):
+    messages: Annotated[List[BaseMessage], operator.add]
+    next: str
+    instruction: str
+    iteration_count: int
+
+
+def copy_node(state):
+    # 이전 방식: 전체 상태를 복사하고 메시지 목록을 새로 만듦
+    new_state = state.copy()
+    new_state["messages"] = state["messages"] + [HumanMessage(content="finding", name="Agent")]
+    new_state["iteration_count"] = state["iteration_count"] + 1
+    return new_state
+
+
+def delta_node(state):
+    return {
+        "messages": [HumanMessage(content="finding", name="Agent")],
+        "iteration_count": state["iteration_count"] + 1,
+    }
+
+
+def build_graph(state_schema, node, steps):
+    graph = StateGraph(state_schema)
+    graph.add_node("Agent", node)
+    graph.add_edge(START, "Agent")
+    graph.add_conditional_edges(
+        "Agent", lambda state: "Agent" if state["iteration_count"] < steps else END
+    )
+    return graph.compile()
+
+
+def measure(graph, history, steps):
+    state = {
+        "messages": [HumanMessage(content=f"message {i}") for i in range(history)],
+        "next": "Agent",
+        "instruction": "",
+        "iteration_count": 0,
+    }
+    config = {"recursion_limit": steps + 10}
+    graph.invoke(state, config)  # warm-up
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    graph.invoke(state, config)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / steps * 1e6, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--steps", type=int, default=50)
+    args = parser.parse_args()
+
+    graphs = {
+        "full-copy": build_graph(CopyState, copy_node, args.steps),
+        "delta": build_graph(DeltaState, delta_node, args.steps),
+    }
+
+    print(f"{'history':>8} {'mode':>10} {'us/step':>10} {'peak KiB':>10}")
+    for size in args.sizes:
+        for mode, graph in graphs.items():
+            per_step, peak = measure(graph, size, args.steps)
+            print(f"{size:>8} {mode:>10} {per_step:>10.1f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
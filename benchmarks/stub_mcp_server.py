@@ -0,0 +1,54 @@
+"""
+Stub Grafana / GitHub MCP server speaking stdio, used by the offline benchmarks.
+
+    python benchmarks/stub_mcp_server.py grafana|github
+
+Every tool sleeps for STUB_MCP_LATENCY seconds and returns canned data.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+from mcp.server.fastmcp import FastMCP
+
+LATENCY = float(os.getenv("STUB_MCP_LATENCY", "0"))
+
+grafana = FastMCP("grafana-stub", log_level="WARNING")
+github = FastMCP("github-stub", log_level="WARNING")
+
+
+@grafana.tool()
+async def query_prometheus(expr: str, start: str = "now-1h", end: str = "now") -> str:
+    """Run a PromQL query and return the resulting series."""
+    await asyncio.sleep(LATENCY)
+    values = [[1700000000 + i * 60, str(40 + i * 5)] for i in range(12)]
+    return json.dumps({"expr": expr, "series": [{"metric": {"instance": "app-01"}, "values": values}]})
+
+
+@grafana.tool()
+async def list_alert_rules() -> str:
+    """List the configured alert rules."""
+    await asyncio.sleep(LATENCY)
+    return json.dumps([{"uid": "cpu-high", "title": "High CPU usage", "for": "5m"}])
+
+
+@github.tool()
+async def list_commits(owner: str, repo: str) -> str:
+    """List recent commits of a repository."""
+    await asyncio.sleep(LATENCY)
+    return json.dumps(
+        [{"sha": f"{i:07x}", "message": f"Change {i}", "author": "dev"} for i in range(10)]
+    )
+
+
+@github.tool()
+async def search_issues(query: str) -> str:
+    """Search issues and pull requests."""
+    await asyncio.sleep(LATENCY)
+    return json.dumps({"total_count": 1, "items": [{"number": 42, "title": "CPU spike after deploy"}]})
+
+
+if __name__ == "__main__":
+    {"grafana": grafana, "github": github}[sys.argv[1]].run()
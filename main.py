@@ -1,8 +1,26 @@
 import asyncio
 from fastapi import FastAPI, BackgroundTasks, Request
-from app.api.models import AnalysisResponse, HealthCheckResponse
-from app.api.endpoints import handle_alert, health_check
-from app.graph.workflow import create_workflow_graph
+from app.api.models import AnalysisResponse, HealthCheckResponse, JobStatusResponse
+from app.api.endpoints import (
+    handle_alert,
+    handle_alert_stream,
+    health_check,
+    readiness_check,
+    metrics,
+    get_stats,
+    get_analysis,
+    wait_analysis,
+    list_outbox,
+    retry_outbox_message,
+    resume_interrupted_investigations,
+)
+from app.agents.llm import close_llm_clients
+from app.services.checkpoints import investigation_checkpoints
+from app.services.github_snapshot import github_snapshot
+from app.services.jobs import analysis_jobs
+from app.services.mcp_pool import close_mcp_pools
+from app.services.notification import email_notifier, notification_outbox
+from app.graph.workflow import stop_warmup, wait_for_graph
 from app.conf.logging import logger
 from app.conf.config import settings
 import agentops
@@ -15,23 +33,68 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup_event():
-    # 서버 시작 시 워크플로우 그래프 생성
-    try:
-        logger.info("Initializing workflow graph...")
-        await create_workflow_graph()
-        logger.info("Workflow graph initialized successfully")
-        agentops.init(
-            api_key=settings.AGENTOPS_API_KEY,
-            default_tags=['langchain']
+    # 비동기 분석 작업 worker와 메일 전송 worker 시작
+    analysis_jobs.start()
+    email_notifier.start()
+    # 이전 실행에서 보내지 못한 알림도 outbox dispatcher가 이어서 보냄
+    notification_outbox.start()
+
+    # 그래프는 background에서 준비하고, 준비되기 전의 요청은 /ready와 503 + Retry-After로 거절
+    app.state.warmup_task = asyncio.create_task(warm_up())
+
+async def warm_up():
+    """
+    워크플로우 그래프가 준비될 때까지 초기화를 재시도하고, 준비되면 그래프가 필요한 작업을 시작합니다.
+    """
+    logger.info("Initializing workflow graph...")
+    while not await wait_for_graph(None):
+        logger.warning(
+            f"Workflow graph warm-up failed, retrying in {settings.GRAPH_WARMUP_RETRY_SECONDS}s"
         )
-    except Exception as e:
-        logger.error(f"Failed to initialize workflow graph: {e}", exc_info=True)
-        # 그래프 초기화 실패는 치명적이므로 서버를 종료
-        asyncio.get_event_loop().stop()
+        await asyncio.sleep(settings.GRAPH_WARMUP_RETRY_SECONDS)
+    logger.info("Workflow graph initialized successfully")
+    # 이전 프로세스가 중간에 멈춘 조사를 이어서 실행하고, 오래된 checkpoint를 주기적으로 정리
+    if settings.CHECKPOINT_ENABLED:
+        investigation_checkpoints.start()
+        app.state.resume_task = asyncio.create_task(resume_interrupted_investigations())
+    agentops.init(
+        api_key=settings.AGENTOPS_API_KEY,
+        default_tags=['langchain']
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    warmup_task = getattr(app.state, "warmup_task", None)
+    if warmup_task is not None:
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+    await stop_warmup()
+    # 진행 중인 조사는 running으로 남아 다음 시작 때 checkpoint부터 이어서 실행됨
+    resume_task = getattr(app.state, "resume_task", None)
+    if resume_task is not None:
+        resume_task.cancel()
+        await asyncio.gather(resume_task, return_exceptions=True)
+    await analysis_jobs.stop()
+    # MCP 서버 subprocess 정리
+    await close_mcp_pools()
+    await github_snapshot.stop()
+    # outbox 기록을 마치고, 남은 메일을 보낸 뒤 SMTP 연결 정리
+    await notification_outbox.stop()
+    await email_notifier.stop()
+    await investigation_checkpoints.stop()
+    await close_llm_clients()
 
 # API 라우트 등록
 app.post("/alert", response_model=AnalysisResponse)(handle_alert)
+app.post("/alert/stream")(handle_alert_stream)
 app.get("/health", response_model=HealthCheckResponse)(health_check)
+app.get("/ready")(readiness_check)
+app.get("/analysis/{job_id}", response_model=JobStatusResponse)(get_analysis)
+app.get("/analysis/{job_id}/wait", response_model=JobStatusResponse)(wait_analysis)
+app.get("/stats")(get_stats)
+app.get("/metrics")(metrics)
+app.get("/notifications/outbox")(list_outbox)
+app.post("/notifications/outbox/{message_id}/retry")(retry_outbox_message)
 
 if __name__ == "__main__":
     import uvicorn
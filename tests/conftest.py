@@ -0,0 +1,13 @@
+"""
+Test configuration.
+"""
+import os
+
+# 테스트 실행이 로컬 캐시 파일을 만들거나 재사용하지 않도록 메모리 DB 사용
+os.environ.setdefault("ANALYSIS_CACHE_PATH", ":memory:")
+os.environ.setdefault("WEB_SEARCH_CACHE_PATH", ":memory:")
+os.environ.setdefault("INCIDENT_INDEX_PATH", ":memory:")
+os.environ.setdefault("NOTIFICATION_OUTBOX_PATH", ":memory:")
+os.environ.setdefault("CHECKPOINT_PATH", ":memory:")
+# 그래프를 thread_id 없이 직접 실행하는 테스트가 있으므로 기본으로 끔
+os.environ.setdefault("CHECKPOINT_ENABLED", "false")
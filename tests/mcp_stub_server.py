@@ -0,0 +1,25 @@
+"""
+Stub MCP server used by the MCP pool tests.
+"""
+import asyncio
+
+from mcp.server.fastmcp import FastMCP
+
+server = FastMCP("stub")
+
+
+@server.tool()
+async def echo(text: str) -> str:
+    """Return the given text."""
+    return text
+
+
+@server.tool()
+async def slow(seconds: float) -> str:
+    """Sleep for the given number of seconds."""
+    await asyncio.sleep(seconds)
+    return "done"
+
+
+if __name__ == "__main__":
+    server.run()
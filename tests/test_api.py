@@ -1,10 +1,11 @@
 """
 API Endpoint Test
 """
+import asyncio
 from fastapi.testclient import TestClient
 import pytest
 import sys
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import ANY, AsyncMock, MagicMock
 
 mock_alert_analyzer = MagicMock()
 mock_alert_analyzer.analyze_alert = AsyncMock(return_value={
@@ -19,10 +20,22 @@ mock_alert_analyzer.analyze_alert = AsyncMock(return_value={
 sys.modules["app.services.alert_analyzer"] = mock_alert_analyzer
 
 mock_notification = MagicMock()
-mock_notification.send_email_alert = MagicMock(return_value=None)
+mock_notification.send_email_alert = AsyncMock(return_value=None)
+mock_notification.email_notifier.stats = MagicMock(return_value={})
+mock_notification.notification_outbox.stats = MagicMock(return_value={})
+mock_notification.email_notifier.stop = AsyncMock(return_value=None)
+mock_notification.notification_outbox.stop = AsyncMock(return_value=None)
 sys.modules["app.services.notification"] = mock_notification
 
-from app.api.endpoints import app
+import app.api.endpoints as endpoints
+from main import app
+
+# endpoints는 mock을 참조하고, 다른 테스트 모듈은 실제 모듈을 import하도록 되돌림
+del sys.modules["app.services.alert_analyzer"]
+del sys.modules["app.services.notification"]
+
+# 실제 MCP 서버 없이 그래프가 준비된 것으로 간주
+endpoints.wait_for_graph = AsyncMock(return_value=True)
 
 client = TestClient(app)
 
@@ -55,4 +68,203 @@ def test_alert_endpoint_with_valid_data():
     assert data["analysis"]["cause"] == "Test cause"
     assert data["analysis"]["solution"] == "Test solution"
     
-    mock_alert_analyzer.analyze_alert.assert_called_once_with("Test alert description")
\ No newline at end of file
+    mock_alert_analyzer.analyze_alert.assert_called_once_with(
+        "Test alert description",
+        labels={},
+        annotations={"description": "Test alert description", "summary": "Test alert summary"},
+        fresh=False,
+        emit=None,
+        fingerprint=ANY,
+    )
+
+
+def test_metrics_endpoint():
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "alert_analyzer_analyses_in_flight" in response.text
+    assert "alert_analyzer_node_duration_seconds" in response.text
+
+
+def test_stats_endpoint():
+    response = client.get("/stats")
+    assert response.status_code == 200
+    assert "coalescing" in response.json()
+
+
+def test_alert_endpoint_async_mode():
+    test_alert_data = {
+        "alerts": [
+            {
+                "annotations": {
+                    "description": "Async alert description",
+                    "summary": "Async alert summary"
+                }
+            }
+        ]
+    }
+
+    response = client.post("/alert?mode=async", json=test_alert_data)
+    assert response.status_code == 202
+    data = response.json()
+    assert data["status"] == "accepted"
+    assert data["status_url"] == f"/analysis/{data['job_id']}"
+
+    response = client.get(f"/analysis/{data['job_id']}")
+    assert response.status_code == 200
+    assert response.json()["job_id"] == data["job_id"]
+
+
+def test_unknown_analysis_job():
+    response = client.get("/analysis/unknown")
+    assert response.status_code == 404
+
+
+def test_alert_endpoint_analyzes_every_alert():
+    test_alert_data = {
+        "commonLabels": {"job": "node"},
+        "alerts": [
+            {
+                "labels": {"alertname": "HighCPU", "job": "node"},
+                "annotations": {"description": "CPU usage is high", "summary": "CPU"}
+            },
+            {
+                "labels": {"alertname": "DiskFull", "job": "node"},
+                "annotations": {"description": "Disk is full", "summary": "Disk"}
+            }
+        ]
+    }
+
+    response = client.post("/alert", json=test_alert_data)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "success"
+    assert [result["summary"] for result in data["results"]] == ["CPU", "Disk"]
+    assert [result["investigation"] for result in data["results"]] == [0, 1]
+    assert all(result["analysis"]["problem"] == "Test problem" for result in data["results"])
+
+
+def test_alert_endpoint_serves_cached_analysis():
+    test_alert_data = {
+        "alerts": [
+            {
+                "fingerprint": "cached-fingerprint",
+                "annotations": {"description": "Recurring alert description"}
+            }
+        ]
+    }
+
+    first = client.post("/alert", json=test_alert_data).json()
+    assert first["cached"] is False
+
+    mock_alert_analyzer.analyze_alert.reset_mock()
+    second = client.post("/alert", json=test_alert_data).json()
+    assert second["cached"] is True
+    assert second["analysis"] == first["analysis"]
+    mock_alert_analyzer.analyze_alert.assert_not_called()
+
+    fresh = client.post("/alert?fresh=true", json=test_alert_data).json()
+    assert fresh["cached"] is False
+    mock_alert_analyzer.analyze_alert.assert_called_once_with(
+        "Recurring alert description",
+        labels={},
+        annotations={"description": "Recurring alert description"},
+        fresh=True,
+        emit=None,
+        fingerprint=ANY,
+    )
+
+
+def test_alert_endpoint_rejects_when_graph_not_ready(monkeypatch):
+    monkeypatch.setattr(endpoints, "wait_for_graph", AsyncMock(return_value=False))
+
+    response = client.post(
+        "/alert", json={"alerts": [{"annotations": {"description": "Cold start alert"}}]}
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "10"
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] in ("cold", "warming", "failed")
+
+
+def test_alert_rejected_while_startup_warm_up_is_running(monkeypatch):
+    import app.graph.workflow as workflow
+
+    async def slow_build(timings):
+        await asyncio.sleep(30)
+
+    monkeypatch.setattr(workflow, "graph_instance", None)
+    monkeypatch.setattr(workflow, "_warmup_task", None)
+    monkeypatch.setattr(workflow, "_build_workflow_graph", slow_build)
+    monkeypatch.setitem(workflow.graph_readiness, "status", "cold")
+    monkeypatch.setattr(endpoints, "wait_for_graph", workflow.wait_for_graph)
+    monkeypatch.setattr(endpoints.settings, "GRAPH_READY_TIMEOUT_SECONDS", 0.05)
+
+    # startup은 그래프를 기다리지 않으므로 warm-up 중에도 요청을 받음
+    with TestClient(app) as warming_client:
+        response = warming_client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "warming"
+
+        response = warming_client.post(
+            "/alert", json={"alerts": [{"annotations": {"description": "Cold start alert"}}]}
+        )
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "10"
+
+
+def test_alert_endpoint_sheds_low_severity_when_saturated(monkeypatch):
+    from app.services.admission import AdmissionController
+
+    saturated = AdmissionController(
+        max_concurrent=0, queue_size=10, queue_timeout=1,
+        severity_order=["critical", "warning", "info"], default_severity="warning",
+        shed_severity="info", retry_after=30,
+    )
+    monkeypatch.setattr(endpoints, "admission", saturated)
+
+    response = client.post(
+        "/alert",
+        json={"alerts": [{"labels": {"severity": "info"}, "annotations": {"description": "Noisy alert"}}]},
+    )
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
+    data = response.json()
+    assert data["status"] == "rejected"
+    assert data["reason"] == "shed"
+    assert saturated.stats()["rejected"] == {"shed": 1}
+
+
+def test_alert_stream_endpoint_sends_progress_and_result():
+    async def analyze(description, labels=None, annotations=None, fresh=False, emit=None, fingerprint=None):
+        emit("supervisor", {"next": "GrafanaAgent", "instruction": "check CPU"})
+        emit("agent_output", {"node": "GrafanaAgent", "content": "CPU at 95%"})
+        return {
+            "status": "success",
+            "analysis": {"problem": "p", "cause": "c", "solution": "s"},
+        }
+
+    mock_alert_analyzer.analyze_alert.side_effect = analyze
+    try:
+        with client.stream(
+            "POST", "/alert/stream?fresh=true",
+            json={"alerts": [{"annotations": {"description": "Streamed alert"}}]},
+        ) as response:
+            assert response.status_code == 200
+            body = "".join(response.iter_text())
+    finally:
+        mock_alert_analyzer.analyze_alert.side_effect = None
+
+    events = [line.split(":", 1)[1].strip() for line in body.splitlines() if line.startswith("event:")]
+    assert events == [
+        "accepted",
+        "investigation_started",
+        "supervisor",
+        "agent_output",
+        "investigation_finished",
+        "result",
+    ]
+    assert '"investigation": 0' in body
+    assert '"problem":"p"' in body
@@ -0,0 +1,546 @@
+"""
+Workflow Graph Test
+"""
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+import app.graph.workflow as workflow
+from app.agents.summarizer import SummaryFormat
+from app.agents.supervisor import (
+    ParallelAgentTask,
+    ParallelSupervisorRouteResponse,
+    SupervisorRouteResponse,
+    parallel_instruction,
+)
+from app.conf.config import settings
+from app.graph.budget import (
+    BudgetLimits,
+    TokenCounter,
+    exhausted,
+    graph_recursion_limit,
+    remaining_seconds,
+    resolve_budget,
+    resume_budget,
+)
+from app.graph.context import build_context, count_message_tokens
+from app.graph.nodes import parallel_agent_node
+from app.graph.router import AlertRouter, parse_routing_rules
+from app.services.metrics import registry
+
+
+def fake_agent(name, delay=0.0):
+    async def invoke(inputs):
+        await asyncio.sleep(delay)
+        return {"messages": list(inputs["messages"]) + [AIMessage(content=f"{name} findings")]}
+
+    return RunnableLambda(invoke)
+
+
+@pytest.fixture
+def fake_workflow(monkeypatch):
+    """
+    LLM과 MCP 없이 실제 그래프 구조를 만들기 위해 agent 생성 함수를 가짜로 대체
+    """
+
+    def build(decisions, agent_delay=0.0):
+        decisions = iter(decisions)
+
+        async def supervise(inputs):
+            return next(decisions)
+
+        async def summarize(inputs):
+            return SummaryFormat(problem="p", cause="c", solution="s")
+
+        async def create_agent(name):
+            return None, fake_agent(name, agent_delay)
+
+        monkeypatch.setattr(workflow, "graph_instance", None)
+        monkeypatch.setattr(workflow, "create_supervisor_agent", lambda: RunnableLambda(supervise))
+        monkeypatch.setattr(workflow, "create_summarizer_agent", lambda: RunnableLambda(summarize))
+        monkeypatch.setattr(workflow, "create_grafana_agent", lambda: create_agent("GrafanaAgent"))
+        monkeypatch.setattr(workflow, "create_github_agent", lambda: create_agent("GithubAgent"))
+        monkeypatch.setattr(workflow, "create_websearch_agent", lambda: create_agent("WebSearchAgent"))
+        return workflow.create_workflow_graph()
+
+    return build
+
+
+def test_build_context_keeps_alert_and_instruction_within_budget():
+    messages = [HumanMessage(content="Alert triggered: high CPU on app-01")]
+    messages += [
+        HumanMessage(content=f"finding {i} " + "metric value " * 400, name="GrafanaAgent")
+        for i in range(10)
+    ]
+
+    context = build_context(messages, budget=1500, digest_tokens=200, instruction="check memory")
+
+    assert count_message_tokens(context) <= 1500
+    assert context[0].content == messages[0].content
+    assert context[-1].content == "Supervisor instruction: check memory"
+    assert context[1].name == "ContextManager"
+    # 가장 최근 결과가 유지되고, 각 결과는 digest로 줄어듦
+    assert context[-2].content.startswith("finding 9")
+    assert "tokens truncated" in context[-2].content
+    assert context[-2].name == "GrafanaAgent"
+
+    assert build_context(messages, budget=0, digest_tokens=200) == messages
+
+    # 생략 표시와 긴 지시사항까지 포함해도 어떤 budget에서든 넘지 않음
+    long_instruction = "check memory " * 1000
+    for budget in range(600, 2000, 37):
+        context = build_context(messages, budget=budget, digest_tokens=200, instruction=long_instruction)
+        assert count_message_tokens(context) <= budget
+        assert "tokens truncated" in context[-1].content
+
+
+@pytest.mark.asyncio
+async def test_parallel_agent_node_runs_agents_concurrently():
+    running = []
+    both_running = asyncio.Event()
+    instructions = {}
+
+    def overlapping_agent(name):
+        async def invoke(inputs):
+            instructions[name] = inputs["messages"][-1].content
+            running.append(name)
+            if len(running) == 2:
+                both_running.set()
+            # 다른 agent가 시작할 때까지 기다리므로 순서대로 실행되면 timeout
+            await asyncio.wait_for(both_running.wait(), timeout=1.0)
+            return {"messages": list(inputs["messages"]) + [AIMessage(content=f"{name} findings")]}
+
+        return RunnableLambda(invoke)
+
+    agents = {"GrafanaAgent": overlapping_agent("GrafanaAgent"), "GithubAgent": overlapping_agent("GithubAgent")}
+    state = {
+        "messages": [HumanMessage(content="alert")],
+        "instruction": "check metrics",
+        "dispatch": ["GrafanaAgent", "GithubAgent"],
+        "dispatch_instructions": {"GrafanaAgent": "check metrics", "GithubAgent": "check recent commits"},
+    }
+
+    result = await parallel_agent_node(state, agents=agents)
+
+    # 두 agent가 동시에 실행 중이었고, 각자 자신의 지시사항을 받음
+    assert sorted(running) == ["GithubAgent", "GrafanaAgent"]
+    assert "check metrics" in instructions["GrafanaAgent"]
+    assert "check recent commits" in instructions["GithubAgent"]
+    assert "check metrics" not in instructions["GithubAgent"]
+    # 새로 추가된 메시지만 delta로 반환
+    assert [message.name for message in result["messages"]] == ["GrafanaAgent", "GithubAgent"]
+    assert result["messages"][0].content == "GrafanaAgent findings"
+    assert result["dispatch"] == []
+    assert result["dispatch_instructions"] == {}
+    assert result["tokens_used"] == 0
+
+
+@pytest.mark.asyncio
+async def test_workflow_parallel_dispatch(fake_workflow, monkeypatch):
+    monkeypatch.setattr(settings, "PARALLEL_AGENT_DISPATCH", True)
+    graph = await fake_workflow(
+        [
+            ParallelSupervisorRouteResponse(
+                next="GrafanaAgent",
+                instruction="check metrics",
+                parallel_agents=[
+                    ParallelAgentTask(agent="GithubAgent", instruction="check recent commits"),
+                    ParallelAgentTask(agent="WebSearchAgent", instruction=""),
+                ],
+            ),
+            SupervisorRouteResponse(next="SUMMARIZE", instruction="summarize"),
+        ]
+    )
+
+    final_state = await graph.ainvoke(
+        {"messages": [HumanMessage(content="alert")], "next": "Supervisor", "instruction": ""}
+    )
+
+    names = [getattr(message, "name", None) for message in final_state["messages"]]
+    assert names == [None, "GrafanaAgent", "GithubAgent", "WebSearchAgent", "Summarizer"]
+    assert final_state["iteration_count"] == 2
+    assert final_state["dispatch_instructions"] == {}
+
+    # 지시사항 없이 지정된 agent는 공통 지시사항과 자신의 조사 범위를 받음
+    fallback = parallel_instruction("WebSearchAgent", "check metrics")
+    assert fallback.startswith("check metrics")
+    assert "documentation on the web" in fallback
+
+
+@pytest.mark.asyncio
+async def test_workflow_iteration_cap_forces_summary(fake_workflow, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_MAX_ITERATIONS", 10)
+    decision = SupervisorRouteResponse(next="GrafanaAgent", instruction="look again")
+    graph = await fake_workflow([decision] * 20)
+
+    final_state = await graph.ainvoke(
+        {"messages": [HumanMessage(content="alert")], "next": "Supervisor", "instruction": ""},
+        {"recursion_limit": graph_recursion_limit()},
+    )
+
+    assert final_state["iteration_count"] == 10
+    assert "CPU" not in final_state["instruction"]
+    assert final_state["messages"][-1].name == "Summarizer"
+    assert len(final_state["messages"]) == 1 + 9 + 1
+
+    # 노드별 실행 시간이 histogram에 기록됨
+    def runs(node):
+        return registry.get_sample_value(
+            "alert_analyzer_node_duration_seconds_count", {"node": node}
+        ) or 0
+
+    assert runs("Supervisor") >= 10
+    assert runs("GrafanaAgent") >= 9
+    assert runs("Summarizer") >= 1
+
+
+def test_resume_budget_shifts_deadline_by_downtime():
+    state = resolve_budget({}, now=1000.0, overrides={})
+    shifted = resume_budget(state, paused_at=1100.0, now=1700.0)
+
+    assert shifted == {"started_at": 1600.0, "deadline": state["deadline"] + 600}
+    assert remaining_seconds({**state, **shifted}, now=1700.0) == remaining_seconds(state, now=1100.0)
+    assert resume_budget(state, paused_at=1100.0, now=1100.0) == {}
+
+
+@pytest.mark.asyncio
+async def test_workflow_iteration_cap_can_be_disabled(fake_workflow, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_MAX_ITERATIONS", 0)
+    decision = SupervisorRouteResponse(next="GrafanaAgent", instruction="look again")
+    graph = await fake_workflow([decision] * 15 + [SupervisorRouteResponse(next="SUMMARIZE", instruction="summarize")])
+
+    final_state = await graph.ainvoke(
+        {"messages": [HumanMessage(content="alert")], "next": "Supervisor", "instruction": ""},
+        {"recursion_limit": graph_recursion_limit()},
+    )
+
+    # budget이 남아 있는 동안은 Supervisor가 끝낼 때까지 반복
+    assert final_state["iteration_count"] == 16
+    assert final_state["messages"][-1].name == "Summarizer"
+
+
+@pytest.mark.asyncio
+async def test_workflow_deadline_cancels_agent_and_forces_summary(fake_workflow):
+    decision = SupervisorRouteResponse(next="GrafanaAgent", instruction="look again")
+    graph = await fake_workflow([decision] * 20, agent_delay=5.0)
+
+    started = time.perf_counter()
+    final_state = await graph.ainvoke(
+        {
+            "messages": [HumanMessage(content="alert")],
+            "next": "Supervisor",
+            "instruction": "",
+            **resolve_budget({"severity": "info"}, overrides={"info": BudgetLimits(deadline_seconds=0.5)}),
+        }
+    )
+
+    # 느린 agent는 deadline에서 취소되고, 남은 몫으로 요약까지 끝남
+    assert time.perf_counter() - started < 1.0
+    assert final_state["budget_exhausted"] == "deadline"
+    assert "deadline exceeded" in final_state["messages"][1].content
+    assert final_state["messages"][-1].name == "Summarizer"
+
+
+@pytest.mark.asyncio
+async def test_workflow_token_budget_forces_summary(fake_workflow):
+    graph = await fake_workflow([SupervisorRouteResponse(next="GrafanaAgent", instruction="look")])
+
+    budget = resolve_budget({}, overrides={})
+    budget.update(token_budget=1000, tokens_used=900)
+    final_state = await graph.ainvoke(
+        {"messages": [HumanMessage(content="alert")], "next": "Supervisor", "instruction": "", **budget}
+    )
+
+    assert final_state["budget_exhausted"] == "tokens"
+    assert [getattr(message, "name", None) for message in final_state["messages"]] == [None, "Summarizer"]
+
+
+def test_resolve_budget_uses_severity_overrides():
+    overrides = {"critical": BudgetLimits(deadline_seconds=600, token_budget=300000)}
+
+    critical = resolve_budget({"severity": "Critical"}, now=100.0, overrides=overrides)
+    assert critical["deadline"] == 700.0
+    assert critical["token_budget"] == 300000
+
+    default = resolve_budget({"severity": "warning"}, now=100.0, overrides=overrides)
+    assert default["deadline"] == 100.0 + settings.ANALYSIS_DEADLINE_SECONDS
+    assert default["token_budget"] == settings.ANALYSIS_TOKEN_BUDGET
+    assert exhausted(default, now=101.0) is None
+    assert exhausted(default, now=default["deadline"] - 1) == "deadline"
+
+
+def test_token_counter_sums_llm_usage():
+    from langchain_core.outputs import ChatGeneration, LLMResult
+
+    message = AIMessage(content="ok", usage_metadata={"input_tokens": 120, "output_tokens": 30, "total_tokens": 150})
+    counter = TokenCounter()
+    counter.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+    counter.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+
+    assert counter.total == 300
+
+
+@pytest.mark.asyncio
+async def test_analyze_alert_returns_structured_summary_from_state(fake_workflow, monkeypatch):
+    import app.services.alert_analyzer as alert_analyzer
+
+    monkeypatch.setattr(settings, "INCIDENT_INDEX_ENABLED", False)
+    summary = SummaryFormat(
+        problem="CPU at 97% on api-1",
+        cause="Runaway cron job\n### not a section header",
+        solution="1. Stop the job\n2. Add a CPU limit",
+    )
+
+    async def summarize(inputs):
+        return summary
+
+    graph = fake_workflow([SupervisorRouteResponse(next="SUMMARIZE", instruction="summarize")])
+    monkeypatch.setattr(workflow, "create_summarizer_agent", lambda: RunnableLambda(summarize))
+    await graph
+
+    result = await alert_analyzer.analyze_alert("High CPU", labels={"alertname": "HighCPU"})
+
+    # markdown을 다시 파싱하지 않으므로 내용이 그대로 보존됨
+    assert result["status"] == "success"
+    assert result["analysis"] == summary.model_dump()
+
+
+@pytest.mark.asyncio
+async def test_analyze_alert_reports_error_when_summarizer_fails(fake_workflow, monkeypatch):
+    import app.services.alert_analyzer as alert_analyzer
+
+    monkeypatch.setattr(settings, "INCIDENT_INDEX_ENABLED", False)
+
+    async def summarize(inputs):
+        raise RuntimeError("model unavailable")
+
+    graph = fake_workflow([SupervisorRouteResponse(next="SUMMARIZE", instruction="summarize")])
+    monkeypatch.setattr(workflow, "create_summarizer_agent", lambda: RunnableLambda(summarize))
+    await graph
+
+    result = await alert_analyzer.analyze_alert("High CPU")
+
+    assert result["status"] == "error"
+    assert "model unavailable" in result["message"]
+    assert "analysis" not in result
+
+
+@pytest.mark.asyncio
+async def test_create_workflow_graph_is_single_flight(monkeypatch):
+    created = []
+    all_started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def create_agent(name):
+        created.append(name)
+        if len(created) == 3:
+            all_started.set()
+        # 나머지 agent 생성이 시작될 때까지 기다리므로 순서대로 생성되면 timeout
+        await asyncio.wait_for(all_started.wait(), timeout=1.0)
+        await release.wait()
+        return None, fake_agent(name)
+
+    monkeypatch.setattr(workflow, "graph_instance", None)
+    monkeypatch.setattr(workflow, "graph_readiness", {"status": "cold", "error": None, "timings": {}})
+    monkeypatch.setattr(workflow, "create_supervisor_agent", lambda: RunnableLambda(lambda x: x))
+    monkeypatch.setattr(workflow, "create_summarizer_agent", lambda: RunnableLambda(lambda x: x))
+    monkeypatch.setattr(workflow, "create_grafana_agent", lambda: create_agent("GrafanaAgent"))
+    monkeypatch.setattr(workflow, "create_github_agent", lambda: create_agent("GithubAgent"))
+    monkeypatch.setattr(workflow, "create_websearch_agent", lambda: create_agent("WebSearchAgent"))
+
+    assert await workflow.wait_for_graph(timeout=0.01) is False
+    assert workflow.graph_readiness["status"] == "warming"
+
+    waiters = asyncio.gather(*[workflow.create_workflow_graph() for _ in range(5)])
+    await asyncio.wait_for(all_started.wait(), timeout=1.0)
+    release.set()
+    graphs = await waiters
+
+    # agent 생성은 한 번씩만, 동시에 실행됨
+    assert sorted(created) == ["GithubAgent", "GrafanaAgent", "WebSearchAgent"]
+    assert all(graph is graphs[0] for graph in graphs)
+    assert workflow.graph_readiness["status"] == "ready"
+    assert set(workflow.graph_readiness["timings"]) >= {"GrafanaAgent", "GithubAgent", "total"}
+    assert await workflow.wait_for_graph(timeout=0.01) is True
+
+
+def test_alert_router_matches_labels_and_annotations():
+    router = AlertRouter(
+        parse_routing_rules(
+            '[{"name": "metrics", "match": {"alertname": "*cpu*|*memory*"}, "plan": ["GrafanaAgent"]},'
+            ' {"name": "deploy", "match": {"annotations.summary": "*deploy*", "team": "api"},'
+            ' "plan": ["GithubAgent", "GrafanaAgent", "SUMMARIZE"]}]'
+        )
+    )
+
+    assert router.route({"alertname": "HighCPUUsage"}).plan == ["GrafanaAgent"]
+    route = router.route({"team": "api"}, {"summary": "Errors after Deploy"})
+    assert route.rule == "deploy"
+    assert route.plan == ["GithubAgent", "GrafanaAgent", "SUMMARIZE"]
+    assert router.route({"team": "web"}, {"summary": "Errors after deploy"}) is None
+    assert router.stats()["rule_hits"] == {"metrics": 1, "deploy": 1}
+
+
+@pytest.mark.asyncio
+async def test_workflow_follows_routing_plan_without_supervisor(fake_workflow):
+    graph = await fake_workflow([SupervisorRouteResponse(next="SUMMARIZE", instruction="summarize")])
+
+    final_state = await graph.ainvoke(
+        {
+            "messages": [HumanMessage(content="alert")],
+            "next": "Supervisor",
+            "instruction": "check metrics",
+            "plan": ["GrafanaAgent", "GithubAgent"],
+            "llm_calls_saved": 0,
+        }
+    )
+
+    names = [getattr(message, "name", None) for message in final_state["messages"]]
+    assert names == [None, "GrafanaAgent", "GithubAgent", "Summarizer"]
+    # 두 hop은 규칙으로, 마지막 SUMMARIZE 결정만 LLM이 내림
+    assert final_state["llm_calls_saved"] == 2
+    assert final_state["plan"] == []
+
+
+@pytest.mark.asyncio
+async def test_workflow_streams_progress_events(fake_workflow):
+    graph = await fake_workflow([
+        SupervisorRouteResponse(next="GrafanaAgent", instruction="check metrics"),
+        SupervisorRouteResponse(next="SUMMARIZE", instruction="summarize"),
+    ])
+
+    chunks = [
+        chunk
+        async for chunk in graph.astream(
+            {"messages": [HumanMessage(content="alert")], "next": "Supervisor", "instruction": ""},
+            stream_mode=["updates", "custom"],
+        )
+    ]
+
+    assert ("custom", {"event": "node_started", "node": "GrafanaAgent", "instruction": "check metrics"}) in chunks
+    nodes = [next(iter(chunk)) for mode, chunk in chunks if mode == "updates"]
+    assert nodes == ["Supervisor", "GrafanaAgent", "Supervisor", "Summarizer"]
+
+
+@pytest.mark.asyncio
+async def test_chat_model_factory_override():
+    from app.agents import llm
+    from app.agents.supervisor import create_supervisor_agent
+    from benchmarks.fake_llm import ScriptedChatModel
+
+    llm.set_chat_model_factory(lambda agent, **kwargs: ScriptedChatModel(agent=agent))
+    try:
+        supervisor = create_supervisor_agent()
+        first = await supervisor.ainvoke({"messages": [HumanMessage(content="alert")]})
+        done = await supervisor.ainvoke(
+            {
+                "messages": [HumanMessage(content="alert")]
+                + [HumanMessage(content="found", name=name) for name in ScriptedChatModel(agent="x").plan]
+            }
+        )
+    finally:
+        llm.set_chat_model_factory(None)
+
+    assert first.next == "GrafanaAgent"
+    assert done.next == "SUMMARIZE"
+
+
+@pytest.mark.asyncio
+async def test_supervisor_asks_for_parallel_agents_only_in_parallel_mode(monkeypatch):
+    from app.agents import llm
+    from app.agents.supervisor import create_supervisor_agent
+    from benchmarks.fake_llm import ScriptedChatModel
+
+    llm.set_chat_model_factory(lambda agent, **kwargs: ScriptedChatModel(agent=agent))
+    try:
+        for parallel in (False, True):
+            monkeypatch.setattr(settings, "PARALLEL_AGENT_DISPATCH", parallel)
+            supervisor = create_supervisor_agent()
+            inputs = {"messages": [HumanMessage(content="alert")]}
+
+            prompt = supervisor.first.invoke(inputs).to_string()
+            decision = await supervisor.ainvoke(inputs)
+
+            assert ("parallel_agents" in prompt) is parallel
+            assert hasattr(decision, "parallel_agents") is parallel
+            assert decision.next == "GrafanaAgent"
+    finally:
+        llm.set_chat_model_factory(None)
+
+
+@pytest.mark.asyncio
+async def test_interrupted_investigation_resumes_from_checkpoint(fake_workflow, monkeypatch):
+    import app.services.alert_analyzer as alert_analyzer
+    from app.services.checkpoints import InvestigationCheckpoints
+
+    checkpoints = InvestigationCheckpoints(":memory:", retention_seconds=3600, sweep_interval=3600)
+    monkeypatch.setattr(settings, "CHECKPOINT_ENABLED", True)
+    monkeypatch.setattr(settings, "INCIDENT_INDEX_ENABLED", False)
+    monkeypatch.setattr(settings, "ANALYSIS_DEADLINE_SECONDS", 1.0)
+    monkeypatch.setattr(workflow, "investigation_checkpoints", checkpoints)
+    monkeypatch.setattr(alert_analyzer, "investigation_checkpoints", checkpoints)
+
+    supervisor_calls = []
+    decisions = iter([
+        SupervisorRouteResponse(next="GrafanaAgent", instruction="check metrics"),
+        SupervisorRouteResponse(next="GithubAgent", instruction="check deploys"),
+        SupervisorRouteResponse(next="SUMMARIZE", instruction="summarize"),
+    ])
+
+    async def supervise(inputs):
+        supervisor_calls.append(1)
+        return next(decisions)
+
+    crashed = []
+
+    async def github(inputs):
+        if not crashed:
+            # 첫 실행은 GithubAgent 도중에 프로세스가 종료된 것처럼 취소
+            crashed.append(1)
+            raise asyncio.CancelledError()
+        return {"messages": list(inputs["messages"]) + [AIMessage(content="GithubAgent findings")]}
+
+    async def create_github_agent():
+        return None, RunnableLambda(github)
+
+    graph = fake_workflow([])
+    monkeypatch.setattr(workflow, "create_supervisor_agent", lambda: RunnableLambda(supervise))
+    monkeypatch.setattr(workflow, "create_github_agent", create_github_agent)
+    await graph
+
+    # aiosqlite 연결 thread가 남지 않도록 실패해도 닫음
+    try:
+        with pytest.raises(asyncio.CancelledError):
+            await alert_analyzer.analyze_alert("High CPU", labels={"alertname": "HighCPU"}, fingerprint="fp1")
+
+        interrupted = await checkpoints.interrupted()
+        assert [item["fingerprint"] for item in interrupted] == ["fp1"]
+        assert interrupted[0]["labels"] == {"alertname": "HighCPU"}
+
+        # 재시작에 걸린 시간이 deadline을 넘겨도 재개한 조사는 멈춘 시점의 남은 시간으로 계속 진행
+        await asyncio.sleep(1.1)
+        result = await alert_analyzer.analyze_alert(
+            interrupted[0]["description"], fingerprint="fp1", resume_thread=interrupted[0]["thread_id"]
+        )
+
+        assert result["status"] == "success"
+        assert result["analysis"] == {"problem": "p", "cause": "c", "solution": "s"}
+        # GrafanaAgent와 처음 두 Supervisor 결정은 다시 실행하지 않음
+        assert len(supervisor_calls) == 3
+        assert result["budget"]["exhausted"] is None
+        assert result["budget"]["elapsed_seconds"] < 1.0
+        assert await checkpoints.interrupted() == []
+        assert checkpoints.stats()["resumed"] == 1
+        assert checkpoints.stats()["completed"] == 1
+
+        # 완료된 조사의 checkpoint는 바로 지워지고, 기록은 retention이 지나면 정리됨
+        saver = await checkpoints.saver()
+        assert await saver.aget_tuple({"configurable": {"thread_id": interrupted[0]["thread_id"]}}) is None
+        checkpoints.retention_seconds = -1
+        assert await checkpoints.sweep() == 1
+    finally:
+        await checkpoints.stop()
@@ -2,8 +2,29 @@
 Service Test
 """
 
+import asyncio
+import os
+import sys
+import time
+
+import httpx
 import pytest
 
+from app.services.admission import AdmissionController, AdmissionRejected
+from app.services.coalescer import SingleFlight
+from app.services.github_snapshot import GitHubRepoSnapshot
+from app.services.incident_index import IncidentIndex
+from app.services.jobs import AnalysisJobQueue
+from app.services.llm_limiter import LLMRateLimiter
+from app.services.metrics import TokenUsageCallback, registry
+from app.services.model_tiers import ModelTierRouter
+from app.services.notification import EmailNotifier, SMTPConnectionPool
+from app.services.outbox import NotificationOutbox
+from app.services.mcp_pool import MCPServerPool
+from app.services.result_cache import SQLiteCache
+from app.services.search_cache import CachedSearchTool, normalize_query
+from app.services.tool_cache import ToolResultCache, canonicalize_arguments, parse_ttl_rules
+from app.utils.alert import alert_fingerprint, group_alerts, investigation_description
 from app.utils.text import clean_text, extract_analysis_sections
 
 
@@ -47,3 +68,817 @@ def test_extract_analysis_sections():
 
     assert "connection pooling" in result["solution"]
     assert "short-term solution" in result["solution"]
+
+
+def test_alert_fingerprint():
+    assert alert_fingerprint({"fingerprint": "abc123"}) == "abc123"
+
+    first = {
+        "labels": {"instance": "app-01", "alertname": "HighCPU"},
+        "annotations": {"description": "CPU  usage is high"},
+    }
+    second = {
+        "labels": {"alertname": "HighCPU", "instance": "app-01"},
+        "annotations": {"description": "cpu usage is high"},
+    }
+    other = {
+        "labels": {"alertname": "HighCPU", "instance": "app-02"},
+        "annotations": {"description": "CPU usage is high"},
+    }
+    assert alert_fingerprint(first) == alert_fingerprint(second)
+    assert alert_fingerprint(first) != alert_fingerprint(other)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def analyze():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"status": "success"}
+
+    results = await asyncio.gather(*[flight.run("key", analyze) for _ in range(5)])
+
+    assert len(calls) == 1
+    assert all(result == {"status": "success"} for result in results)
+    assert flight.stats() == {"calls": 5, "executions": 1, "coalesced": 4, "in_flight": 0}
+
+    await flight.run("key", analyze)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_admission_control_orders_by_severity_and_sheds():
+    controller = AdmissionController(
+        max_concurrent=1, queue_size=2, queue_timeout=1,
+        severity_order=["critical", "warning", "info"], default_severity="warning",
+        shed_severity="info", retry_after=30,
+    )
+    await controller.acquire({"severity": "warning"})
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire({"severity": "info"})
+    assert rejected.value.reason == "shed"
+    assert rejected.value.retry_after == 30
+
+    order = []
+
+    async def run(severity):
+        order.append(await controller.acquire({"severity": severity}))
+
+    async def defer():
+        # shed=False이면 낮은 severity도 거절하지 않고 queue에서 기다림
+        await controller.acquire({"severity": "info"}, shed=False)
+
+    deferred = asyncio.create_task(defer())
+    await asyncio.sleep(0)
+    waiting = [asyncio.create_task(run(None))]
+    await asyncio.sleep(0)
+    waiting.append(asyncio.create_task(run("critical")))
+    await asyncio.sleep(0)
+
+    # queue가 가득 차면 가장 낮은 severity의 대기 항목이 밀려남
+    with pytest.raises(AdmissionRejected) as evicted:
+        await deferred
+    assert evicted.value.reason == "evicted"
+
+    controller.release()
+    await asyncio.sleep(0)
+    controller.release()
+    await asyncio.gather(*waiting)
+    assert order == ["critical", "warning"]
+
+    stats = controller.stats()
+    assert stats["running"] == 1
+    assert stats["queued"] == 0
+    assert stats["rejected"] == {"shed": 1, "evicted": 1}
+
+
+@pytest.mark.asyncio
+async def test_analysis_job_queue():
+    queue = AnalysisJobQueue(workers=2, max_queue_size=1, retention_seconds=60)
+
+    async def analyze():
+        await asyncio.sleep(0.01)
+        return {"status": "success"}
+
+    job = queue.submit(analyze)
+    with pytest.raises(asyncio.QueueFull):
+        queue.submit(analyze)
+
+    finished = await queue.wait(job.id, timeout=1)
+    assert finished.status == "completed"
+    assert finished.result == {"status": "success"}
+
+    stats = queue.stats()
+    assert stats["submitted"] == 1
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 1
+    assert stats["queue_depth"] == 0
+
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_analysis_job_rejected_by_admission_is_not_completed():
+    queue = AnalysisJobQueue(workers=1, max_queue_size=1, retention_seconds=60)
+
+    async def shed():
+        return {"status": "rejected", "reason": "shed", "retry_after": 60}
+
+    job = queue.submit(shed)
+    finished = await queue.wait(job.id, timeout=1)
+
+    assert finished.status == "rejected"
+    assert finished.result["reason"] == "shed"
+    stats = queue.stats()
+    assert stats["completed"] == 0
+    assert stats["admission_rejected"] == 1
+
+    await queue.stop()
+
+
+def test_group_alerts_merges_same_symptom():
+    common_labels = {"alertname": "HighCPU", "job": "node"}
+    alerts = [
+        {
+            "labels": {"alertname": "HighCPU", "job": "node", "instance": "app-01"},
+            "annotations": {"description": "CPU usage on app-01 is 95%"},
+        },
+        {
+            "labels": {"alertname": "HighCPU", "job": "node", "instance": "app-02"},
+            "annotations": {"description": "CPU usage on app-02 is 91%"},
+        },
+        {
+            "labels": {"alertname": "HighCPU", "job": "node", "instance": "db-01"},
+            "annotations": {"description": "Load average on db-01 is 30"},
+        },
+    ]
+
+    assert group_alerts(alerts, common_labels) == [[0, 1], [2]]
+    assert group_alerts(alerts, common_labels, merge=False) == [[0], [1], [2]]
+
+    description = investigation_description(alerts[:2], common_labels)
+    assert description.startswith("CPU usage on app-01 is 95%")
+    assert "firing for 2 targets" in description
+    assert "- instance=app-02" in description
+    assert investigation_description(alerts[2:], common_labels) == "Load average on db-01 is 30"
+
+
+def test_sqlite_cache_ttl_and_lru(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path, table="results", ttl_seconds=60, max_entries=2)
+
+    cache.set("a", {"status": "success"})
+    cache.set("b", {"status": "success"})
+    assert cache.get("a") == {"status": "success"}
+    assert cache.get("missing") is None
+
+    # "b"가 가장 오래 사용되지 않았으므로 제거됨
+    cache.set("c", {"status": "success"})
+    assert cache.get("b") is None
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+    # 재시작 후에도 유지됨
+    reopened = SQLiteCache(path, table="results", ttl_seconds=0, max_entries=2)
+    assert reopened.get("a") is None
+    assert reopened.stats()["expirations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_mcp_server_pool_dispatch_and_restart():
+    connection = {
+        "command": sys.executable,
+        "args": [os.path.join(os.path.dirname(__file__), "mcp_stub_server.py")],
+        "transport": "stdio",
+    }
+    pool = MCPServerPool("stub", connection, size=2, ping_interval=60, ping_timeout=5)
+    await pool.start()
+    try:
+        tools = {tool.name: tool for tool in pool.get_tools()}
+        assert await tools["echo"].ainvoke({"text": "hello"}) == "hello"
+
+        # 두 호출이 서로 다른 subprocess에서 동시에 실행됨
+        started = time.perf_counter()
+        await asyncio.gather(
+            tools["slow"].ainvoke({"seconds": 0.5}), tools["slow"].ainvoke({"seconds": 0.5})
+        )
+        assert time.perf_counter() - started < 0.9
+        assert pool.stats()["calls"][0] >= 1 and pool.stats()["calls"][1] >= 1
+
+        # 종료된 인스턴스는 다시 시작됨
+        crashed = pool.instances[0]
+        await crashed.stop()
+        assert pool.stats()["healthy"] == 1
+        assert await tools["echo"].ainvoke({"text": "still up"}) == "still up"
+        await pool._restart(crashed)
+        stats = pool.stats()
+        assert stats["healthy"] == 2
+        assert stats["restarts"] == 1
+        assert stats["errors"] == 0
+
+        # 종료 시 진행 중인 백그라운드 재시작도 취소하고 기다림
+        crashed.healthy = False
+        pool._schedule_restart(crashed)
+        assert len(pool._restart_tasks) == 1
+    finally:
+        await pool.close()
+    assert pool.stats()["healthy"] == 0
+    assert not pool._restart_tasks
+
+
+def test_canonicalize_arguments_snaps_time_ranges():
+    arguments = {
+        "expr": " rate(cpu[5m]) ",
+        "startRfc3339": "2025-04-28T10:00:42Z",
+        "endRfc3339": "2025-04-28T11:00:59+00:00",
+        "step": 60,
+        "end_time": 1745838059,
+        "labels": None,
+    }
+    assert canonicalize_arguments(arguments, time_step=60) == {
+        "expr": "rate(cpu[5m])",
+        "startRfc3339": "2025-04-28T10:00:00Z",
+        "endRfc3339": "2025-04-28T11:00:00Z",
+        "step": 60,
+        "end_time": 1745838000,
+    }
+    assert canonicalize_arguments({"start": "now-1h"}, time_step=60) == {"start": "now-1h"}
+
+
+@pytest.mark.asyncio
+async def test_tool_result_cache_per_tool_ttl():
+    cache = ToolResultCache(
+        "test",
+        ttl_rules=parse_ttl_rules("query_*=0,*dashboard*=600"),
+        default_ttl=60,
+        max_entries=10,
+        time_step=60,
+    )
+    calls = []
+
+    async def fetch(arguments):
+        calls.append(arguments)
+        await asyncio.sleep(0.01)
+        return f"result {len(calls)}"
+
+    results = await asyncio.gather(
+        cache.call("get_dashboard_by_uid", {"uid": "abc"}, fetch),
+        cache.call("get_dashboard_by_uid", {"uid": "abc"}, fetch),
+    )
+    assert results == ["result 1", "result 1"]
+    assert await cache.call("get_dashboard_by_uid", {"uid": "abc"}, fetch) == "result 1"
+    assert len(calls) == 1
+
+    # TTL 0인 live query는 캐시하지 않음
+    await cache.call("query_prometheus", {"expr": "up"}, fetch)
+    await cache.call("query_prometheus", {"expr": "up"}, fetch)
+    assert len(calls) == 3
+
+    # 같은 step 안의 시간 범위는 key를 공유하지만, 조회에는 호출자가 준 end를 그대로 사용
+    await cache.call("get_dashboard_panels", {"uid": "abc", "end": 1745838059}, fetch)
+    assert await cache.call("get_dashboard_panels", {"uid": "abc", "end": 1745838041}, fetch) == "result 4"
+    assert calls[-1] == {"uid": "abc", "end": 1745838059}
+    assert len(calls) == 4
+
+    stats = cache.stats()
+    assert stats["tools"]["get_dashboard_by_uid"]["hits"] == 1
+    assert stats["tools"]["query_prometheus"]["hit_ratio"] == 0.0
+    assert stats["coalesced"] == 1
+
+
+def test_github_tool_cache_only_caches_the_configured_repository(monkeypatch):
+    from app.services.tool_cache import _is_configured_repository, settings
+
+    monkeypatch.setattr(settings, "GITHUB_REPO_OWNER", "acme")
+    monkeypatch.setattr(settings, "GITHUB_REPO_NAME", "shop")
+    assert _is_configured_repository("get_commit", {"owner": "Acme", "repo": "shop", "sha": "abc"})
+    assert not _is_configured_repository("get_commit", {"owner": "other", "repo": "shop", "sha": "abc"})
+    # owner/repo가 없는 search는 query가 설정된 저장소로 한정된 경우만 캐시
+    assert _is_configured_repository("search_code", {"query": "timeout repo:acme/shop"})
+    assert not _is_configured_repository("search_code", {"query": "timeout repo:acme/shop-legacy"})
+    assert not _is_configured_repository("search_repositories", {"query": "shop"})
+
+    monkeypatch.setattr(settings, "GITHUB_REPO_NAME", "")
+    assert not _is_configured_repository("get_commit", {"owner": "acme", "repo": "", "sha": "abc"})
+
+
+@pytest.mark.asyncio
+async def test_github_snapshot_revalidates_with_etag():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        if request.url.path.endswith("/commits"):
+            payload = [
+                {
+                    "sha": "a1b2c3d4e5f6a7b8",
+                    "html_url": "https://github.com/acme/api/commit/a1b2c3d4e5f6a7b8",
+                    "commit": {"message": "Fix connection pool leak\n\ndetails", "author": {"name": "dev"}},
+                }
+            ]
+        elif request.url.path.endswith("/issues"):
+            payload = [
+                {"number": 7, "title": "High CPU after deploy", "labels": [{"name": "bug"}]},
+                {"number": 8, "title": "Some PR", "pull_request": {}},
+            ]
+        else:
+            payload = [{"number": 9, "title": "Tune GC", "merged_at": "2025-01-01T00:00:00Z"}]
+        return httpx.Response(200, json=payload, headers={"ETag": '"v1"'})
+
+    snapshot = GitHubRepoSnapshot(
+        "acme", "api", token="t", api_url="https://github.test", refresh_seconds=3600,
+        limit=10, transport=httpx.MockTransport(handler),
+    )
+    await snapshot.start()
+    await snapshot.refresh()
+    await snapshot.stop()
+
+    assert len(requests) == 6
+    assert requests[0].headers["authorization"] == "Bearer t"
+    stats = snapshot.stats()
+    assert stats["not_modified"] == 3
+    assert stats["records"] == {"commits": 1, "open_issues": 1, "merged_pulls": 1}
+
+    tools = {tool.name: tool for tool in snapshot.get_tools()}
+    result = tools["snapshot_open_issues"].invoke({"query": "cpu"})
+    assert '"number": 7' in result
+    assert "pool leak" in tools["snapshot_commits"].invoke({})
+    assert snapshot.search("commits", query="nothing") == []
+
+
+@pytest.mark.asyncio
+async def test_web_search_cache_normalizes_queries():
+    assert normalize_query("High CPU usage java process causes") == normalize_query(
+        "what causes high cpu usage in a Java process?"
+    )
+    assert normalize_query("java CPU high usage") == "cpu high java usage"
+    # "causes"는 검색 의도를 바꾸므로 불용어가 아님
+    assert normalize_query("what causes high cpu") != normalize_query("high cpu")
+
+    search = CachedSearchTool(SQLiteCache(":memory:", "web_search_results", 60, 10))
+    calls = []
+
+    async def tavily(arguments):
+        calls.append(arguments)
+        return {"query": arguments["query"], "results": [{"url": "https://example.com"}]}
+
+    first = await search.call("tavily_search", {"query": "High CPU usage java process"}, tavily)
+    second = await search.call("tavily_search", {"query": "java process high cpu usage"}, tavily)
+    assert first == second
+    assert len(calls) == 1
+
+    # 검색 옵션이 다르면 다른 key
+    await search.call("tavily_search", {"query": "java process high cpu usage", "topic": "news"}, tavily)
+    assert len(calls) == 2
+
+    stats = search.stats()
+    assert stats["hits"] == 1
+    assert stats["entries"] == 2
+    assert stats["avg_hit_ms"] > 0
+
+
+def test_incident_index_finds_similar_incidents(tmp_path):
+    path = str(tmp_path / "incidents.db")
+    index = IncidentIndex(path, num_perm=128)
+    assert index.search("CPU usage is 93% on app-01") is None
+
+    analysis = {"problem": "High CPU", "cause": "GC thrashing", "solution": "Increase heap"}
+    index.add("CPU usage is 93% on app-01 for 5 minutes", {"alertname": "HighCPU"}, analysis)
+    index.add("Disk /var is 97% full on db-02", {"alertname": "DiskFull"}, {"problem": "disk"})
+
+    # 수치만 다른 같은 alert는 거의 동일하게 판정
+    match = index.search("CPU usage is 88% on app-01 for 5 minutes", {"alertname": "HighCPU"})
+    assert match["analysis"] == analysis
+    assert match["similarity"] >= 0.9
+
+    other = index.search("Memory usage is high on cache-03", {"alertname": "HighMemory"})
+    assert other is None or other["similarity"] < 0.5
+
+    # 재시작 후에도 SQLite에서 signature를 다시 읽어옴
+    reloaded = IncidentIndex(path, num_perm=128)
+    assert reloaded.search("CPU usage is 88% on app-01 for 5 minutes", {"alertname": "HighCPU"})[
+        "incident_id"
+    ] == match["incident_id"]
+    assert reloaded.stats()["incidents"] == 2
+
+
+def test_incident_index_prunes_old_and_excess_incidents():
+    index = IncidentIndex(":memory:", num_perm=64, max_entries=10, max_age_seconds=3600)
+    for i in range(15):
+        index.add(f"Service svc-{i} returns errors on host node-{i}", {"alertname": f"Errors{i}"}, {"problem": str(i)})
+
+    # max_entries를 넘으면 가장 오래된 incident부터 SQLite와 메모리 색인에서 함께 제거
+    assert index.stats()["incidents"] == 10
+    assert index.stats()["pruned"] == 5
+    oldest = index.search("Service svc-0 returns errors on host node-0", {"alertname": "Errors0"})
+    assert oldest is None or oldest["analysis"] != {"problem": "0"}
+    latest = index.search("Service svc-14 returns errors on host node-14", {"alertname": "Errors14"})
+    assert latest["analysis"] == {"problem": "14"}
+
+    # max_age_seconds가 지난 incident도 제거
+    index._prune(time.time() + 7200)
+    assert index.stats()["incidents"] == 0
+    assert index.search("Service svc-14 returns errors on host node-14", {"alertname": "Errors14"}) is None
+
+
+def test_token_usage_callback_counts_tokens_per_agent():
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, LLMResult
+
+    message = AIMessage(
+        content="ok", usage_metadata={"input_tokens": 120, "output_tokens": 30, "total_tokens": 150}
+    )
+    callback = TokenUsageCallback("TestAgent")
+    callback.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+    callback.on_llm_end(
+        LLMResult(
+            generations=[[ChatGeneration(message=AIMessage(content="ok"))]],
+            llm_output={"token_usage": {"prompt_tokens": 10, "completion_tokens": 5}},
+        )
+    )
+
+    def sample(kind):
+        return registry.get_sample_value(
+            "alert_analyzer_llm_tokens_total", {"agent": "TestAgent", "kind": kind}
+        )
+
+    assert sample("prompt") == 130
+    assert sample("completion") == 35
+    assert registry.get_sample_value("alert_analyzer_llm_calls_total", {"agent": "TestAgent"}) == 2
+
+
+class FakeSMTP:
+    def __init__(self, sent, fail_once=False):
+        self.sent = sent
+        self.fail_once = fail_once
+        self.is_connected = False
+
+    async def connect(self):
+        self.is_connected = True
+
+    async def noop(self):
+        pass
+
+    async def quit(self):
+        self.is_connected = False
+
+    async def send_message(self, message, sender, recipients):
+        import aiosmtplib
+
+        if self.fail_once:
+            self.fail_once = False
+            self.is_connected = False
+            raise aiosmtplib.SMTPServerDisconnected("connection lost")
+        self.sent.append((message["Subject"], tuple(recipients)))
+
+
+@pytest.mark.asyncio
+async def test_llm_rate_limiter_queues_by_agent_priority():
+    limiter = LLMRateLimiter(
+        rpm=6000, tpm=60000, priority_order=["Summarizer", "Supervisor", "GrafanaAgent"], pause_seconds=0.1
+    )
+    # 한 번에 bucket 크기만큼 받아서 이후 호출은 token이 다시 찰 때까지 기다림
+    await limiter.acquire("GrafanaAgent", 60000)
+
+    order = []
+
+    async def call(agent):
+        await limiter.acquire(agent, 100)
+        order.append(agent)
+
+    tasks = [asyncio.create_task(call(agent)) for agent in ("GrafanaAgent", "Supervisor", "Summarizer")]
+    await asyncio.sleep(0)
+    assert limiter.stats()["waiting"] == 3
+
+    await asyncio.gather(*tasks)
+    assert order == ["Summarizer", "Supervisor", "GrafanaAgent"]
+
+    # 실제 사용량이 추정치보다 적으면 차이를 돌려받음
+    before = limiter.stats()["tokens_available"]
+    limiter.settle(100, 40)
+    assert limiter.stats()["tokens_available"] >= before + 60
+
+    # 429를 받으면 pause 동안 모든 호출이 기다림
+    limiter.penalize("GrafanaAgent")
+    started = time.perf_counter()
+    await limiter.acquire("Summarizer", 1)
+    assert time.perf_counter() - started >= 0.09
+    assert limiter.stats()["rate_limited"] == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_model_uses_shared_pool_and_limiter(monkeypatch):
+    from langchain_core.messages import HumanMessage
+
+    from app.agents import llm
+
+    requests = []
+
+    def respond(request):
+        requests.append(request)
+        return httpx.Response(200, json={
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "ok"}}],
+            "usage": {"prompt_tokens": 20, "completion_tokens": 5, "total_tokens": 25},
+        })
+
+    limiter = LLMRateLimiter(rpm=60, tpm=100000, priority_order=[], pause_seconds=1)
+    monkeypatch.setattr(llm, "llm_limiter", limiter)
+    monkeypatch.setattr(llm, "_http_async_client", httpx.AsyncClient(transport=httpx.MockTransport(respond)))
+    monkeypatch.setattr(llm.settings, "OPENAI_API_KEY", "test-key")
+    try:
+        supervisor = llm.create_chat_model("Supervisor", temperature=0)
+        grafana = llm.create_chat_model("GrafanaAgent")
+        # 모든 agent가 같은 HTTP connection pool을 사용
+        assert supervisor.http_async_client is grafana.http_async_client
+
+        result = await supervisor.ainvoke([HumanMessage(content="alert")])
+    finally:
+        await llm.close_llm_clients()
+
+    assert result.content == "ok"
+    assert len(requests) == 1
+    stats = limiter.stats()
+    assert stats["granted"] == 1
+    # 추정치를 미리 차감한 뒤 실제 사용량(25 tokens)으로 보정됨
+    assert 100000 - 30 <= stats["tokens_available"] <= 100000
+
+
+def test_model_tier_router_falls_back_on_slow_or_failing_models():
+    router = ModelTierRouter(p95_seconds=5, error_rate=0.2, window_seconds=60, min_samples=4)
+    tiers = ["gpt-4o", "gpt-4o-mini"]
+
+    for _ in range(3):
+        router.record("gpt-4o", 12.0, now=0.0)
+    # 표본이 부족하면 primary를 계속 사용
+    assert router.select(tiers, now=1.0) == 0
+
+    router.record("gpt-4o", 12.0, now=1.0)
+    assert router.select(tiers, now=2.0) == 1
+    assert router.stats()["degraded"] == ["gpt-4o"]
+
+    # 오래된 기록이 window에서 빠지면 primary로 돌아감
+    assert router.select(tiers, now=62.0) == 0
+    assert router.stats()["degraded"] == []
+
+    for ok in (True, True, False, False):
+        router.record("gpt-4o", 0.5, ok=ok, now=70.0)
+    assert router.select(tiers, now=71.0) == 1
+    # 모든 모델이 기준을 넘으면 가장 빠른 마지막 모델을 사용
+    for _ in range(4):
+        router.record("gpt-4o-mini", 0.2, ok=False, now=70.0)
+    assert router.select(tiers, now=71.0) == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_model_retries_failed_call_on_fallback_tier(monkeypatch):
+    import json
+
+    from langchain_core.messages import HumanMessage
+
+    from app.agents import llm
+
+    models = []
+
+    def respond(request):
+        model = json.loads(request.content)["model"]
+        models.append(model)
+        if model == "gpt-4o":
+            return httpx.Response(503, json={"error": {"message": "overloaded", "type": "server_error"}})
+        return httpx.Response(200, json={
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "ok"}}],
+            "usage": {"prompt_tokens": 20, "completion_tokens": 5, "total_tokens": 25},
+        })
+
+    router = ModelTierRouter(p95_seconds=5, error_rate=0.2, window_seconds=60, min_samples=1)
+    monkeypatch.setattr(llm, "model_tier_router", router)
+    monkeypatch.setattr(llm, "llm_limiter", LLMRateLimiter(rpm=0, tpm=0, priority_order=[], pause_seconds=1))
+    monkeypatch.setattr(llm, "_http_async_client", httpx.AsyncClient(transport=httpx.MockTransport(respond)))
+    monkeypatch.setattr(llm.settings, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(llm.settings, "SUMMARIZER_MODEL", "gpt-4o, gpt-4o-mini")
+    try:
+        summarizer = llm.create_chat_model("Summarizer", temperature=0)
+        assert summarizer.model_tiers == ["gpt-4o", "gpt-4o-mini"]
+        # SDK 재시도는 꺼져 있어서 실패한 호출이 limiter를 거치지 않고 다시 보내지지 않음
+        assert summarizer.max_retries == 0
+
+        first = await summarizer.ainvoke([HumanMessage(content="summarize")])
+        # primary의 오류율이 기준을 넘었으므로 다음 호출은 바로 fallback 모델로 보냄
+        second = await summarizer.ainvoke([HumanMessage(content="summarize")])
+    finally:
+        await llm.close_llm_clients()
+
+    assert first.content == second.content == "ok"
+    assert models == ["gpt-4o", "gpt-4o-mini", "gpt-4o-mini"]
+    assert router.stats()["served"] == {"Summarizer:gpt-4o-mini": 2}
+    assert registry.get_sample_value(
+        "alert_analyzer_llm_tier_calls_total",
+        {"agent": "Summarizer", "model": "gpt-4o-mini", "tier": "fallback1"},
+    ) >= 2
+
+
+@pytest.mark.asyncio
+async def test_chat_model_retries_through_limiter_and_refunds_cancelled_calls(monkeypatch):
+    from langchain_core.messages import HumanMessage
+
+    from app.agents import llm
+
+    calls = []
+    release = asyncio.Event()
+
+    async def respond(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503, json={"error": {"message": "overloaded", "type": "server_error"}})
+        if len(calls) == 3:
+            await release.wait()
+        return httpx.Response(200, json={
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "ok"}}],
+            "usage": {"prompt_tokens": 20, "completion_tokens": 5, "total_tokens": 25},
+        })
+
+    limiter = LLMRateLimiter(rpm=60, tpm=100000, priority_order=[], pause_seconds=1)
+    monkeypatch.setattr(llm, "llm_limiter", limiter)
+    monkeypatch.setattr(llm, "_http_async_client", httpx.AsyncClient(transport=httpx.MockTransport(respond)))
+    monkeypatch.setattr(llm.settings, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(llm.settings, "SUMMARIZER_MODEL", "gpt-4o")
+    monkeypatch.setattr(llm.settings, "LLM_RETRY_BACKOFF_SECONDS", 0)
+    try:
+        summarizer = llm.create_chat_model("Summarizer", temperature=0)
+        result = await summarizer.ainvoke([HumanMessage(content="summarize")])
+        # 마지막 모델의 503은 limiter에서 몫을 다시 받은 뒤 재시도
+        assert result.content == "ok"
+        assert len(calls) == 2
+        assert limiter.stats()["granted"] == 2
+
+        before = limiter.stats()["tokens_available"]
+        task = asyncio.create_task(summarizer.ainvoke([HumanMessage(content="summarize")]))
+        while len(calls) < 3:
+            await asyncio.sleep(0.01)
+        assert limiter.stats()["tokens_available"] < before - 1000
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    finally:
+        await llm.close_llm_clients()
+
+    # deadline 등으로 취소된 호출은 미리 차감한 token을 되돌려 줌
+    assert limiter.stats()["tokens_available"] >= before
+
+
+@pytest.mark.asyncio
+async def test_email_notifier_reuses_connections_and_sends_digests():
+    sent = []
+    clients = []
+
+    def factory():
+        # 첫 연결은 전송 중에 끊긴 것처럼 동작
+        clients.append(FakeSMTP(sent, fail_once=not clients))
+        return clients[-1]
+
+    pool = SMTPConnectionPool(factory, size=1, idle_check_seconds=60)
+    notifier = EmailNotifier(pool, "bot@example.com", queue_size=10, digest_window=0, digest_max=10)
+    analysis = {"problem": "CPU high", "cause": "deploy", "solution": "1. Roll back"}
+
+    for i in range(3):
+        notifier.enqueue(f"alert {i}", analysis, ["ops@example.com"])
+    await asyncio.sleep(0.05)
+
+    assert [subject for subject, _ in sent] == [f"Alert Analysis: alert {i}" for i in range(3)]
+    assert pool.stats()["connects"] == 2
+    assert pool.stats()["reconnects"] == 1
+
+    notifier.digest_window = 0.05
+    await notifier.stop()
+    for i in range(3):
+        notifier.enqueue(f"digest {i}", analysis, ["ops@example.com"])
+    notifier.enqueue("other team", analysis, ["db@example.com"])
+    await asyncio.sleep(0.15)
+
+    assert sent[3:] == [
+        ("Alert Analysis Digest (3 alerts): digest 0", ("ops@example.com",)),
+        ("Alert Analysis: other team", ("db@example.com",)),
+    ]
+    stats = notifier.stats()
+    assert stats["sent"] == 7
+    assert stats["emails"] == 5
+    await notifier.stop()
+
+
+@pytest.mark.asyncio
+async def test_notification_outbox_group_commits_and_retries_with_backoff():
+    sent = []
+    failures = {"count": 2}
+
+    class FlakyPool:
+        async def send(self, message, sender, recipients):
+            if failures["count"]:
+                failures["count"] -= 1
+                raise ConnectionError("smtp down")
+            sent.append(message["Message-ID"])
+
+        async def close(self):
+            pass
+
+        def stats(self):
+            return {}
+
+    notifier = EmailNotifier(FlakyPool(), "bot@example.com", queue_size=10, digest_window=0, digest_max=10)
+    outbox = NotificationOutbox(
+        ":memory:", notifier, commit_window=0.01, commit_max=100, max_attempts=3,
+        backoff_base=0.01, backoff_max=0.05, dedup_seconds=60, poll_seconds=0.01,
+        retention_seconds=60,
+    )
+    analysis = {"problem": "CPU high", "cause": "deploy", "solution": "1. Roll back"}
+
+    ids = await asyncio.gather(
+        *[outbox.put(["ops@example.com"], f"alert {i}", analysis) for i in range(5)],
+        outbox.put(["ops@example.com"], "alert 0", analysis),
+    )
+    assert ids[:5] == [1, 2, 3, 4, 5]
+    assert ids[5] is None
+    assert outbox.stats()["commits"] == 1
+
+    for _ in range(100):
+        if outbox.stats()["sent"] == 5:
+            break
+        await asyncio.sleep(0.02)
+
+    stats = outbox.stats()
+    assert stats["sent"] == 5
+    assert stats["retried"] == 2
+    assert stats["deduplicated"] == 1
+    assert len(sent) == 5
+    assert outbox.list_messages() == []
+
+    # max_attempts를 넘긴 메시지는 dead로 남고 retry로 다시 보낼 수 있음
+    failures["count"] = 3
+    message_id = await outbox.put(["ops@example.com"], "stuck alert", analysis)
+    for _ in range(100):
+        if outbox.list_messages("dead"):
+            break
+        await asyncio.sleep(0.02)
+    dead = outbox.list_messages("dead")
+    assert [message["id"] for message in dead] == [message_id]
+    assert dead[0]["attempts"] == 3
+    assert dead[0]["last_error"] == "smtp down"
+
+    assert await outbox.retry(message_id)
+    assert not await outbox.retry(9999)
+    for _ in range(100):
+        if outbox.stats()["sent"] == 6:
+            break
+        await asyncio.sleep(0.02)
+    assert outbox.stats()["sent"] == 6
+
+    await outbox.stop()
+    await notifier.stop()
+
+
+@pytest.mark.asyncio
+async def test_notification_outbox_resends_messages_stuck_in_sending():
+    class LosingNotifier:
+        # 메시지를 받기만 하고 결과를 기록하지 않음 (전송 중에 유실된 경우)
+        on_delivery = None
+
+        def __init__(self):
+            self.enqueued = []
+
+        def capacity(self):
+            return 10
+
+        def enqueue(self, description, analysis, recipients, outbox_id=None, **kwargs):
+            self.enqueued.append(outbox_id)
+            return True
+
+    notifier = LosingNotifier()
+    outbox = NotificationOutbox(
+        ":memory:", notifier, commit_window=0.01, commit_max=100, max_attempts=3,
+        backoff_base=0.01, backoff_max=0.05, dedup_seconds=60, poll_seconds=0.01,
+        retention_seconds=60, sending_timeout=0.05,
+    )
+    message_id = await outbox.put(["ops@example.com"], "lost alert", {"problem": "p"})
+    for _ in range(100):
+        if len(notifier.enqueued) >= 2:
+            break
+        await asyncio.sleep(0.02)
+    await outbox.stop()
+
+    assert notifier.enqueued[:2] == [message_id, message_id]
+    assert outbox.stats()["reclaimed"] >= 1
+    assert outbox.stats()["sending"] == 1